@@ -5,8 +5,10 @@ from PyQt6.QtGui import QIcon
 
 import motorlib
 from motorlib import simResult
+from motorlib import regressionCache
 from uilib import preferencesManager, propellantManager, simulationManager, fileManager, toolManager
 from uilib import importExportManager
+from uilib.fileIO import getConfigPath
 import uilib.widgets.mainWindow
 from uilib.logger import logger
 
@@ -20,6 +22,11 @@ class App(QApplication):
 
         self.preferencesManager = uilib.preferencesManager.PreferencesManager()
 
+        try:
+            regressionCache.setDiskCache(getConfigPath() + 'regressionCache')
+        except OSError:
+            logger.warn('Unable to create the regression cache directory, only caching in memory')
+
         self.propellantManager = uilib.propellantManager.PropellantManager()
         self.preferencesManager.preferencesChanged.connect(self.propellantManager.setPreferences)
 
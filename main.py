@@ -1,6 +1,10 @@
 import sys
+from multiprocessing import freeze_support
 from app import App
 from PyQt6.QtCore import Qt
 
-app = App(sys.argv)
-sys.exit(app.exec())
+# Grain setup can run in worker processes, which import this module again and must not start another app
+if __name__ == '__main__':
+    freeze_support()
+    app = App(sys.argv)
+    sys.exit(app.exec())
@@ -1,7 +1,11 @@
 """This module includes the geometry methods that openMotor uses in its calculations"""
 
 import math
+
 import numpy as np
+from skimage import measure
+
+from .regressionCache import MemoryCache
 
 def circleArea(dia):
     """Returns the area of a circle with diameter dia"""
@@ -47,11 +51,43 @@ def splitFrustum(diameterA, diameterB, length, splitPosition):
     splitDiameter = diameterA + (diameterB - diameterA) * (splitPosition / length)
     return (diameterA, splitDiameter, splitPosition), (splitDiameter, diameterB, length - splitPosition)
 
-def length(contour, mapSize, tolerance=3):
+def clampCosine(value):
+    """Limits a value to [-1, 1] so rounding error can't push it out of the domain of acos"""
+    return max(-1, min(1, value))
+
+def circleOverlapArea(diameterA, diameterB, distance):
+    """Returns the area that two circles with the given diameters and centers 'distance' apart have in common"""
+    radiusA, radiusB = diameterA / 2, diameterB / 2
+    if distance >= radiusA + radiusB:
+        return 0
+    if distance <= abs(radiusA - radiusB):
+        return circleArea(min(diameterA, diameterB))
+    angleA = math.acos(clampCosine(((distance ** 2) + (radiusA ** 2) - (radiusB ** 2)) / (2 * distance * radiusA)))
+    angleB = math.acos(clampCosine(((distance ** 2) + (radiusB ** 2) - (radiusA ** 2)) / (2 * distance * radiusB)))
+    kite = (-distance + radiusA + radiusB) * (distance + radiusA - radiusB) * (distance - radiusA + radiusB)
+    kite = 0.5 * (max(kite * (distance + radiusA + radiusB), 0) ** 0.5)
+    return ((radiusA ** 2) * angleA) + ((radiusB ** 2) * angleB) - kite
+
+def circleArcInside(diameter, otherDiameter, distance):
+    """Returns the length of the part of the perimeter of a circle with diameter 'diameter' that is inside of another
+    circle with diameter 'otherDiameter' and a center 'distance' away"""
+    radius, otherRadius = diameter / 2, otherDiameter / 2
+    if distance + radius <= otherRadius:
+        return circlePerimeter(diameter)
+    if distance >= radius + otherRadius or distance + otherRadius <= radius:
+        return 0
+    # Points on the circle within this angle of the direction towards the other center are inside of it
+    angle = math.acos(clampCosine(((distance ** 2) + (radius ** 2) - (otherRadius ** 2)) / (2 * distance * radius)))
+    return 2 * radius * angle
+
+def length(contour, mapSize, tolerance=3, closed=True):
     """Returns the total length of all segments in a contour that aren't within 'tolerance' of the edge of a
-    circle with diameter 'mapSize'"""
+    circle with diameter 'mapSize'. If 'closed' is False, the segment from the last point back to the first is left
+    out."""
     offset = np.roll(contour.T, 1, axis=1)
     lengths = np.linalg.norm(contour.T - offset, axis=0)
+    if not closed:
+        lengths[0] = 0
 
     centerOffset = np.array([[mapSize / 2, mapSize / 2]])
     radius = np.linalg.norm(contour - centerOffset, axis=1)
@@ -60,6 +96,40 @@ def length(contour, mapSize, tolerance=3):
 
     return np.sum(lengths[valid])
 
+def sectorLength(contour, mapSize, startAngle, sweep, tolerance=3):
+    """Returns the total length of the parts of a contour that are inside of the sector of a circle with diameter
+    'mapSize' that starts at 'startAngle' and spans 'sweep' radians, which must be at most pi. Segments that cross the
+    sides of the sector are clipped to them. Like 'length', segments within 'tolerance' of the edge of the circle are
+    left out. Contours are treated as open, as contours cut off by the sides of a sector don't close."""
+    center = (mapSize - 1) / 2
+    points = contour - center
+    segments = np.diff(points, axis=0)
+    lengths = np.linalg.norm(segments, axis=1)
+
+    midpoints = points[:-1] + (segments / 2)
+    radius = np.linalg.norm(midpoints, axis=1)
+
+    # Points are (row, col), so the sides of the sector are the lines through the center along these directions
+    endAngle = startAngle + sweep
+    sides = [(points[:, 1] * np.sin(startAngle)) - (points[:, 0] * np.cos(startAngle)),
+             (points[:, 0] * np.cos(endAngle)) - (points[:, 1] * np.sin(endAngle))]
+    start = np.zeros(len(segments))
+    end = np.ones(len(segments))
+    for side in sides:
+        # Both sides are negative inside of the sector, so find the part of each segment where they are
+        first = side[:-1]
+        last = side[1:]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing = first / (first - last)
+        start = np.where(np.logical_and(first > 0, last <= 0), np.maximum(start, crossing), start)
+        end = np.where(np.logical_and(first <= 0, last > 0), np.minimum(end, crossing), end)
+        end = np.where(np.logical_and(first > 0, last > 0), 0, end)
+    inside = np.clip(end - start, 0, 1)
+
+    valid = radius < (mapSize / 2) - tolerance
+
+    return np.sum((lengths * inside)[valid])
+
 def clean(contour, mapSize, tolerance):
     """Returns a contour with the same points as the input, omitting any within 'tolerace' of a circle of
     diameter 'mapSize'"""
@@ -67,6 +137,95 @@ def clean(contour, mapSize, tolerance):
     lengths = np.linalg.norm(contour - offset, axis=1)
     return contour[lengths < (mapSize / 2) - tolerance]
 
+def getContourLevels(image, levels, mapSize, fullyConnected='low'):
+    """Returns a tuple of a list with the contours of 'image' at each of the values in 'levels', as from skimage's
+    find_contours, and a dictionary that maps each level to the total length of its contours, as measured by 'length'
+    on a map of size 'mapSize'. Levels that are repeated, like when the whole map is at the same depth, are only
+    contoured once."""
+    found = {}
+    contourLengths = {}
+    for level in levels:
+        if level not in found:
+            found[level] = measure.find_contours(image, level, fully_connected=fullyConnected)
+            contourLengths[level] = sum([length(contour, mapSize) for contour in found[level]])
+    return [found[level] for level in levels], contourLengths
+
+def getCircleContourLevels(radii, levels, mapSize, tolerance=3):
+    """Returns the same tuple as 'getContourLevels' for a map whose contours are all circles around its center, so
+    grains with simple cores can draw their contours without finding them in a regression map. 'radii' has a list of
+    circle radii for each level, in the units of 'mapGrid'. Like 'length', circles that come within 'tolerance' pixels
+    of the edge of the map are left out."""
+    center = (mapSize - 1) / 2
+    contours = []
+    contourLengths = {}
+    for level, levelRadii in zip(levels, radii):
+        contours.append([])
+        contourLengths[level] = 0
+        for radius in levelRadii:
+            pixelRadius = radius * center
+            if pixelRadius <= 0 or pixelRadius >= (mapSize / 2) - tolerance:
+                continue
+            angles = np.linspace(0, 2 * np.pi, max(int(np.ceil(2 * np.pi * pixelRadius)), 8) + 1)
+            contours[-1].append(np.column_stack((center + (pixelRadius * np.sin(angles)),
+                                                 center + (pixelRadius * np.cos(angles)))))
+            contourLengths[level] += 2 * np.pi * pixelRadius
+    return contours, contourLengths
+
 def dist(point1, point2):
     """Returns the distance between two points [x1, y1], [x2, y2]"""
     return ((point1[0] - point2[0]) ** 2 + (point1[1] - point2[1]) ** 2) ** 0.5
+
+# Holds the arrays from 'mapGrid' and 'mapPolar'. It is limited by size rather than by the number of maps, so the grids
+# of very large maps are dropped once other sizes are used, or never kept at all, instead of staying in memory.
+mapCache = MemoryCache(128 * 2 ** 20)
+
+def mapGrid(mapSize):
+    """Returns a tuple (mapX, mapY, mask) for a square map with 'mapSize' pixels on each side that spans -1 to 1 on
+    both axes. mapX and mapY hold the coordinates of each pixel and mask is True for the pixels outside of the unit
+    circle. The arrays are kept in 'mapCache' and shared between every grain that uses a map of the same size, so they
+    are read-only. The coordinates are kept in double precision, as rounding them to single precision moves pixels that
+    lie on the edges of some core shapes to the other side."""
+    key = ('grid', mapSize)
+    cached = mapCache.load(key)
+    if cached is None:
+        axis = np.linspace(-1, 1, mapSize)
+        mapX, mapY = np.meshgrid(axis, axis)
+        cached = {'mapX': mapX, 'mapY': mapY, 'mask': mapX**2 + mapY**2 > 1}
+        saveMap(key, cached)
+    return cached['mapX'], cached['mapY'], cached['mask']
+
+def saveMap(key, arrays):
+    """Makes the arrays in 'arrays' read-only and stores them in 'mapCache', which leaves out any that are too large."""
+    for array in arrays.values():
+        array.setflags(write=False)
+    mapCache.save(key, arrays)
+
+def mapGridWindow(mapSize, window):
+    """Returns a tuple (mapX, mapY, mask) like 'mapGrid', but only for the pixels in 'window', a tuple of row and column
+    slices. The values match the same pixels in 'mapGrid'. These arrays aren't cached, so maps that are too large to
+    hold in memory can be worked on a piece at a time."""
+    axis = np.linspace(-1, 1, mapSize)
+    mapX, mapY = np.meshgrid(axis[window[1]], axis[window[0]])
+    mask = mapX**2 + mapY**2 > 1
+    return mapX, mapY, mask
+
+def mapPolar(mapSize):
+    """Returns a tuple (radius, angle) holding the polar coordinates of each pixel in the map from 'mapGrid', with the
+    angle in radians from the x axis. Like the grid itself, the arrays are cached and read-only."""
+    key = ('polar', mapSize)
+    cached = mapCache.load(key)
+    if cached is None:
+        mapX, mapY, _ = mapGrid(mapSize)
+        cached = {'radius': (mapX**2 + mapY**2) ** 0.5, 'angle': np.arctan2(mapY, mapX)}
+        saveMap(key, cached)
+    return cached['radius'], cached['angle']
+
+def nearestAxes(angle, count, offset):
+    """Takes an array of angles and returns two arrays with the indices of the nearest and second nearest of 'count'
+    evenly spaced axes, the first of which points 'offset' radians from the x axis. Shapes made of identical features
+    around the center of the map can be drawn by only checking each pixel against these two features rather than all
+    of them."""
+    position = (angle - offset) * (count / (2 * np.pi))
+    nearest = np.rint(position)
+    second = nearest + np.where(position >= nearest, 1, -1)
+    return np.mod(nearest, count).astype(int), np.mod(second, count).astype(int)
@@ -0,0 +1,160 @@
+"""This module contains the geometry table, which samples a grain's geometry against regression depth once before a
+simulation so that the simulation can interpolate it instead of recomputing it at every timestep."""
+
+from bisect import bisect_right
+
+import numpy as np
+
+class GeometryTable():
+    """Holds samples of a grain's web left, volume, burning surface area and port areas from no regression up to
+    burnout. The samples start out evenly spaced, plus any breakpoints the grain reports, and each interval is split in
+    half until linearly interpolating across it gives every quantity to within 'tolerance' of its largest value, which
+    is checked against the exact geometry at the interval's midpoint. The mass flow comes from the change in volume over
+    a timestep, so the slope of the volume across each interval also has to be within the tolerance of the exact slope
+    at both of its ends, relative to the largest slope.
+
+    Intervals where a quantity jumps, like the rod of a rod and tube grain burning out, can't meet the tolerance, so
+    they stop being split once they are narrower than 'minWidth' of the depth range. The largest error left in any
+    other interval is kept as self.errorBound, which is only over the tolerance if the table ran out of samples.
+
+    The table has the same methods as a grain for the quantities the simulation needs. Depths past the end of the table
+    are passed through to the grain itself."""
+    quantities = ('webLeft', 'volume', 'surfaceArea', 'portArea', 'forwardPortArea', 'aftFaceArea')
+
+    def __init__(self, grain, tolerance, initialSamples=64, maxSamples=8192, minWidth=1e-6):
+        self.grain = grain
+        self.tolerance = tolerance
+        self.hasPort = grain.getPortArea(0) is not None
+        self.boundingVolume = grain.getGrainBoundingVolume()
+        self.depths = None
+        self.maxDepth = 0
+        self.values = None
+        self.errorBound = 0
+        self.buildTable(self.getBurnoutDepth(), initialSamples, maxSamples, minWidth)
+
+    def getBurnoutDepth(self):
+        """Returns a depth at which the grain has burned out. The web left shrinks at least as quickly as the grain
+        regresses for most grains, but the web of a conical grain only shrinks by the radial part of its regression, so
+        the depth is doubled until the web is gone."""
+        depth = max(self.grain.getWebLeft(0), 1e-9)
+        for _ in range(16):
+            if self.grain.getWebLeft(depth) <= 0:
+                break
+            depth *= 2
+        return depth
+
+    def sample(self, regDist, step):
+        """Returns an array of the exact value of each quantity in 'quantities' at a regression depth of 'regDist',
+        followed by the slope of the volume just before and just after it, which are measured over 'step'."""
+        volume = self.grain.getVolumeAtRegression(regDist)
+        values = [self.grain.getWebLeft(regDist), volume, self.grain.getSurfaceAreaAtRegression(regDist)]
+        if self.hasPort:
+            values += [self.grain.getPortArea(regDist), self.grain.getForwardPortArea(regDist),
+                       self.grain.getAftFaceArea(regDist)]
+        else:
+            values += [0, 0, 0]
+        after = (self.grain.getVolumeAtRegression(regDist + step) - volume) / step
+        before = (volume - self.grain.getVolumeAtRegression(regDist - step)) / step if regDist >= step else after
+        return np.array(values + [before, after], dtype=np.float64)
+
+    def buildTable(self, burnoutDepth, initialSamples, maxSamples, minWidth):
+        """Samples the grain from no regression to 'burnoutDepth', splitting intervals until they meet the tolerance or
+        the table has 'maxSamples' samples."""
+        minWidth *= burnoutDepth
+        step = minWidth / 2 # Keeps the slopes from reaching past the neighboring samples
+        depths = np.linspace(0, burnoutDepth, initialSamples)
+        breakpoints = [depth for depth in self.grain.getGeometryBreakpoints() if 0 < depth < burnoutDepth]
+        depths = list(np.unique(np.concatenate((depths, breakpoints))))
+        samples = [self.sample(depth, step) for depth in depths]
+        volume = self.quantities.index('volume')
+        midpoints = {}
+        while True:
+            depthArray = np.array(depths)
+            sampleArray = np.array(samples)
+            middles = (depthArray[:-1] + depthArray[1:]) / 2
+            for middle in middles:
+                if middle not in midpoints:
+                    midpoints[middle] = self.sample(middle, step)
+            middleArray = np.array([midpoints[middle] for middle in middles])
+
+            values = sampleArray[:, :len(self.quantities)]
+            scale = np.amax(np.abs(values), axis=0)
+            scale[scale == 0] = 1
+            interpolated = (values[:-1] + values[1:]) / 2
+            errors = np.amax(np.abs(interpolated - middleArray[:, :len(self.quantities)]) / scale, axis=1)
+
+            slopes = sampleArray[:, len(self.quantities):]
+            slopeScale = max(np.amax(np.abs(slopes)), 1e-300)
+            secants = np.diff(values[:, volume]) / np.diff(depthArray)
+            slopeErrors = np.maximum(np.abs(secants - slopes[:-1, 1]), np.abs(secants - slopes[1:, 0])) / slopeScale
+            errors = np.maximum(errors, slopeErrors)
+
+            splittable = np.diff(depthArray) > minWidth
+            self.errorBound = float(np.amax(errors[splittable], initial=0))
+            toSplit = np.nonzero(np.logical_and(errors > self.tolerance, splittable))[0]
+            if len(toSplit) == 0 or len(depths) + len(toSplit) > maxSamples:
+                break
+            # Insert from the end so the indices of the intervals that are still to be split don't move
+            for index in toSplit[::-1]:
+                depths.insert(index + 1, middles[index])
+                samples.insert(index + 1, midpoints.pop(middles[index]))
+
+        # Lists are faster than arrays to look up single values in, which is all the simulation does. The slope of
+        # each interval is stored with its starting value so that interpolating only takes one multiplication.
+        self.depths = list(depthArray[:-1])
+        self.maxDepth = depthArray[-1]
+        self.values = {}
+        for index, name in enumerate(self.quantities):
+            self.values[name] = (list(values[:-1, index]), list(np.diff(values[:, index]) / np.diff(depthArray)))
+
+    def interpolate(self, quantity, regDist):
+        """Returns the value of 'quantity' at a regression depth of 'regDist', interpolated from the table."""
+        index = max(bisect_right(self.depths, regDist) - 1, 0)
+        values, slopes = self.values[quantity]
+        return values[index] + ((regDist - self.depths[index]) * slopes[index])
+
+    def getWebLeft(self, regDist):
+        if regDist > self.maxDepth:
+            return self.grain.getWebLeft(regDist)
+        return self.interpolate('webLeft', regDist)
+
+    def isWebLeft(self, regDist, burnoutThres=0.00001):
+        return self.getWebLeft(regDist) > burnoutThres
+
+    def getVolumeAtRegression(self, regDist):
+        if regDist > self.maxDepth:
+            return self.grain.getVolumeAtRegression(regDist)
+        return self.interpolate('volume', regDist)
+
+    def getVolumeSlice(self, regDist, dRegDist):
+        return self.getVolumeAtRegression(regDist) - self.getVolumeAtRegression(regDist + dRegDist)
+
+    def getSurfaceAreaAtRegression(self, regDist):
+        if regDist > self.maxDepth:
+            return self.grain.getSurfaceAreaAtRegression(regDist)
+        return self.interpolate('surfaceArea', regDist)
+
+    def getPortArea(self, regDist):
+        if not self.hasPort:
+            return None
+        if regDist > self.maxDepth:
+            return self.grain.getPortArea(regDist)
+        return self.interpolate('portArea', regDist)
+
+    def getPeakMassFlux(self, massIn, dTime, regDist, dRegDist, density):
+        """Returns the larger of the mass flux at the forward and aft ends of the port. The mass flow at the aft end is
+        the flow into the grain plus the propellant burned during the step, except for any exposed aft face. This
+        matches PerforatedGrain.getMassFlux to first order in 'dRegDist', and ConicalGrain.getPeakMassFlux as its ends
+        are always inhibited. Grains without a port have no mass flux."""
+        if not self.hasPort:
+            return 0
+        steppedDist = regDist + dRegDist
+        if steppedDist > self.maxDepth:
+            return self.grain.getPeakMassFlux(massIn, dTime, regDist, dRegDist, density)
+        burned = self.getVolumeSlice(regDist, dRegDist) - (self.interpolate('aftFaceArea', regDist) * dRegDist)
+        aftMassFlux = (massIn + (burned * density / dTime)) / self.interpolate('portArea', steppedDist)
+        forwardMassFlux = massIn / self.interpolate('forwardPortArea', steppedDist)
+        return max(forwardMassFlux, aftMassFlux)
+
+    def getFreeVolume(self, regDist):
+        return float(self.boundingVolume - self.getVolumeAtRegression(regDist))
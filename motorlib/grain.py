@@ -2,14 +2,19 @@
 should be instantiated directly."""
 
 from abc import abstractmethod
+from math import ceil
+import os
+import tempfile
 
 import numpy as np
 import skfmm
 from skimage import measure
 from scipy.signal import savgol_filter
-from scipy import interpolate
+from scipy import interpolate, ndimage
 
 from . import geometry
+from . import regressionCache
+from .geometryTable import GeometryTable
 from .simResult import SimAlert, SimAlertLevel, SimAlertType
 from .properties import FloatProperty, EnumProperty, PropertyCollection
 
@@ -17,10 +22,12 @@ class Grain(PropertyCollection):
     """A basic propellant grain. This is the class that all grains inherit from. It provides a few properties and
     composed methods but otherwise it is up to the subclass to make a functional grain."""
     geomName = None
+    tabulateGeometry = True # If set, the simulation can use a GeometryTable in place of the grain's own methods
     def __init__(self):
         super().__init__()
         self.props['diameter'] = FloatProperty('Diameter', 'm', 0, 1)
         self.props['length'] = FloatProperty('Length', 'm', 0, 3)
+        self.geometryTable = None
 
     def getVolumeSlice(self, regDist, dRegDist):
         """Returns the amount of propellant volume consumed as the grain regresses from a distance of 'regDist' to
@@ -61,6 +68,21 @@ class Grain(PropertyCollection):
     def getPortArea(self, regDist):
         """Returns the area of the grain's port when it has regressed a distance of 'regDist'"""
 
+    def getForwardPortArea(self, regDist):
+        """Returns the area of the port at the forward end of the grain. This is the same as 'getPortArea' unless the
+        port changes size along the grain."""
+        return self.getPortArea(regDist)
+
+    def getAftFaceArea(self, regDist):
+        """Returns the area of the grain's aft face if it is exposed, or 0 if it isn't. Propellant burned on this face
+        leaves the grain without passing through its port."""
+        return 0
+
+    def getGeometryBreakpoints(self):
+        """Returns a list of regression depths where the grain's geometry may not change smoothly, which a
+        GeometryTable should sample exactly. Only valid after 'simulationSetup'."""
+        return []
+
     def getRegressedLength(self, regDist):
         """Returns the length of the grain when it has regressed a distance of 'regDist', taking any possible
         inhibition into account."""
@@ -75,6 +97,18 @@ class Grain(PropertyCollection):
     def simulationSetup(self, config):
         """Do anything needed to prepare this grain for simulation"""
 
+    def setupGeometryTable(self, config):
+        """Samples the grain's geometry into a GeometryTable if the config asks for tabulated geometry, or clears it
+        otherwise. This has to be called after 'simulationSetup'."""
+        self.geometryTable = None
+        if self.tabulateGeometry and config.getProperty('geometryEvaluation') == 'Tabulated':
+            self.geometryTable = GeometryTable(self, config.getProperty('geometryTableTolerance') / 100)
+
+    def getSimulationGeometry(self):
+        """Returns the object that the simulation should get the grain's geometry from, which is its geometry table if
+        it has one and the grain itself if it doesn't."""
+        return self.geometryTable if self.geometryTable is not None else self
+
     def getGeometryErrors(self):
         """Returns a list of simAlerts that detail any issues with the geometry of the grain. Errors should be
         used for any condition that prevents simulation of the grain, while warnings can be used to notify the
@@ -96,6 +130,35 @@ class Grain(PropertyCollection):
         depth."""
         return float(self.getGrainBoundingVolume() - self.getVolumeAtRegression(regDist))
 
+    def copySimulationSetup(self, grain):
+        """Makes this grain use the results of another grain's 'simulationSetup'. The other grain must have the same
+        type and properties. Arrays are shared rather than copied, as they aren't modified once setup is done."""
+        for name, value in vars(grain).items():
+            if name != 'props':
+                setattr(self, name, value)
+
+    def getMapDim(self):
+        """Returns the dimension of the regression map that the grain was set up with, or None if it doesn't use
+        one."""
+        return None
+
+    def getMemoryUsage(self):
+        """Returns the number of bytes used by the arrays the grain is holding on to, including the ones inside of its
+        interpolation functions. Arrays that are shared between attributes are only counted once."""
+        arrays = []
+        for value in vars(self).values():
+            if isinstance(value, interpolate.interp1d):
+                arrays += [value.x, value.y]
+            elif isinstance(value, np.ma.MaskedArray):
+                arrays += [value.data, np.ma.getmaskarray(value)]
+            elif isinstance(value, np.ndarray):
+                arrays.append(value)
+        counted = {}
+        for array in arrays:
+            base = array if array.base is None else array.base
+            counted[id(base)] = base.nbytes if isinstance(base, np.ndarray) else array.nbytes
+        return sum(counted.values())
+
 
 class PerforatedGrain(Grain):
     """A grain with a hole of some shape through the center. Adds abstract methods related to the core to the
@@ -133,6 +196,11 @@ class PerforatedGrain(Grain):
         coreArea = corePerimeter * self.getRegressedLength(regDist)
         return coreArea
 
+    def getAftFaceArea(self, regDist):
+        if self.props['inhibitedEnds'].getValue() in ('Neither', 'Top'):
+            return self.getFaceArea(regDist)
+        return 0
+
     def getWebLeft(self, regDist):
         wallLeft = self.wallWeb - regDist
         if self.props['inhibitedEnds'].getValue() == 'Both':
@@ -202,6 +270,42 @@ class PerforatedGrain(Grain):
         between 0 regression and burnout."""
 
 
+def solveFastMarching(coreMap, mask, cellSize, narrow=0):
+    """Returns the distance from each unmasked pixel of 'coreMap' to its core, found with the fast marching method.
+    Masked pixels block the front, so it can't take shortcuts through them. If 'narrow' is set, the front stops once it
+    is that far from the core and the pixels it didn't reach are masked. The distances it did find are the same as
+    without 'narrow'."""
+    return skfmm.distance(np.ma.MaskedArray(coreMap, mask), dx=cellSize, narrow=narrow)
+
+def solveDistanceTransform(coreMap, mask, cellSize):
+    """Returns the signed distance from each unmasked pixel of 'coreMap' to the edge of its core, using an exact
+    Euclidean distance transform. Like skfmm, the edge is halfway between core and propellant pixels and distances
+    inside the core are negative. This matches the fast marching method without its discretization error as long as
+    the unmasked region is convex, which holds for the casting tube and for the wedges used by symmetric grains."""
+    # Like skfmm, anything that isn't positive (including NaN from unset boolean properties) is treated as core
+    propellant = np.logical_or(coreMap > 0, mask)
+    if np.all(propellant):
+        raise ValueError('The core map has no core to regress from')
+    toCore = ndimage.distance_transform_edt(propellant, sampling=cellSize)
+    toPropellant = ndimage.distance_transform_edt(np.logical_not(propellant), sampling=cellSize)
+    distance = np.where(propellant, toCore - (cellSize / 2), (cellSize / 2) - toPropellant)
+    return np.ma.MaskedArray(distance, mask)
+
+def getWedgeMask(mapX, mapY, mask, mapDim, angle, sweep):
+    """Takes the coordinates and mask of part of a map with dimension 'mapDim' and returns which of its pixels are
+    within the wedge that starts at 'angle' radians and spans 'sweep' radians, or within four pixels of its sides."""
+    margin = 8 / mapDim # Four pixels, in map units
+    nearStart = (-np.sin(angle) * mapX) + (np.cos(angle) * mapY) > -margin
+    nearEnd = (np.sin(angle + sweep) * mapX) - (np.cos(angle + sweep) * mapY) > -margin
+    return np.logical_and(np.logical_and(nearStart, nearEnd), np.logical_not(mask))
+
+# Functions that can be used to generate regression maps, keyed by the name shown in the motor config
+regressionSolvers = {
+    'Fast marching': solveFastMarching,
+    'Distance transform': solveDistanceTransform
+}
+
+
 class FmmGrain(PerforatedGrain):
     """A grain that uses the fast marching method to calculate its regression. All a subclass has to do is
     provide an implementation of generateCoreMap that makes an image of a cross section of the grain."""
@@ -214,6 +318,32 @@ class FmmGrain(PerforatedGrain):
         self.coreMap = None
         self.regressionMap = None
         self.faceArea = None
+        self.faceAreaFunc = None
+        self.corePerimeter = None
+        self.corePerimeterFunc = None
+        self.perimeterSamples = 100 # Number of regression depths to measure the core perimeter at during setup
+        self.exactPerimeter = False # If set, contour the regression map on every call to 'getCorePerimeter'
+        self.useSymmetry = True # If set, only solve the part of the map that 'getSymmetry' says is unique
+        self.regressionSolver = 'Fast marching' # Key into 'regressionSolvers'
+        self.minimumAutomaticMapDim = 128 # Smallest map dimension that automatic map selection will use
+        self.quantizedMap = None # Regression map stored as integers when using 'Quantized' storage
+        self.outOfCore = False # If set, full size maps are memory-mapped files that are worked on in bands of rows
+        self.mapBandRows = 512 # Number of rows in each band when working out of core
+        self.mapRowOffset = 0 # Row of the full map that row 0 of self.coreMap is while the map is generated in bands
+        self.mapDirectory = None # Temporary directory holding the memory-mapped maps
+        self.quantizedRange = (0, 0)
+        # The region of the map that the FMM was solved on. See 'solveRegressionMap' for details.
+        self.domainMap = None
+        self.domainOffset = (0, 0)
+        self.domainValid = None
+        self.domainContourMask = None
+        self.domainSector = None
+        self.domainScale = 1
+        # Distances near the core from a solve of the whole map, for symmetric grains. See 'solveCoreBand' for details.
+        self.coreBandPixels = 20
+        self.coreBandMap = None
+        self.coreBandOffset = (0, 0)
+        self.coreBandOutside = 0
 
     def normalize(self, value):
         """Transforms real unit quantities into self.mapX, self.mapY coordinates. For use in indexing into the
@@ -242,58 +372,558 @@ class FmmGrain(PerforatedGrain):
         return (self.props['diameter'].getValue() ** 2) * (value / (self.mapDim ** 2))
 
     def initGeometry(self, mapDim):
-        """Set up an empty core map and reset the regression map. Takes in the dimension of both maps."""
+        """Set up an empty core map and reset the regression map. Takes in the dimension of both maps. The maps are
+        always held in memory, even if the last simulation setup worked out of core, which keeps previews working."""
         if mapDim < 64:
             raise ValueError('Map dimension must be 64 or larger to get good results')
+        self.releaseMappedMaps()
+        self.outOfCore = False
         self.mapDim = mapDim
-        self.mapX, self.mapY = np.meshgrid(np.linspace(-1, 1, self.mapDim), np.linspace(-1, 1, self.mapDim))
-        self.mask = self.mapX**2 + self.mapY**2 > 1
-        self.coreMap = np.ones_like(self.mapX)
+        self.mapX, self.mapY, self.mask = geometry.mapGrid(self.mapDim)
+        self.coreMap = np.ones(self.mapX.shape)
         self.regressionMap = None
 
+    def initMappedGeometry(self, mapDim):
+        """Like 'initGeometry', but the core map and mask are memory-mapped files in a temporary directory rather than
+        arrays in memory. They are filled in by 'generateMappedCoreMap'."""
+        if mapDim < 64:
+            raise ValueError('Map dimension must be 64 or larger to get good results')
+        self.releaseMappedMaps()
+        self.mapDim = mapDim
+        self.mapDirectory = tempfile.TemporaryDirectory(prefix='openMotor')
+        self.mapX, self.mapY = None, None
+        self.mask = self.createMappedArray('mask', bool)
+        self.coreMap = self.createMappedArray('coreMap', np.float32) # Only holds 0, 1 and NaN, so this is exact
+        self.regressionMap = None
+
+    def createMappedArray(self, name, dtype, shape=None):
+        """Returns a new memory-mapped array backed by a file in self.mapDirectory. It is the size of the map unless
+        'shape' is given."""
+        path = os.path.join(self.mapDirectory.name, name + '.dat')
+        if shape is None:
+            shape = (self.mapDim, self.mapDim)
+        return np.memmap(path, dtype=dtype, mode='w+', shape=shape)
+
+    def releaseMappedMaps(self):
+        """Drops every memory-mapped map and deletes the directory holding them."""
+        if self.mapDirectory is None:
+            return
+        self.coreMap, self.mask = None, None
+        self.regressionMap, self.domainMap, self.domainValid = None, None, None
+        self.coreBandMap = None
+        try:
+            self.mapDirectory.cleanup()
+        except OSError: # Some platforms can't delete the files until every view of them is garbage collected
+            pass
+        self.mapDirectory = None
+
+    def getMapBands(self, rows=None):
+        """Returns a list of slices that split 'rows' rows, or the whole map if it isn't given, into bands of
+        self.mapBandRows rows when working out of core. Otherwise, a single slice covers all of them."""
+        if rows is None:
+            rows = self.mapDim
+        bandRows = self.mapBandRows if self.outOfCore else rows
+        return [slice(start, min(start + bandRows, rows)) for start in range(0, rows, bandRows)]
+
+    def getMapPolar(self):
+        """Returns a tuple (radius, angle) with the polar coordinates of the pixels in self.mapX and self.mapY. The
+        cached arrays from 'geometry.mapPolar' are used unless only part of the map is being generated."""
+        if self.mapX.shape == (self.mapDim, self.mapDim):
+            return geometry.mapPolar(self.mapDim)
+        return (self.mapX**2 + self.mapY**2) ** 0.5, np.arctan2(self.mapY, self.mapX)
+
     @abstractmethod
     def generateCoreMap(self):
         """Use self.mapX and self.mapY to generate an image of the grain cross section in self.coreMap. A 0 in the image
         means propellant, and a 1 means no propellant."""
 
+    def generateMappedCoreMap(self):
+        """Fills in the memory-mapped core map and mask from 'initMappedGeometry' one band of rows at a time. For each
+        band, self.mapX, self.mapY and self.coreMap only cover the band's rows while 'generateCoreMap' runs, and
+        self.mapRowOffset holds the index of its first row."""
+        coreMap, mask = self.coreMap, self.mask
+        for rows in self.getMapBands():
+            self.mapX, self.mapY, mask[rows] = geometry.mapGridWindow(self.mapDim, (rows, slice(None)))
+            self.coreMap = np.ones(self.mapX.shape)
+            self.mapRowOffset = rows.start
+            self.generateCoreMap()
+            coreMap[rows] = self.coreMap
+        self.mapX, self.mapY, self.coreMap, self.mapRowOffset = None, None, coreMap, 0
+
     def simulationSetup(self, config):
         mapSize = config.getProperty("mapDim")
+        self.regressionSolver = config.getProperty("regressionSolver")
+        self.outOfCore = config.getProperty("mapMemory") == 'Memory mapped'
 
-        self.initGeometry(mapSize)
-        self.generateCoreMap()
+        if config.getProperty("mapDimSelection") == 'Automatic':
+            tolerance = config.getProperty("mapConvergenceTolerance") / 100
+            self.selectMapDim(config.getProperty("mapFeaturePixels"), mapSize, tolerance)
+        else:
+            self.setupMap(mapSize)
+        self.compactRegressionData(config.getProperty("regressionMapStorage"))
+
+    def setupMap(self, mapDim):
+        """Generates the core map, the regression map and the tables derived from it with a map dimension of
+        'mapDim'. When working out of core, the maps are memory-mapped and generated in bands."""
+        if self.outOfCore:
+            self.initMappedGeometry(mapDim)
+            self.generateMappedCoreMap()
+        else:
+            self.initGeometry(mapDim)
+            self.generateCoreMap()
         self.generateRegressionMap()
 
+    def getMapDim(self):
+        return self.mapDim
+
+    def getMinimumFeatureSize(self):
+        """Returns the width of the smallest feature in the grain's cross section, such as a fin or a slot, which the
+        map has to resolve. Returns None if the grain has no feature that should set the map dimension."""
+        return None
+
+    def getFeatureMapDim(self, featurePixels, maxDim):
+        """Returns the smallest map dimension that makes the grain's smallest feature at least 'featurePixels' pixels
+        wide, limited to between self.minimumAutomaticMapDim and 'maxDim'."""
+        featureSize = self.getMinimumFeatureSize()
+        mapDim = self.minimumAutomaticMapDim
+        if featureSize is not None and featureSize > 0:
+            # Rounding keeps floating point noise from adding a pixel
+            mapDim = ceil(round(featurePixels * self.props['diameter'].getValue() / featureSize, 6))
+        return int(min(max(mapDim, self.minimumAutomaticMapDim), maxDim))
+
+    def getTableDifference(self, tables):
+        """Returns how much the face area and core perimeter tables in 'tables', a tuple of interpolation functions
+        like (self.faceAreaFunc, self.corePerimeterFunc), differ from the grain's current tables. For each table, this
+        is the mean absolute difference over the depths that both cover, relative to the table's mean value, and the
+        larger of the two is returned. Averaging keeps steps in the perimeter, like fins burning out, from counting
+        for more than they affect the burn just because they land a pixel apart at different dimensions."""
+        maxDist = min(self.faceAreaFunc.x[-1], tables[0].x[-1], self.corePerimeterFunc.x[-1], tables[1].x[-1])
+        depths = np.linspace(0, maxDist, self.perimeterSamples)
+        difference = 0
+        for current, other in zip((self.faceAreaFunc, self.corePerimeterFunc), tables):
+            currentValues = current(depths)
+            scale = np.mean(np.abs(currentValues))
+            if scale > 0:
+                difference = max(difference, np.mean(np.abs(currentValues - other(depths))) / scale)
+        return difference
+
+    def selectMapDim(self, featurePixels, maxDim, tolerance):
+        """Sets up the grain at the smallest map dimension that resolves it. The search starts at the dimension from
+        'getFeatureMapDim', and the tables are compared against the ones from a map half as large. While they differ
+        by more than 'tolerance' according to 'getTableDifference', the dimension is doubled, up to 'maxDim'. Each step
+        reuses the previous step's tables, so only the first check needs an extra map. If the search would start at
+        'maxDim', the grain is set up there without any check. The dimension that is picked is left in self.mapDim."""
+        mapDim = self.getFeatureMapDim(featurePixels, maxDim)
+        if mapDim >= maxDim:
+            self.setupMap(mapDim)
+            return
+        self.setupMap(max(mapDim // 2, 64))
+        while True:
+            previous = (self.faceAreaFunc, self.corePerimeterFunc)
+            self.setupMap(mapDim)
+            if mapDim >= maxDim or self.getTableDifference(previous) <= tolerance:
+                return
+            mapDim = min(mapDim * 2, maxDim)
+
+    def compactRegressionData(self, storage):
+        """Frees the arrays that are only needed to generate the regression map and its tables, which is all that the
+        simulation uses. 'storage' picks what is kept of the regression map itself: 'Full' keeps it and the solved
+        domain as they are, 'Quantized' stores the map as 16 bit integers and 'Tables only' drops it. The map is only
+        used to measure the perimeter when self.exactPerimeter is set, so with 'Tables only' the perimeter table is
+        always used. Maps that were worked on out of core only exist to build the tables, so they are always dropped
+        along with their files."""
+        self.mapX, self.mapY, self.coreMap = None, None, None
+        self.quantizedMap = None
+        if self.outOfCore:
+            storage = 'Tables only'
+        if storage == 'Full':
+            return
+
+        regressionMap = self.regressionMap
+        self.regressionMap, self.mask = None, None
+        self.domainMap, self.domainValid, self.domainContourMask = None, None, None
+        self.domainOffset, self.domainSector, self.domainScale = (0, 0), None, 1
+        self.coreBandMap = None
+        if storage == 'Quantized':
+            data = np.ma.getdata(regressionMap)
+            valid = np.logical_not(np.ma.getmaskarray(regressionMap))
+            low, high = np.amin(data[valid]), np.amax(data[valid])
+            self.quantizedRange = (low, high)
+            # The largest value marks pixels outside of the grain
+            steps = np.iinfo(np.uint16).max - 1
+            self.quantizedMap = np.full(data.shape, steps + 1, dtype=np.uint16)
+            self.quantizedMap[valid] = np.rint((data[valid] - low) * (steps / (high - low)))
+        self.releaseMappedMaps()
+
+    def getStoredRegressionMap(self):
+        """Returns the regression map, rebuilding it from the quantized copy if needed. Returns None if the map was
+        dropped by 'compactRegressionData'."""
+        if self.regressionMap is not None or self.quantizedMap is None:
+            return self.regressionMap
+        low, high = self.quantizedRange
+        steps = np.iinfo(np.uint16).max - 1
+        outside = self.quantizedMap > steps
+        regressionMap = low + (np.minimum(self.quantizedMap, steps) * ((high - low) / steps))
+        return np.ma.MaskedArray(regressionMap, outside)
+
+    def getSymmetry(self):
+        """Returns a tuple (order, angle) if the grain's cross section has 'order' mirror lines through the center of
+        the map, evenly spaced starting at 'angle' radians from the map's x axis. The regression only has to be solved
+        in the wedge between two neighbouring mirror lines, so subclasses should override this when their geometry
+        allows it. An order of 1 means a single mirror line, in which case half of the map is solved. Returns None if
+        the whole map has to be solved."""
+        return None
+
+    def solvesWholeMap(self):
+        """Returns True if setting the grain up runs the regression solver on the whole map at once, which happens when
+        it has no symmetry to use. Working out of core doesn't help these grains much, as the solver holds the whole map
+        in memory either way."""
+        return (self.getSymmetry() if self.useSymmetry else None) is None
+
+    def getNormalizedShape(self):
+        """Returns a dictionary describing the grain's cross section, with lengths divided by the grain diameter.
+        Grains with the same normalized shape have the same regression map. Properties that don't affect the cross
+        section, like length, are left out."""
+        diameter = self.props['diameter'].getValue()
+        shape = {}
+        for name, prop in self.props.items():
+            if name in ('diameter', 'length', 'inhibitedEnds'):
+                continue
+            value = prop.getValue()
+            if isinstance(prop, FloatProperty) and prop.unit == 'm':
+                value = round(value / diameter, 12) # Rounding hides floating point noise in the division
+            shape[name] = value
+        return shape
+
+    def getRegressionMapKey(self):
+        """Returns a key that identifies the regression map and tables this grain would generate at its current map
+        dimension."""
+        symmetry = self.getSymmetry() if self.useSymmetry else None
+        extra = [self.perimeterSamples, symmetry, self.regressionSolver]
+        if self.outOfCore:
+            extra.append('Out of core') # These entries don't include the regression map
+        return regressionCache.getShapeKey(self.geomName, self.getNormalizedShape(), self.mapDim, extra)
+
     def generateRegressionMap(self):
         """Uses the fast marching method to generate an image of how the grain regresses from the core map. The map
-        is stored under self.regressionMap."""
-        masked = np.ma.MaskedArray(self.coreMap, self.mask)
-        cellSize = 1 / self.mapDim
-        self.regressionMap = skfmm.distance(masked, dx=cellSize) * 2
-        maxDist = np.amax(self.regressionMap)
+        is stored under self.regressionMap. Maps that have already been solved for a grain with the same normalized
+        shape are loaded from the regression caches instead."""
+        key = self.getRegressionMapKey()
+        cached = regressionCache.loadTables(key)
+        if cached is not None:
+            self.applyRegressionTables(cached)
+            return
+
+        self.solveRegressionMap()
+        maxDist = max(np.amax(np.ma.getdata(self.domainMap[rows])[self.domainValid[rows]], initial=0)
+                      for rows in self.getMapBands(self.domainMap.shape[0]))
         self.wallWeb = self.unNormalize(maxDist)
-        faceArea = []
-        polled = []
-        valid = np.logical_not(self.mask)
-        for i in range(int(maxDist * self.mapDim) + 2):
-            polled.append(i / self.mapDim)
-            faceArea.append(self.mapToArea(np.count_nonzero(np.logical_and(self.regressionMap > (i / self.mapDim), valid))))
-        self.faceArea = savgol_filter(faceArea, 31, 5)
+        polled = [i / self.mapDim for i in range(int(maxDist * self.mapDim) + 2)]
+        faceArea = self.mapToArea(self.countPixelsBeyond(polled))
+        # Small maps of thin webs can have fewer depths than the filter window, so it is shrunk to fit
+        window = min(31, len(polled) - 1 + (len(polled) % 2))
+        self.faceArea = savgol_filter(faceArea, window, 5) if window > 5 else faceArea
         self.faceAreaFunc = interpolate.interp1d(polled, self.faceArea)
+        self.generatePerimeterTable(polled)
 
-    def getCorePerimeter(self, regDist):
-        mapDist = self.normalize(regDist)
+        regressionCache.saveTables(key, self.getRegressionTables())
+
+    def solveRegressionMap(self):
+        """Runs the regression solver on the core map. If the grain is symmetric, only a wedge between two of its mirror
+        lines is solved, with a few pixels of margin past each line. Pixels outside of the wedge and margin are masked,
+        so the mirror lines act as reflective boundaries. The solved region is kept in self.domainMap, with its position
+        in the full map in self.domainOffset. self.domainValid marks the pixels that belong to the wedge itself, which
+        are what the face area and perimeter tables are measured from before being multiplied by self.domainScale. The
+        full regression map is then rebuilt from the wedge by rotation and reflection. The distances near the core
+        come from 'solveCoreBand' instead, as the wedge only holds one of the ways that the core's edge lines up with
+        the pixels.
+
+        When working out of core, the solved region still has to fit in memory. For symmetric grains, the full map isn't
+        rebuilt, as only the tables are kept. Otherwise, the whole map is solved in memory (see 'solvesWholeMap'), and
+        the result is moved into a memory-mapped file so that the tables can be built from it in bands."""
+        cellSize = 1 / self.mapDim
+        solver = regressionSolvers[self.regressionSolver]
+        symmetry = self.getSymmetry() if self.useSymmetry else None
+        if symmetry is None:
+            self.regressionMap = solver(self.coreMap, self.mask, cellSize) * 2
+            if self.outOfCore:
+                mappedMap = self.createMappedArray('regressionMap', np.float64)
+                mappedMap[:] = np.ma.getdata(self.regressionMap)
+                self.regressionMap = np.ma.MaskedArray(mappedMap, self.mask)
+            self.setFullDomain()
+            return
+
+        order, angle = symmetry
+        sweep = np.pi / order
+        # Find the window that holds the wedge, one band of rows at a time
+        domainRows = np.zeros(self.mapDim, dtype=bool)
+        domainCols = np.zeros(self.mapDim, dtype=bool)
+        for rows in self.getMapBands():
+            mapX, mapY, mask = geometry.mapGridWindow(self.mapDim, (rows, slice(None)))
+            inDomain = getWedgeMask(mapX, mapY, mask, self.mapDim, angle, sweep)
+            domainRows[rows] = np.any(inDomain, axis=1)
+            domainCols |= np.any(inDomain, axis=0)
+        rows = np.nonzero(domainRows)[0]
+        cols = np.nonzero(domainCols)[0]
+        window = (slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1))
+        mapX, mapY, mask = geometry.mapGridWindow(self.mapDim, window)
+        inDomain = getWedgeMask(mapX, mapY, mask, self.mapDim, angle, sweep)
+
+        # skfmm doesn't handle views into larger arrays, so the window is copied out
+        domainCore = np.array(self.coreMap[window], dtype=np.float64)
+        self.domainMap = solver(domainCore, np.logical_not(inDomain), cellSize) * 2
+        self.domainOffset = (rows[0], cols[0])
+        sectorAngle = np.mod(np.arctan2(mapY, mapX) - angle, 2 * np.pi)
+        self.domainValid = np.logical_and(sectorAngle < sweep, np.logical_not(mask))
+        self.domainContourMask = inDomain
+        self.domainSector = (angle, sweep)
+        self.domainScale = 2 * order
+        self.solveCoreBand()
+        self.regressionMap = None if self.outOfCore else self.unfoldDomainMap()
+
+    def setFullDomain(self):
+        """Marks the whole regression map as the solved domain."""
+        self.domainMap = self.regressionMap
+        self.domainOffset = (0, 0)
+        self.domainValid = np.logical_not(self.mask)
+        self.domainContourMask = None
+        self.domainSector = None
+        self.domainScale = 1
+        self.coreBandMap = None
+
+    def solveCoreBand(self):
+        """Solves the whole map, but only out to a little past self.coreBandPixels pixels from the core, and keeps the
+        result in self.coreBandMap. Near the core, the regression depends on exactly which pixels the core covers, and
+        that is different in each copy of a symmetric grain's wedge. Scaling up one wedge gets the perimeter and port
+        area at ignition wrong by a few percent, which matters for the peak mass flux, so the tables use this band
+        for the depths it covers. Within the band, the distances are the same as the ones that solving the whole map
+        would give, and they are capped at the edge of the band.
 
+        The band only covers a window around the core, which starts at self.coreBandOffset in the full map. The number
+        of unmasked pixels outside of the window, which are all past the band, is kept in self.coreBandOutside. When
+        working out of core, the window is solved one band of rows at a time, each with enough extra rows around it
+        for the front to reach every pixel in the band from the core."""
+        cellSize = 1 / self.mapDim
+        limit = (self.coreBandPixels + 2) * cellSize # In the solver's units, which are half of the map's
+        margin = self.coreBandPixels + 4
+        coreRows = np.zeros(self.mapDim, dtype=bool)
+        coreCols = np.zeros(self.mapDim, dtype=bool)
+        unmasked = 0
+        for rows in self.getMapBands():
+            # Like the solvers, anything that isn't positive is core
+            core = np.logical_and(np.logical_not(self.coreMap[rows] > 0), np.logical_not(self.mask[rows]))
+            coreRows[rows] = np.any(core, axis=1)
+            coreCols |= np.any(core, axis=0)
+            unmasked += np.count_nonzero(np.logical_not(self.mask[rows]))
+        rows = np.nonzero(coreRows)[0]
+        cols = np.nonzero(coreCols)[0]
+        top, bottom = max(rows[0] - margin, 0), min(rows[-1] + margin + 1, self.mapDim)
+        left, right = max(cols[0] - margin, 0), min(cols[-1] + margin + 1, self.mapDim)
+        shape = (bottom - top, right - left)
+        self.coreBandMap = self.createMappedArray('coreBand', np.float64, shape) if self.outOfCore else np.empty(shape)
+        self.coreBandOffset = (top, left)
+        self.coreBandOutside = unmasked
+
+        for rows in self.getMapBands(shape[0]):
+            start, stop = max(rows.start - margin, 0), min(rows.stop + margin, shape[0])
+            window = (slice(top + start, top + stop), slice(left, right))
+            coreMap = np.array(self.coreMap[window], dtype=np.float64)
+            mask = np.array(self.mask[window])
+            try:
+                if self.regressionSolver == 'Distance transform':
+                    band = np.ma.getdata(solveDistanceTransform(coreMap, mask, cellSize))
+                else:
+                    solved = solveFastMarching(coreMap, mask, cellSize, narrow=limit)
+                    band = np.ma.getdata(solved).copy()
+                    unreached = np.logical_and(np.ma.getmaskarray(solved), np.logical_not(mask))
+                    band[np.logical_and(unreached, coreMap > 0)] = limit
+            except ValueError: # Rows without any core nearby are all past the band
+                band = np.full(coreMap.shape, limit)
+            self.coreBandMap[rows] = 2 * np.minimum(band[rows.start - start:rows.stop - start], limit)
+            self.coreBandOutside -= np.count_nonzero(np.logical_not(mask[rows.start - start:rows.stop - start]))
+
+    def getCoreBandDepth(self):
+        """Returns the regression depth, in normalized map units, up to which the tables come from self.coreBandMap."""
+        return 2 * self.coreBandPixels / self.mapDim
+
+    def unfoldDomainMap(self):
+        """Builds the full regression map from the solved wedge by folding every pixel's angle back into the wedge and
+        sampling the wedge there."""
+        angle, sweep = self.domainSector
+        # Fill the masked pixels around the wedge with their nearest solved value so interpolation near the edges of
+        # the wedge and the casting tube doesn't pick up anything else
+        domainMask = np.ma.getmaskarray(self.domainMap)
+        nearest = ndimage.distance_transform_edt(domainMask, return_distances=False, return_indices=True)
+        filled = np.ma.getdata(self.domainMap)[tuple(nearest)]
+
+        radius = (self.mapX ** 2 + self.mapY ** 2) ** 0.5
+        folded = np.mod(np.arctan2(self.mapY, self.mapX) - angle, 2 * sweep)
+        folded = angle + np.where(folded > sweep, (2 * sweep) - folded, folded)
+        rows = ((radius * np.sin(folded)) + 1) * (self.mapDim - 1) / 2 - self.domainOffset[0]
+        cols = ((radius * np.cos(folded)) + 1) * (self.mapDim - 1) / 2 - self.domainOffset[1]
+        unfolded = ndimage.map_coordinates(filled, [rows, cols], order=1, mode='nearest')
+        # Use the band around the core where it has a value, so the map matches a solve of the whole map there
+        top, left = self.coreBandOffset
+        window = (slice(top, top + self.coreBandMap.shape[0]), slice(left, left + self.coreBandMap.shape[1]))
+        inBand = np.logical_and(self.coreBandMap < 2 * (self.coreBandPixels + 2) / self.mapDim,
+                                np.logical_not(self.mask[window]))
+        unfolded[window][inBand] = self.coreBandMap[inBand]
+        return np.ma.MaskedArray(unfolded, self.mask)
+
+    def getRegressionTables(self):
+        """Returns the regression map and the tables derived from it as a dictionary of arrays in map units, so they
+        can be applied to any grain with the same normalized shape. The map is stored in single precision, as it is only
+        used for previews and validation once the tables are built. Grains that work out of core leave the map out."""
+        tables = {
+            'maxDist': np.array(self.normalize(self.wallWeb)),
+            'faceAreaDepths': np.array(self.faceAreaFunc.x),
+            'faceArea': self.areaToMap(self.faceArea),
+            'perimeterDepths': np.array(self.corePerimeterFunc.x),
+            'corePerimeter': self.lengthToMap(self.corePerimeter)
+        }
+        if not self.outOfCore:
+            tables['regressionMap'] = np.ma.getdata(self.regressionMap).astype(np.float32)
+        return tables
+
+    def applyRegressionTables(self, tables):
+        """Restores the regression map and derived tables from a dictionary produced by 'getRegressionTables',
+        scaling them to this grain's diameter."""
+        self.regressionMap = None
+        if 'regressionMap' in tables:
+            self.regressionMap = np.ma.MaskedArray(tables['regressionMap'].astype(np.float64), self.mask)
+        self.setFullDomain()
+        self.wallWeb = self.unNormalize(float(tables['maxDist']))
+        self.faceArea = self.mapToArea(tables['faceArea'])
+        self.faceAreaFunc = interpolate.interp1d(tables['faceAreaDepths'], self.faceArea)
+        self.corePerimeter = self.mapToLength(tables['corePerimeter'])
+        self.corePerimeterFunc = interpolate.interp1d(tables['perimeterDepths'], self.corePerimeter)
+
+    def getGeometryBreakpoints(self):
+        # The face area and core perimeter are interpolated linearly between the depths of their tables, so their
+        # slopes change at every one of them
+        tables = [func.x for func in (self.faceAreaFunc, self.corePerimeterFunc) if func is not None]
+        if len(tables) == 0:
+            return []
+        return list(self.unNormalize(np.unique(np.concatenate(tables))))
+
+    def countPixelsBeyond(self, depths):
+        """Returns an array with the number of unmasked pixels in the regression map that are strictly further than
+        each of 'depths' from the core. All depths are answered from a single sort of the map rather than one full
+        pass over it per depth. For symmetric grains, the pixels in the solved wedge are counted and scaled up, except
+        at the depths that self.coreBandMap covers, which are counted there. The wedge's counts are scaled to match the
+        band's where the two meet. When working out of core, each band of rows is sorted and counted separately."""
+        depths = np.asarray(depths)
+        if self.coreBandMap is not None:
+            bandDepth = self.getCoreBandDepth()
+            near = depths < bandDepth
+            depths = np.append(depths, bandDepth)
+        count = np.zeros(len(depths), dtype=int)
+        for rows in self.getMapBands(self.domainMap.shape[0]):
+            distances = np.sort(np.ma.getdata(self.domainMap[rows])[self.domainValid[rows]], axis=None)
+            count += distances.size - np.searchsorted(distances, depths, side='right')
+        count = self.domainScale * count
+        if self.coreBandMap is None:
+            return count
+
+        bandCount = np.full(np.count_nonzero(near) + 1, self.coreBandOutside)
+        top, left = self.coreBandOffset
+        for rows in self.getMapBands(self.coreBandMap.shape[0]):
+            window = (slice(top + rows.start, top + rows.stop), slice(left, left + self.coreBandMap.shape[1]))
+            _, _, mask = geometry.mapGridWindow(self.mapDim, window)
+            distances = np.sort(np.asarray(self.coreBandMap[rows])[np.logical_not(mask)], axis=None)
+            bandCount += distances.size - np.searchsorted(distances, depths[np.append(near, True)], side='right')
+        scale = bandCount[-1] / count[-1] if count[-1] > 0 else 1
+        count = count[:-1] * scale
+        count[near] = bandCount[:-1]
+        return count
+
+    def generatePerimeterTable(self, polled):
+        """Measures the core perimeter at up to self.perimeterSamples of the regression depths that the face area table
+        was built from, so 'getCorePerimeter' can interpolate rather than contouring the map every timestep. A third
+        of the samples are spread evenly, and the rest are placed one at a time in the middle of whichever interval
+        the linear interpolation is most likely to be off in, judged by how much the slope changes at its ends. This
+        puts them around sharp changes in the perimeter, such as the core reaching the casting tube, without contouring
+        the map more often than the samples allow. The last depth is always included, as it lies past burnout and
+        anchors the table at 0."""
+        last = len(polled) - 1
+        stride = max(1, -(-last // max(self.perimeterSamples // 3, 1)))
+        indices = sorted(set(range(0, last, stride)) | {last})
+        perimeters = {i: self.measureCorePerimeter(polled[i]) for i in indices}
+
+        while len(indices) < self.perimeterSamples:
+            depths = np.array([polled[i] for i in indices])
+            values = np.array([perimeters[i] for i in indices])
+            slopes = np.diff(values) / np.diff(depths)
+            bends = np.abs(np.diff(slopes))
+            # The error from a change of slope at either end of an interval grows with the interval's width
+            error = np.zeros(len(slopes))
+            error[:-1] += bends
+            error[1:] += bends
+            error *= np.diff(depths)
+            error[np.diff(indices) < 2] = -1 # Intervals between neighbouring depths can't be split
+            worst = int(np.argmax(error))
+            if error[worst] <= 0:
+                break
+            middle = (indices[worst] + indices[worst + 1]) // 2
+            perimeters[middle] = self.measureCorePerimeter(polled[middle])
+            indices.insert(worst + 1, middle)
+
+        self.corePerimeter = np.array([perimeters[i] for i in indices])
+        self.corePerimeterFunc = interpolate.interp1d([polled[i] for i in indices], self.corePerimeter)
+
+    def measureCorePerimeter(self, mapDist):
+        """Returns the length of the regression map's contours at 'mapDist', which is in normalized map units. For
+        symmetric grains, only the contours in the solved wedge are measured and the result is scaled up, unless
+        'mapDist' is close enough to the core for self.coreBandMap to cover it."""
         corePerimeter = 0
-        contours = measure.find_contours(self.regressionMap, mapDist, fully_connected='low')
+        if self.coreBandMap is not None and mapDist < self.getCoreBandDepth():
+            if self.outOfCore:
+                return self.measureMappedCorePerimeter(mapDist, self.coreBandMap, self.coreBandOffset)
+            for contour in measure.find_contours(self.coreBandMap, mapDist, fully_connected='low'):
+                contour += self.coreBandOffset
+                corePerimeter += self.mapToLength(geometry.length(contour, self.mapDim))
+            return corePerimeter
+        if self.domainSector is None and self.outOfCore:
+            return self.measureMappedCorePerimeter(mapDist, np.ma.getdata(self.regressionMap))
+        if self.domainSector is None:
+            contours = measure.find_contours(self.getStoredRegressionMap(), mapDist, fully_connected='low')
+            for contour in contours:
+                corePerimeter += self.mapToLength(geometry.length(contour, self.mapDim))
+            return corePerimeter
+
+        contours = measure.find_contours(np.ma.getdata(self.domainMap), mapDist, fully_connected='low',
+                                         mask=self.domainContourMask)
         for contour in contours:
-            corePerimeter += self.mapToLength(geometry.length(contour, self.mapDim))
+            contour += self.domainOffset
+            corePerimeter += self.mapToLength(geometry.sectorLength(contour, self.mapDim, *self.domainSector))
+        return corePerimeter * self.domainScale
 
+    def measureMappedCorePerimeter(self, mapDist, regressionMap, offset=(0, 0)):
+        """Measures the core perimeter like 'measureCorePerimeter', but contours a memory-mapped regression map one band
+        of rows at a time. 'offset' is the position of the map's first pixel in the full map, for maps that only cover
+        part of it. Each band shares its last row with the next one so every square of pixels is contoured once.
+        Contours that cross between bands are split into pieces, so they are all measured as open paths. Closed contours
+        end on their first point, so this doesn't change their length."""
+        corePerimeter = 0
+        for rows in self.getMapBands(regressionMap.shape[0]):
+            band = np.array(regressionMap[rows.start:rows.stop + 1])
+            for contour in measure.find_contours(band, mapDist, fully_connected='low'):
+                contour[:, 0] += rows.start
+                contour += offset
+                corePerimeter += self.mapToLength(geometry.length(contour, self.mapDim, closed=False))
         return corePerimeter
 
+    def getCorePerimeter(self, regDist):
+        mapDist = self.normalize(regDist)
+        if self.exactPerimeter and (self.regressionMap is not None or self.quantizedMap is not None):
+            return self.measureCorePerimeter(mapDist)
+        if mapDist >= self.corePerimeterFunc.x[-1]:
+            return 0 # Past burnout
+        return float(self.corePerimeterFunc(mapDist))
+
     def getFaceArea(self, regDist):
         mapDist = self.normalize(regDist)
-        index = int(mapDist * self.mapDim)
-        if index >= len(self.faceArea) - 1:
+        if mapDist >= self.faceAreaFunc.x[-1]:
             return 0 # Past burnout
         return self.faceAreaFunc(mapDist)
 
@@ -322,13 +952,291 @@ class FmmGrain(PerforatedGrain):
                 regressionMap[np.where(self.coreMap == 0)] = regmax # Make the core black
             regressionMap = np.ma.MaskedArray(regressionMap, self.mask)
 
-            for dist in np.linspace(0, regmax, numContours):
-                contours.append([])
-                contourLengths[dist] = 0
-                layerContours = measure.find_contours(self.regressionMap, dist, fully_connected='low')
-                for contour in layerContours:
-                    contours[-1].append(geometry.clean(contour, self.mapDim, 3))
-                    contourLengths[dist] += geometry.length(contour, self.mapDim)
+            levels = np.linspace(0, regmax, numContours)
+            layers, contourLengths = geometry.getContourLevels(self.regressionMap, levels, self.mapDim, 'low')
+            contours = [[geometry.clean(contour, self.mapDim, 3) for contour in layer] for layer in layers]
+
+        except ValueError as exc: # If there aren't any contours, do nothing
+            print(exc)
+
+        return (masked, regressionMap, contours, contourLengths)
+
+
+class FmmGrain3D(Grain):
+    """A grain whose cross section can change along its length, like a tapered core or slots that only run part of the
+    way down the grain. Rather than solving one cross section and extruding it like an FmmGrain does, the fast marching
+    method is run on a voxel model of the whole grain, so the core and the ends regress together. The volume, burning
+    surface and propellant area of each slice are measured from the result for every regression depth, and the voxels
+    are dropped once these tables are built. All a subclass has to do is provide an implementation of
+    generateCoreSlice that draws the cross section at any point along the grain."""
+    geomName = 'fmmGrain3D'
+    # The geometry already comes from tables, and the ends and port move a slice at a time, which a GeometryTable would
+    # need a sample at every step of to follow
+    tabulateGeometry = False
+    def __init__(self):
+        super().__init__()
+        self.props['inhibitedEnds'] = EnumProperty('Inhibited ends', ['Neither', 'Top', 'Bottom', 'Both'])
+        self.voxelDim = 100 # Number of voxels across the grain's diameter
+        self.useSymmetry = True # If set, only the voxels in the part of the grain that 'getSymmetry' says is unique
+        self.mapX, self.mapY = None, None
+        self.coreMap = None # The cross section that 'generateCoreSlice' is drawing
+        self.coreVolume = None
+        self.volumeMask = None
+        self.regressionVolume = None
+        self.domainValid = None # The voxels in each slice that the tables are measured from
+        self.domainScale = 1
+        self.wallWeb = 0 # Regression depth at which the last of the propellant burns
+        self.volumeFunc = None
+        self.surfaceAreaFunc = None
+        self.sliceAreaFunc = None # Area of propellant in each slice of the grain
+        self.upstreamVolumeFunc = None # Volume of propellant between the forward face and the aft end of each slice
+
+    def normalize(self, value):
+        """Transforms real unit quantities into self.mapX, self.mapY coordinates. For use in generateCoreSlice."""
+        return value / (0.5 * self.props['diameter'].getValue())
+
+    @abstractmethod
+    def generateCoreSlice(self, position):
+        """Use self.mapX and self.mapY to draw the grain's cross section 'position' meters from its forward face into
+        self.coreMap. As in FmmGrain.generateCoreMap, the casting tube has a radius of 1 and pixels that are part of the
+        core are set to 0, while the propellant is left at 1."""
+
+    def getSymmetry(self):
+        """Returns a tuple (order, angle) if every cross section of the grain has the mirror lines described in
+        FmmGrain.getSymmetry, so only a wedge of the grain has to be solved. Returns None otherwise."""
+        return None
+
+    def getVoxelSize(self):
+        """Returns a tuple of the axial and radial size of the voxels in meters. The pixels of each slice are as far
+        apart as the ones in geometry.mapGrid, and the grain is split into however many slices makes the voxels closest
+        to cubes."""
+        length = self.props['length'].getValue()
+        radialSize = self.props['diameter'].getValue() / (self.voxelDim - 1)
+        numSlices = max(int(round(length / radialSize)), 2)
+        return length / numSlices, radialSize
+
+    def getSlicePositions(self):
+        """Returns the distance from the forward face to the center of each slice of the voxel model."""
+        axialSize, _ = self.getVoxelSize()
+        numSlices = int(round(self.props['length'].getValue() / axialSize))
+        return (np.arange(numSlices) + 0.5) * axialSize
+
+    def generateCoreVolume(self):
+        """Builds self.coreVolume, a single precision voxel model of the grain with a slice for each position from
+        'getSlicePositions'. An extra slice is added past each end, which is core if that end is exposed and masked if
+        it is inhibited. self.volumeMask masks these and any voxels outside of the casting tube. For symmetric grains,
+        only the voxels in a window around the wedge from 'getSymmetry' are kept, and the ones outside of the wedge and
+        its margin are masked like in FmmGrain.solveRegressionMap. self.domainValid marks the pixels of each slice that
+        belong to the wedge."""
+        mapX, mapY, mask = geometry.mapGrid(self.voxelDim)
+        window = (slice(None), slice(None))
+        self.domainValid = np.logical_not(mask)
+        self.domainScale = 1
+        symmetry = self.getSymmetry() if self.useSymmetry else None
+        if symmetry is not None:
+            order, angle = symmetry
+            sweep = np.pi / order
+            inDomain = getWedgeMask(mapX, mapY, mask, self.voxelDim, angle, sweep)
+            rows = np.nonzero(np.any(inDomain, axis=1))[0]
+            cols = np.nonzero(np.any(inDomain, axis=0))[0]
+            window = (slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1))
+            sectorAngle = np.mod(np.arctan2(mapY, mapX) - angle, 2 * np.pi)
+            self.domainValid = np.logical_and(sectorAngle < sweep, self.domainValid)
+            self.domainScale = 2 * order
+            mask = np.logical_not(inDomain)
+        self.mapX, self.mapY = mapX[window], mapY[window]
+        self.domainValid = self.domainValid[window]
+
+        positions = self.getSlicePositions()
+        self.coreVolume = np.ones((len(positions) + 2,) + self.mapX.shape, dtype=np.float32)
+        for index, position in enumerate(positions):
+            self.coreMap = np.ones(self.mapX.shape)
+            self.generateCoreSlice(position)
+            self.coreVolume[index + 1] = self.coreMap
+        self.mapX, self.mapY, self.coreMap = None, None, None
+
+        self.volumeMask = np.repeat(mask[window][np.newaxis], len(positions) + 2, axis=0)
+        inhibitedEnds = self.props['inhibitedEnds'].getValue()
+        for end, inhibited in ((0, inhibitedEnds in ('Top', 'Both')), (-1, inhibitedEnds in ('Bottom', 'Both'))):
+            if inhibited:
+                self.volumeMask[end] = True
+            else:
+                # A value of zero would put the front on the extra slice rather than halfway to the end of the grain
+                self.coreVolume[end] = -1
+
+    def solveRegressionVolume(self):
+        """Runs the fast marching method on the voxel model. The voxel sizes are passed in meters, so
+        self.regressionVolume holds the regression depth of each slice's voxels directly. It is stored in single
+        precision and leaves out the slices added past the ends."""
+        axialSize, radialSize = self.getVoxelSize()
+        distance = solveFastMarching(self.coreVolume, self.volumeMask, [axialSize, radialSize, radialSize])
+        self.regressionVolume = np.ma.getdata(distance)[1:-1].astype(np.float32)
+
+    def measureRegressionTables(self):
+        """Returns the regression tables of the grain as a dictionary of arrays. The propellant area of each slice is
+        measured at regression depths one voxel apart, using a single sort of the slice like FmmGrain.countPixelsBeyond.
+        The volume is the sum of the slices, and the burning surface area is the rate at which the volume shrinks. The
+        volume of propellant from the forward face to the aft end of each slice is also kept for the mass flux.
+
+        Counting whole voxels makes the volume drop in irregular steps, so each voxel is instead treated as burning
+        away linearly over the voxel's width around its regression distance. This keeps the burning area within a few
+        percent of the exact value without a smoothing filter, which would also blur the moment that an exposed end
+        face passes through a slice and overestimate the mass flux at the start of the burn."""
+        numSlices = self.regressionVolume.shape[0]
+        axialSize, radialSize = self.getVoxelSize()
+        maxDist = np.amax(self.regressionVolume[:, self.domainValid])
+        step = min(axialSize, radialSize)
+        depths = step * np.arange(int(maxDist / step) + 2)
+        rampStart = depths - (step / 2)
+        rampEnd = depths + (step / 2)
+
+        sliceArea = np.zeros((len(depths), numSlices))
+        for index, distances in enumerate(self.regressionVolume):
+            distances = np.sort(distances[self.domainValid], axis=None).astype(np.float64)
+            distances = distances[np.searchsorted(distances, 0, side='right'):] # Drop the core
+            totals = np.concatenate(([0], np.cumsum(distances)))
+            startIndex = np.searchsorted(distances, rampStart, side='right')
+            endIndex = np.searchsorted(distances, rampEnd, side='right')
+            burning = (totals[endIndex] - totals[startIndex] - ((endIndex - startIndex) * rampStart)) / step
+            sliceArea[:, index] = distances.size - endIndex + burning
+        sliceArea *= self.domainScale * (radialSize ** 2)
+        upstreamVolume = np.cumsum(sliceArea, axis=1) * axialSize
+        volume = upstreamVolume[:, -1].copy()
+
+        surfaceArea = np.maximum(-np.gradient(volume, step), 0)
+        surfaceArea[-1] = 0 # The last depth is past burnout
+
+        return {
+            'maxDist': np.array(maxDist, dtype=np.float64),
+            'depths': depths,
+            'volume': volume,
+            'surfaceArea': surfaceArea,
+            'sliceArea': sliceArea,
+            'upstreamVolume': upstreamVolume
+        }
+
+    def applyRegressionTables(self, tables):
+        """Sets up the interpolation functions that the simulation uses from a dictionary made by
+        'measureRegressionTables'."""
+        self.wallWeb = float(tables['maxDist'])
+        self.volumeFunc = interpolate.interp1d(tables['depths'], tables['volume'])
+        self.surfaceAreaFunc = interpolate.interp1d(tables['depths'], tables['surfaceArea'])
+        self.sliceAreaFunc = interpolate.interp1d(tables['depths'], tables['sliceArea'], axis=0)
+        self.upstreamVolumeFunc = interpolate.interp1d(tables['depths'], tables['upstreamVolume'], axis=0)
+
+    def getRegressionTablesKey(self):
+        """Returns a key that identifies the tables this grain would generate. Unlike the keys of FmmGrains, the tables
+        are in meters, so the key includes every property."""
+        symmetry = self.getSymmetry() if self.useSymmetry else None
+        return regressionCache.getShapeKey(self.geomName, self.getProperties(), self.voxelDim, [symmetry, 'Voxels'])
+
+    def simulationSetup(self, config):
+        self.voxelDim = config.getProperty('voxelDim')
+        key = self.getRegressionTablesKey()
+        tables = regressionCache.loadTables(key)
+        if tables is None:
+            self.generateCoreVolume()
+            self.solveRegressionVolume()
+            tables = self.measureRegressionTables()
+            self.coreVolume, self.volumeMask, self.regressionVolume, self.domainValid = None, None, None, None
+            regressionCache.saveTables(key, tables)
+        self.applyRegressionTables(tables)
+
+    def getVolumeAtRegression(self, regDist):
+        if regDist >= self.volumeFunc.x[-1]:
+            return 0 # Past burnout
+        return float(self.volumeFunc(regDist))
+
+    def getSurfaceAreaAtRegression(self, regDist):
+        if regDist >= self.surfaceAreaFunc.x[-1]:
+            return 0 # Past burnout
+        return float(self.surfaceAreaFunc(regDist))
+
+    def getSliceAreas(self, regDist):
+        """Returns an array with the area of propellant left in each slice of the grain, from forward to aft, after it
+        has regressed a distance of 'regDist'."""
+        if regDist >= self.sliceAreaFunc.x[-1]:
+            return np.zeros(self.sliceAreaFunc.y.shape[1])
+        return self.sliceAreaFunc(regDist)
+
+    def getWebLeft(self, regDist):
+        return self.wallWeb - regDist
+
+    def getEndPositions(self, regDist):
+        """Returns the positions of the forward and aft edges of the first and last slices that still have propellant
+        in them. Once the grain has burned out, both ends are placed at its middle."""
+        sliceAreas = self.getSliceAreas(regDist)
+        sliceLength = self.props['length'].getValue() / len(sliceAreas)
+        burning = np.nonzero(sliceAreas > 0)[0]
+        if len(burning) == 0:
+            return (self.props['length'].getValue() / 2, self.props['length'].getValue() / 2)
+        return (burning[0] * sliceLength, (burning[-1] + 1) * sliceLength)
+
+    def getPortArea(self, regDist):
+        """Returns the area of the port in the aft-most slice that still has propellant in it."""
+        sliceAreas = self.getSliceAreas(regDist)
+        burning = np.nonzero(sliceAreas > 0)[0]
+        aftArea = sliceAreas[burning[-1]] if len(burning) > 0 else 0
+        return geometry.circleArea(self.props['diameter'].getValue()) - aftArea
+
+    def getUpstreamVolumes(self, regDist):
+        """Returns an array with the volume of propellant between the forward face and the aft end of each slice after
+        the grain has regressed a distance of 'regDist'."""
+        if regDist >= self.upstreamVolumeFunc.x[-1]:
+            return np.zeros(self.upstreamVolumeFunc.y.shape[1])
+        return self.upstreamVolumeFunc(regDist)
+
+    def getSliceMassFluxes(self, massIn, dTime, regDist, dRegDist, density):
+        """Returns an array with the mass flux through the port of each slice. The mass flow there is the flow into the
+        grain plus the propellant that burns in the slices before it during the timestep, which flows through the port
+        left after the step. The slice's own propellant isn't counted, so gas from an exposed aft face doesn't count as
+        passing through the port, like in PerforatedGrain.getMassFlux. Slices without a port are left at 0."""
+        upstream = self.getUpstreamVolumes(regDist) - self.getUpstreamVolumes(regDist + dRegDist)
+        burned = np.concatenate(([0], upstream[:-1]))
+        massFlow = massIn + (burned * density / dTime)
+        portArea = geometry.circleArea(self.props['diameter'].getValue()) - self.getSliceAreas(regDist + dRegDist)
+        return np.divide(massFlow, portArea, out=np.zeros(len(portArea)), where=portArea > 0)
+
+    def getMassFlux(self, massIn, dTime, regDist, dRegDist, position, density):
+        massFluxes = self.getSliceMassFluxes(massIn, dTime, regDist, dRegDist, density)
+        sliceLength = self.props['length'].getValue() / len(massFluxes)
+        index = min(max(int(position / sliceLength), 0), len(massFluxes) - 1)
+        return massFluxes[index]
+
+    def getPeakMassFlux(self, massIn, dTime, regDist, dRegDist, density):
+        """Returns the largest mass flux of any slice, as the narrowest part of the port isn't always at the aft end."""
+        return np.amax(self.getSliceMassFluxes(massIn, dTime, regDist, dRegDist, density))
+
+    def getFaceImage(self, mapDim):
+        """Returns an image of the grain's aft face, which is where the port opens into the nozzle."""
+        self.mapX, self.mapY, mask = geometry.mapGrid(mapDim)
+        self.coreMap = np.ones(self.mapX.shape)
+        self.generateCoreSlice(self.props['length'].getValue())
+        masked = np.ma.MaskedArray(self.coreMap, mask)
+        self.mapX, self.mapY, self.coreMap = None, None, None
+        return masked
+
+    def getRegressionData(self, mapDim, numContours=15, coreBlack=True):
+        """Returns the regression data of the aft face, in the format described in PerforatedGrain.getRegressionData.
+        Solving the whole grain would be too slow for a preview, so the face is regressed as if the grain had the same
+        cross section all the way along."""
+        masked = self.getFaceImage(mapDim)
+        regressionMap = None
+        contours = []
+        contourLengths = {}
+
+        try:
+            solved = solveFastMarching(np.ma.getdata(masked), masked.mask, 1 / mapDim) * 2
+            regmax = np.amax(solved)
+
+            regressionMap = np.ma.getdata(solved).copy()
+            if coreBlack:
+                regressionMap[np.ma.getdata(masked) == 0] = regmax # Make the core black
+            regressionMap = np.ma.MaskedArray(regressionMap, masked.mask)
+
+            levels = np.linspace(0, regmax, numContours)
+            layers, contourLengths = geometry.getContourLevels(solved, levels, mapDim, 'low')
+            contours = [[geometry.clean(contour, mapDim, 3) for contour in layer] for layer in layers]
 
         except ValueError as exc: # If there aren't any contours, do nothing
             print(exc)
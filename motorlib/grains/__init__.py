@@ -9,10 +9,11 @@ from .dGrain import *
 from .rodTube import *
 from .conical import *
 from .custom import *
+from .taperedFinocyl import *
 
 # Generate grain geometry name -> constructor lookup table
 grainTypes = {}
 grainClasses = [BatesGrain, EndBurningGrain, Finocyl, MoonBurner, StarGrain, XCore, CGrain, DGrain, RodTubeGrain,
-                ConicalGrain, CustomGrain]
+                ConicalGrain, CustomGrain, TaperedFinocyl]
 for grainType in grainClasses:
     grainTypes[grainType.geomName] = grainType
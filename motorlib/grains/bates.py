@@ -1,8 +1,6 @@
 """BATES submodule"""
 
 import numpy as np
-import skfmm
-from skimage import measure
 
 from ..grain import PerforatedGrain
 from .. import geometry
@@ -41,12 +39,11 @@ class BatesGrain(PerforatedGrain):
             errors.append(SimAlert(SimAlertLevel.ERROR, SimAlertType.GEOMETRY, aText))
         return errors
 
-    # These two functions have a lot of code reuse, but it is worth it because making BATES an fmmGrain would make it
-    # signficantly way slower
+    # The regression of a BATES grain is simple enough that its regression map and contours can be drawn directly
+    # rather than by running the fast marching method on its face
     def getFaceImage(self, mapDim):
-        mapX, mapY = np.meshgrid(np.linspace(-1, 1, mapDim), np.linspace(-1, 1, mapDim))
-        mask = mapX**2 + mapY**2 > 1
-        coreMap = np.ones_like(mapX)
+        mapX, mapY, mask = geometry.mapGrid(mapDim)
+        coreMap = np.ones(mapX.shape)
 
         # Normalize core diameter
         coreRadius = (self.props['coreDiameter'].getValue() / (0.5 * self.props['diameter'].getValue())) / 2
@@ -59,27 +56,15 @@ class BatesGrain(PerforatedGrain):
 
     def getRegressionData(self, mapDim, numContours=15, coreBlack=True):
         masked = self.getFaceImage(mapDim)
-        regressionMap = None
-        contours = []
-        contourLengths = {}
-
-        try:
-            cellSize = 1 / mapDim
-            regressionMap = skfmm.distance(masked, dx=cellSize) * 2
-            regmax = np.amax(regressionMap)
-            regressionMap = regressionMap[:, :].copy()
-            if coreBlack:
-                regressionMap[np.where(masked == 0)] = regmax # Make the core black
-
-            for dist in np.linspace(0, regmax, numContours):
-                contours.append([])
-                contourLengths[dist] = 0
-                layerContours = measure.find_contours(regressionMap, dist, fully_connected='high')
-                for contour in layerContours:
-                    contours[-1].append(contour)
-                    contourLengths[dist] += geometry.length(contour, mapDim)
+        coreRadius = (self.props['coreDiameter'].getValue() / (0.5 * self.props['diameter'].getValue())) / 2
+        radius, _ = geometry.mapPolar(mapDim)
 
-        except ValueError as exc: # If there aren't any contours, do nothing
-            print(exc)
+        regressionMap = radius - coreRadius
+        regmax = np.amax(regressionMap[np.logical_not(masked.mask)])
+        levels = np.linspace(0, regmax, numContours)
+        contours, contourLengths = geometry.getCircleContourLevels([[coreRadius + dist] for dist in levels], levels,
+                                                                   mapDim)
+        if coreBlack:
+            regressionMap[regressionMap < 0] = regmax # Make the core black
 
-        return (masked, regressionMap, contours, contourLengths)
+        return (masked, np.ma.MaskedArray(regressionMap, masked.mask), contours, contourLengths)
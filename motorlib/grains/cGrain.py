@@ -24,6 +24,13 @@ class CGrain(FmmGrain):
 
         self.coreMap[np.logical_and(np.abs(self.mapY) < slotWidth / 2, self.mapX > slotOffset)] = 0
 
+    def getSymmetry(self):
+        # The cross section is mirrored about the x axis of the map
+        return (1, 0)
+
+    def getMinimumFeatureSize(self):
+        return self.props['slotWidth'].getValue()
+
     def getDetailsString(self, lengthUnit='m'):
         return 'Length: {}'.format(self.props['length'].dispFormat(lengthUnit))
 
@@ -1,8 +1,6 @@
 """BATES submodule"""
 
 import numpy as np
-import skfmm
-from skimage import measure
 from math import atan, cos, sin
 
 from ..grain import Grain
@@ -183,6 +181,39 @@ class ConicalGrain(Grain):
 
         return geometry.circleArea(aftCoreDiameter)
 
+    def getForwardPortArea(self, regDist):
+        """Returns the area of the port at the grain's forward end when it has regressed a distance of 'regDist'"""
+        _, forwardCoreDiameter, _ = self.getFrustumInfo(regDist)
+
+        return geometry.circleArea(forwardCoreDiameter)
+
+    def getFaceImage(self, mapDim):
+        """Returns an image of the grain's aft face, which is where the port opens into the nozzle"""
+        mapX, mapY, mask = geometry.mapGrid(mapDim)
+        coreMap = np.ones(mapX.shape)
+        coreRadius = self.props['aftCoreDiameter'].getValue() / self.props['diameter'].getValue()
+        coreMap[mapX**2 + mapY**2 < coreRadius**2] = 0
+        return np.ma.MaskedArray(coreMap, mask)
+
+    def getRegressionData(self, mapDim, numContours=15, coreBlack=True):
+        """Returns the regression data of the aft face. The core's surface regresses at its half angle, so the port
+        grows by the radial component of the regression distance, as it does in 'getFrustumInfo'."""
+        masked = self.getFaceImage(mapDim)
+        coreRadius = self.props['aftCoreDiameter'].getValue() / self.props['diameter'].getValue()
+        coreDiameterDifference = self.props['aftCoreDiameter'].getValue() - self.props['forwardCoreDiameter'].getValue()
+        radialRate = cos(atan(abs(coreDiameterDifference) / (2 * self.props['length'].getValue())))
+        radius, _ = geometry.mapPolar(mapDim)
+
+        regressionMap = (radius - coreRadius) / radialRate
+        regmax = np.amax(regressionMap[np.logical_not(masked.mask)])
+        levels = np.linspace(0, regmax, numContours)
+        radii = [[coreRadius + (dist * radialRate)] for dist in levels]
+        contours, contourLengths = geometry.getCircleContourLevels(radii, levels, mapDim)
+        if coreBlack:
+            regressionMap[regressionMap < 0] = regmax # Make the core black
+
+        return (masked, np.ma.MaskedArray(regressionMap, masked.mask), contours, contourLengths)
+
     def getDetailsString(self, lengthUnit='m'):
         """Returns a short string describing the grain, formatted using the units that is passed in"""
         return 'Length: {}'.format(self.props['length'].dispFormat(lengthUnit))
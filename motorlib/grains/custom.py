@@ -1,8 +1,12 @@
 """Custom Grain submodule"""
 
+import numpy as np
 import skimage.draw as draw
+from scipy import interpolate
 
 from ..grain import FmmGrain
+from ..polygonOffset import PolygonOffset
+from .. import regressionCache
 from ..properties import PolygonProperty, EnumProperty
 from ..simResult import SimAlert, SimAlertLevel, SimAlertType
 from ..units import getAllConversions, convert
@@ -10,21 +14,80 @@ from ..units import getAllConversions, convert
 class CustomGrain(FmmGrain):
     """Custom grains can have any core shape. They define their geometry using a polygon property, which tracks a list
     of polygons that each consist of a number of points. The polygons are scaled according to user specified units and
-    drawn onto the core map."""
+    drawn onto the core map. Alternatively, the 'Polygon offset' regression engine measures the regression by offsetting
+    the polygons directly, which doesn't depend on the map dimension."""
     geomName = 'Custom Grain'
     def __init__(self):
         super().__init__()
         self.props['points'] = PolygonProperty('Core geometry')
         self.props['dxfUnit'] = EnumProperty('DXF Unit', getAllConversions('m'))
+        self.props['regressionEngine'] = EnumProperty('Regression Engine', ['Regression map', 'Polygon offset'])
+
+    def getNormalizedPolygons(self):
+        """Returns the core polygons in the coordinates of the regression map, where the casting tube is the unit
+        circle."""
+        inUnit = self.props['dxfUnit'].getValue()
+        return [[[self.normalize(convert(coord, inUnit, 'm')) for coord in p] for p in polygon]
+                for polygon in self.props['points'].getValue()]
 
     def generateCoreMap(self):
         inUnit = self.props['dxfUnit'].getValue()
         for polygon in self.props['points'].getValue():
-            row = [(self.mapDim/2) + (-self.normalize(convert(p[1], inUnit, 'm')) * (self.mapDim/2)) for p in polygon]
+            # Rows are shifted so polygons land in the right place when the map is generated in bands
+            row = [(self.mapDim/2) + (-self.normalize(convert(p[1], inUnit, 'm')) * (self.mapDim/2)) - self.mapRowOffset
+                   for p in polygon]
             col = [(self.mapDim/2) + (self.normalize(convert(p[0], inUnit, 'm')) * (self.mapDim/2)) for p in polygon]
             imageRow, imageCol = draw.polygon(row, col, self.coreMap.shape)
             self.coreMap[imageRow, imageCol] = 0
 
+    def simulationSetup(self, config):
+        if self.props['regressionEngine'].getValue() != 'Polygon offset':
+            super().simulationSetup(config)
+            return
+        self.generateOffsetTables(config.getProperty('polygonOffsetSamples'))
+
+    def getMapDim(self):
+        if self.props['regressionEngine'].getValue() == 'Polygon offset':
+            return None
+        return super().getMapDim()
+
+    def solvesWholeMap(self):
+        # Offsetting the polygons doesn't use a map at all
+        return self.props['regressionEngine'].getValue() != 'Polygon offset'
+
+    def generateOffsetTables(self, samples):
+        """Builds the face area and core perimeter tables by offsetting the core polygons to 'samples' evenly spaced
+        regression depths between the core and burnout. No regression map is made, so the perimeter always comes from
+        the table."""
+        key = regressionCache.getShapeKey(self.geomName, self.getNormalizedShape(), None, ['Polygon offset', samples])
+        tables = regressionCache.loadTables(key)
+        if tables is None:
+            offset = PolygonOffset(self.getNormalizedPolygons())
+            maxDist = offset.getWallWeb()
+            depths = np.linspace(0, maxDist, samples)
+            portArea, corePerimeter = np.array([offset.measure(depth) for depth in depths]).T
+            faceArea = np.maximum(np.pi - portArea, 0)
+            # The last depth is burnout, so anchor both tables at 0 there
+            faceArea[-1], corePerimeter[-1] = 0, 0
+            tables = {'maxDist': np.array(maxDist), 'depths': depths, 'faceArea': faceArea,
+                      'corePerimeter': corePerimeter}
+            regressionCache.saveTables(key, tables)
+
+        radius = self.props['diameter'].getValue() / 2
+        self.wallWeb = self.unNormalize(float(tables['maxDist']))
+        self.faceArea = tables['faceArea'] * radius ** 2
+        self.faceAreaFunc = interpolate.interp1d(tables['depths'], self.faceArea)
+        self.corePerimeter = tables['corePerimeter'] * radius
+        self.corePerimeterFunc = interpolate.interp1d(tables['depths'], self.corePerimeter)
+
+    def getNormalizedShape(self):
+        inUnit = self.props['dxfUnit'].getValue()
+        diameter = self.props['diameter'].getValue()
+        polygons = []
+        for polygon in self.props['points'].getValue():
+            polygons.append([[round(convert(coord, inUnit, 'm') / diameter, 12) for coord in p] for p in polygon])
+        return {'points': polygons}
+
     def getGeometryErrors(self):
         errors = super().getGeometryErrors()
 
@@ -19,6 +19,10 @@ class DGrain(FmmGrain):
 
         self.coreMap[self.mapX > slotOffset] = 0
 
+    def getSymmetry(self):
+        # The cross section is mirrored about the x axis of the map
+        return (1, 0)
+
     def getDetailsString(self, lengthUnit='m'):
         return 'Length: {}, Slot offset: {}'.format(self.props['length'].dispFormat(lengthUnit),
                                                     self.props['slotOffset'].dispFormat(lengthUnit))
@@ -3,6 +3,7 @@
 import numpy as np
 
 from ..grain import FmmGrain
+from .. import geometry
 from ..properties import FloatProperty, IntProperty, BooleanProperty
 from ..simResult import SimAlert, SimAlertLevel, SimAlertType
 
@@ -28,23 +29,38 @@ class Finocyl(FmmGrain):
         finStart = coreRadius - finLength if invertedFins else 0
         finEnd = coreRadius if invertedFins else finLength + coreRadius
 
+        radius, angle = self.getMapPolar()
+
         # Open up core
-        self.coreMap[self.mapX**2 + self.mapY**2 < coreRadius**2] = 0
-
-        # Add fins
-        for i in range(0, numFins):
-            theta = 2 * np.pi / numFins * i
-            # Initialize a vector pointing along the fin
-            vect0 = np.cos(theta)
-            vect1 = np.sin(theta)
-            # Select all points within half the width of the vector
-            vect = abs(vect0*self.mapX + vect1*self.mapY) < finWidth / 2
-            # Set up two perpendicular vectors to cap off the ends
-            near = (vect1 * self.mapX) - (vect0 * self.mapY) > finStart
-            far = (vect1 * self.mapX) - (vect0 * self.mapY) < finEnd
-            ends = np.logical_and(far, near)
-            # For inverted fins, we are filling propellant back in. For regular fins, we are removing it.
-            self.coreMap[np.logical_and(vect, ends)] = invertedFins
+        self.coreMap[radius < coreRadius] = 0
+
+        # Add fins. Fin 0 points along the negative y axis of the map. Each pixel is only checked against the two fins
+        # closest to it, which covers everything except fins that overlap more than their neighbours.
+        if numFins == 0:
+            return
+        theta = 2 * np.pi / numFins * np.arange(numFins)
+        inFin = np.zeros(self.coreMap.shape, dtype=bool)
+        for fin in geometry.nearestAxes(angle, numFins, -np.pi / 2):
+            # Vector pointing along the fin
+            vect0 = np.cos(theta)[fin]
+            vect1 = np.sin(theta)[fin]
+            # Select all points within half the width of the vector and between the ends of the fin
+            along = (vect1 * self.mapX) - (vect0 * self.mapY)
+            inFin |= (abs(vect0 * self.mapX + vect1 * self.mapY) < finWidth / 2) & (along > finStart) & (along < finEnd)
+        # For inverted fins, we are filling propellant back in. For regular fins, we are removing it.
+        self.coreMap[inFin] = invertedFins
+
+    def getSymmetry(self):
+        numFins = self.props['numFins'].getValue()
+        if numFins == 0:
+            return None
+        # Fin 0 points along the negative y axis of the map and each fin is mirrored about its own axis
+        return (numFins, -np.pi / 2)
+
+    def getMinimumFeatureSize(self):
+        if self.props['numFins'].getValue() == 0:
+            return None
+        return self.props['finWidth'].getValue()
 
     def getDetailsString(self, lengthUnit='m'):
         return 'Length: {}, Core: {}, Fins: {}'.format(self.props['length'].dispFormat(lengthUnit),
@@ -1,11 +1,14 @@
 """Moon burning grain submodule"""
 
 from ..grain import FmmGrain
+from .. import geometry
 from ..properties import FloatProperty
 from ..simResult import SimAlert, SimAlertLevel, SimAlertType
 
 class MoonBurner(FmmGrain):
-    """A moonburner is very similar to a BATES grain except the core is off center by a specified distance."""
+    """A moonburner is very similar to a BATES grain except the core is off center by a specified distance. Like
+    BATES, its regression is calculated analytically, as the core stays a circle that grows until it covers the
+    casting tube. The regression map is only generated for previews."""
     geomName = 'Moon Burner'
     def __init__(self):
         super().__init__()
@@ -19,6 +22,30 @@ class MoonBurner(FmmGrain):
         # Open up core
         self.coreMap[(self.mapX - coreOffset)**2 + self.mapY**2 < coreRadius**2] = 0
 
+    def simulationSetup(self, config):
+        diameter = self.props['diameter'].getValue()
+        coreDiameter = self.props['coreDiameter'].getValue()
+        # The last propellant to burn is on the casting tube, opposite from the core
+        self.wallWeb = (diameter / 2) + self.props['coreOffset'].getValue() - (coreDiameter / 2)
+
+    def getMapDim(self):
+        return None
+
+    def getCorePerimeter(self, regDist):
+        return geometry.circleArcInside(self.props['coreDiameter'].getValue() + (2 * regDist),
+                                        self.props['diameter'].getValue(),
+                                        self.props['coreOffset'].getValue())
+
+    def getFaceArea(self, regDist):
+        diameter = self.props['diameter'].getValue()
+        port = geometry.circleOverlapArea(self.props['coreDiameter'].getValue() + (2 * regDist), diameter,
+                                          self.props['coreOffset'].getValue())
+        return geometry.circleArea(diameter) - port
+
+    def getSymmetry(self):
+        # The cross section is mirrored about the x axis of the map
+        return (1, 0)
+
     def getDetailsString(self, lengthUnit='m'):
         return 'Length: {}, Core: {}'.format(self.props['length'].dispFormat(lengthUnit),
                                              self.props['coreDiameter'].dispFormat(lengthUnit))
@@ -1,8 +1,6 @@
 """Rod and Tube submodule"""
 
 import numpy as np
-import skfmm
-from skimage import measure
 
 from ..grain import PerforatedGrain
 from .. import geometry
@@ -69,22 +67,23 @@ class RodTubeGrain(PerforatedGrain):
             errors.append(SimAlert(SimAlertLevel.ERROR, SimAlertType.GEOMETRY, aText))
         return errors
 
-    # These two functions have a lot of code reuse, but it is worth it because making this an fmmGrain would make it
-    # signficantly way slower
+    # Like BATES grains, the regression map and contours are drawn directly because the rod and the tube both regress
+    # as circles
     def getFaceImage(self, mapDim):
         # Normalize core and rod diameters
         coreRadius = (self.props['coreDiameter'].getValue() / (0.5 * self.props['diameter'].getValue())) / 2
         rodRadius = (self.props['rodDiameter'].getValue() / (0.5 * self.props['diameter'].getValue())) / 2
         supportRadius = (self.props['supportDiameter'].getValue() / (0.5 * self.props['diameter'].getValue())) / 2
 
-        mapX, mapY = np.meshgrid(np.linspace(-1, 1, mapDim), np.linspace(-1, 1, mapDim))
-        mask = np.logical_or(mapX**2 + mapY**2 > 1, mapX**2 + mapY**2 < supportRadius ** 2)
-        coreMap = np.ones_like(mapX)
+        mapX, mapY, outside = geometry.mapGrid(mapDim)
+        radiusSquared = mapX ** 2 + mapY ** 2
+        mask = np.logical_or(outside, radiusSquared < supportRadius ** 2)
+        coreMap = np.ones(mapX.shape)
 
         # Open up core
-        coreMap[mapX ** 2 + mapY ** 2 < coreRadius ** 2] = 0
-        coreMap[mapX ** 2 + mapY ** 2 < rodRadius ** 2] = 1
-        coreMap[mapX ** 2 + mapY ** 2 < supportRadius ** 2] = 0
+        coreMap[radiusSquared < coreRadius ** 2] = 0
+        coreMap[radiusSquared < rodRadius ** 2] = 1
+        coreMap[radiusSquared < supportRadius ** 2] = 0
 
         maskedMap = np.ma.MaskedArray(coreMap, mask)
 
@@ -92,27 +91,22 @@ class RodTubeGrain(PerforatedGrain):
 
     def getRegressionData(self, mapDim, numContours=15, coreBlack=True):
         masked = self.getFaceImage(mapDim)
-        regressionMap = None
-        contours = []
-        contourLengths = {}
-
-        try:
-            cellSize = 1 / mapDim
-            regressionMap = skfmm.distance(masked, dx=cellSize) * 2
-            regmax = np.amax(regressionMap)
-            regressionMap = regressionMap[:, :].copy()
-            if coreBlack:
-                regressionMap[np.where(masked == 0)] = regmax # Make the core black
-
-            for dist in np.linspace(0, regmax, numContours):
-                contours.append([])
-                contourLengths[dist] = 0
-                layerContours = measure.find_contours(regressionMap, dist, fully_connected='high')
-                for contour in layerContours:
-                    contours[-1].append(contour)
-                    contourLengths[dist] += geometry.length(contour, mapDim)
-
-        except ValueError as exc: # If there aren't any contours, do nothing
-            print(exc)
-
-        return (masked, regressionMap, contours, contourLengths)
+        coreRadius = (self.props['coreDiameter'].getValue() / (0.5 * self.props['diameter'].getValue())) / 2
+        rodRadius = (self.props['rodDiameter'].getValue() / (0.5 * self.props['diameter'].getValue())) / 2
+        supportRadius = (self.props['supportDiameter'].getValue() / (0.5 * self.props['diameter'].getValue())) / 2
+        radius, _ = geometry.mapPolar(mapDim)
+
+        # The tube regresses outwards and the rod regresses inwards, and the gap between them has negative values
+        regressionMap = np.maximum(radius - coreRadius, rodRadius - radius)
+        regmax = np.amax(regressionMap[np.logical_not(masked.mask)])
+        levels = np.linspace(0, regmax, numContours)
+        radii = []
+        for dist in levels:
+            radii.append([coreRadius + dist])
+            if rodRadius - dist > supportRadius: # The rod burns down to the support
+                radii[-1].append(rodRadius - dist)
+        contours, contourLengths = geometry.getCircleContourLevels(radii, levels, mapDim)
+        if coreBlack:
+            regressionMap[regressionMap < 0] = regmax # Make the core black
+
+        return (masked, np.ma.MaskedArray(regressionMap, masked.mask), contours, contourLengths)
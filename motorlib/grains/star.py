@@ -3,6 +3,7 @@
 import numpy as np
 
 from ..grain import FmmGrain
+from .. import geometry
 from ..properties import IntProperty, FloatProperty
 from ..simResult import SimAlert, SimAlertLevel, SimAlertType
 
@@ -20,16 +21,34 @@ class StarGrain(FmmGrain):
         pointWidth = self.normalize(self.props['pointWidth'].getValue())
         pointLength = self.normalize(self.props['pointLength'].getValue())
 
-        for i in range(0, numPoints):
-            theta = 2 * np.pi / numPoints * i
-            comp0 = np.cos(theta)
-            comp1 = np.sin(theta)
+        if numPoints == 0:
+            return
+        radius, angle = self.getMapPolar()
+        # Points get narrower as they go out and end at 'pointLength' from the center
+        width = pointWidth / 2 * (1 - (radius / pointLength))
 
+        # Point 0 points along the negative y axis of the map. Each pixel is only checked against the two points
+        # closest to it, which covers everything except points that overlap more than their neighbours.
+        theta = 2 * np.pi / numPoints * np.arange(numPoints)
+        inPoint = np.zeros(self.coreMap.shape, dtype=bool)
+        for point in geometry.nearestAxes(angle, numPoints, -np.pi / 2):
+            comp0 = np.cos(theta)[point]
+            comp1 = np.sin(theta)[point]
             rect = abs(comp0 * self.mapX + comp1 * self.mapY)
-            width = pointWidth / 2 * (1 - (((self.mapX ** 2 + self.mapY ** 2) ** 0.5) / pointLength))
-            vect = rect < width
-            near = comp1*self.mapX - comp0*self.mapY > -0.025
-            self.coreMap[np.logical_and(vect, near)] = 0
+            inPoint |= (rect < width) & (comp1 * self.mapX - comp0 * self.mapY > -0.025)
+        self.coreMap[inPoint] = 0
+
+    def getSymmetry(self):
+        numPoints = self.props['numPoints'].getValue()
+        if numPoints == 0:
+            return None
+        # Point 0 points along the negative y axis of the map and each point is mirrored about its own axis
+        return (numPoints, -np.pi / 2)
+
+    def getMinimumFeatureSize(self):
+        if self.props['numPoints'].getValue() == 0:
+            return None
+        return self.props['pointWidth'].getValue()
 
     def getDetailsString(self, lengthUnit='m'):
         return 'Length: {}, Points: {}'.format(self.props['length'].dispFormat(lengthUnit),
@@ -0,0 +1,86 @@
+"""Tapered finocyl grain submodule"""
+
+import numpy as np
+
+from ..grain import FmmGrain3D
+from .. import geometry
+from ..properties import FloatProperty, IntProperty
+from ..simResult import SimAlert, SimAlertLevel, SimAlertType
+
+class TaperedFinocyl(FmmGrain3D):
+    """A tapered finocyl is a finocyl whose core diameter and fin length change linearly from the forward face to the
+    aft face. Setting the fin length to 0 at one end makes slots that only run part of the way down the grain."""
+    geomName = 'Tapered Finocyl'
+    def __init__(self):
+        super().__init__()
+        self.props['numFins'] = IntProperty('Number of fins', '', 0, 64)
+        self.props['finWidth'] = FloatProperty('Fin width', 'm', 0, 1)
+        self.props['forwardFinLength'] = FloatProperty('Forward fin length', 'm', 0, 1)
+        self.props['aftFinLength'] = FloatProperty('Aft fin length', 'm', 0, 1)
+        self.props['forwardCoreDiameter'] = FloatProperty('Forward core diameter', 'm', 0, 1)
+        self.props['aftCoreDiameter'] = FloatProperty('Aft core diameter', 'm', 0, 1)
+
+    def getSliceDimensions(self, position):
+        """Returns a tuple of the core diameter and fin length 'position' meters from the forward face."""
+        fraction = position / self.props['length'].getValue()
+        forwardCore = self.props['forwardCoreDiameter'].getValue()
+        forwardFin = self.props['forwardFinLength'].getValue()
+        coreDiameter = forwardCore + (fraction * (self.props['aftCoreDiameter'].getValue() - forwardCore))
+        finLength = forwardFin + (fraction * (self.props['aftFinLength'].getValue() - forwardFin))
+        return coreDiameter, finLength
+
+    def generateCoreSlice(self, position):
+        coreDiameter, finLength = self.getSliceDimensions(position)
+        coreRadius = self.normalize(coreDiameter) / 2
+        finLength = self.normalize(finLength)
+        finWidth = self.normalize(self.props['finWidth'].getValue())
+        numFins = self.props['numFins'].getValue()
+
+        radius = (self.mapX**2 + self.mapY**2) ** 0.5
+        self.coreMap[radius < coreRadius] = 0
+        if numFins == 0 or finLength <= 0:
+            return
+
+        # Fins are drawn like the ones of a finocyl, with fin 0 pointing along the negative y axis of the map
+        angle = np.arctan2(self.mapY, self.mapX)
+        theta = 2 * np.pi / numFins * np.arange(numFins)
+        finEnd = finLength + coreRadius
+        inFin = np.zeros(self.coreMap.shape, dtype=bool)
+        for fin in geometry.nearestAxes(angle, numFins, -np.pi / 2):
+            vect0 = np.cos(theta)[fin]
+            vect1 = np.sin(theta)[fin]
+            along = (vect1 * self.mapX) - (vect0 * self.mapY)
+            inFin |= (abs(vect0 * self.mapX + vect1 * self.mapY) < finWidth / 2) & (along > 0) & (along < finEnd)
+        self.coreMap[inFin] = 0
+
+    def getSymmetry(self):
+        numFins = self.props['numFins'].getValue()
+        if numFins == 0:
+            return None
+        return (numFins, -np.pi / 2)
+
+    def getDetailsString(self, lengthUnit='m'):
+        return 'Length: {}, Core: {} to {}, Fins: {}'.format(self.props['length'].dispFormat(lengthUnit),
+                                                             self.props['forwardCoreDiameter'].dispFormat(lengthUnit),
+                                                             self.props['aftCoreDiameter'].dispFormat(lengthUnit),
+                                                             self.props['numFins'].getValue())
+
+    def getGeometryErrors(self):
+        errors = super().getGeometryErrors()
+        diameter = self.props['diameter'].getValue()
+        for end in ('forward', 'aft'):
+            coreDiameter = self.props[end + 'CoreDiameter'].getValue()
+            finLength = self.props[end + 'FinLength'].getValue()
+            if coreDiameter >= diameter:
+                aText = '{} core diameter must be less than grain diameter'.format(end.capitalize())
+                errors.append(SimAlert(SimAlertLevel.ERROR, SimAlertType.GEOMETRY, aText))
+            if coreDiameter + (2 * finLength) > diameter:
+                aText = '{} core radius plus fin length should be less than or equal to grain radius'
+                errors.append(SimAlert(SimAlertLevel.WARNING, SimAlertType.GEOMETRY, aText.format(end.capitalize())))
+
+        if self.props['forwardCoreDiameter'].getValue() == 0 and self.props['aftCoreDiameter'].getValue() == 0:
+            errors.append(SimAlert(SimAlertLevel.ERROR, SimAlertType.GEOMETRY, 'Core diameters must not both be 0'))
+        if self.props['numFins'].getValue() > 0 and self.props['finWidth'].getValue() == 0:
+            errors.append(SimAlert(SimAlertLevel.ERROR, SimAlertType.GEOMETRY, 'Fin width must not be 0'))
+
+        return errors
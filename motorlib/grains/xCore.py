@@ -21,6 +21,12 @@ class XCore(FmmGrain):
         self.coreMap[np.logical_and(np.abs(self.mapY) < slotWidth/2, np.abs(self.mapX) < slotLength)] = 0
         self.coreMap[np.logical_and(np.abs(self.mapX) < slotWidth/2, np.abs(self.mapY) < slotLength)] = 0
 
+    def getSymmetry(self):
+        return (4, 0)
+
+    def getMinimumFeatureSize(self):
+        return self.props['slotWidth'].getValue()
+
     def getDetailsString(self, lengthUnit='m'):
         return 'Length: {}, Slots: {} by {}'.format(self.props['length'].dispFormat(lengthUnit),
                                                     self.props['slotWidth'].dispFormat(lengthUnit),
@@ -1,12 +1,22 @@
 """Conains the motor class and a supporting configuration property collection."""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import time
+
 from .grains import grainTypes
 from .nozzle import Nozzle
 from .propellant import Propellant
 from . import geometry
 from .simResult import SimulationResult, SimAlert, SimAlertLevel, SimAlertType
+from .simulationKernel import SimulationKernel
 from .grains import EndBurningGrain
-from .properties import PropertyCollection, FloatProperty, IntProperty
-from .constants import gasConstant
+from .grain import FmmGrain, regressionSolvers
+from .properties import PropertyCollection, FloatProperty, IntProperty, EnumProperty
+from . import regressionCache
+
+# Rough number of seconds that building a grain's geometry table takes. Burns that spend less time than this per grain
+# evaluating exact geometry are faster without tables.
+geometryTableSetupTime = 3
 
 class MotorConfig(PropertyCollection):
     """Contains the settings required for simulation, including environmental conditions and details about
@@ -22,10 +32,35 @@ class MotorConfig(PropertyCollection):
         self.props['burnoutWebThres'] = FloatProperty('Web Burnout Threshold', 'm', 2.54e-5, 3.175e-3)
         self.props['burnoutThrustThres'] = FloatProperty('Thrust Burnout Threshold', '%', 0.01, 10)
         self.props['timestep'] = FloatProperty('Simulation Timestep', 's', 0.0001, 0.1)
+        self.props['timestepSelection'] = EnumProperty('Simulation Timestep Selection', ['Fixed', 'Adaptive'])
+        self.props['minTimestep'] = FloatProperty('Adaptive Minimum Timestep', 's', 0.00001, 0.1)
+        self.props['maxTimestep'] = FloatProperty('Adaptive Maximum Timestep', 's', 0.0001, 1)
+        self.props['timestepTolerance'] = FloatProperty('Adaptive Timestep Tolerance', '%', 0.001, 10)
         self.props['ambPressure'] = FloatProperty('Ambient Pressure', 'Pa', 0.0001, 102000)
-        self.props['mapDim'] = IntProperty('Grain Map Dimension', '', 250, 2000)
+        self.props['mapDim'] = IntProperty('Grain Map Dimension', '', 250, 8000)
+        self.props['mapDimSelection'] = EnumProperty('Grain Map Dimension Selection', ['Fixed', 'Automatic'])
+        self.props['mapFeaturePixels'] = IntProperty('Automatic Map Pixels Per Feature', '', 2, 100)
+        self.props['mapConvergenceTolerance'] = FloatProperty('Automatic Map Convergence Tolerance', '%', 0.1, 20)
         self.props['sepPressureRatio'] = FloatProperty('Separation Pressure Ratio', '', 0.001, 1)
-
+        self.props['regressionSolver'] = EnumProperty('Grain Regression Solver', list(regressionSolvers.keys()))
+        self.props['regressionMapStorage'] = EnumProperty('Grain Regression Map Storage',
+                                                          ['Full', 'Quantized', 'Tables only'])
+        # Memory mapping only keeps the whole map out of memory for symmetric grains. Grains without symmetry still
+        # solve the whole map in memory, which the simulation warns about.
+        self.props['mapMemory'] = EnumProperty('Grain Map Memory', ['In memory', 'Memory mapped'])
+        self.props['setupProcesses'] = IntProperty('Grain Setup Processes', '', 1, 64)
+        self.props['polygonOffsetSamples'] = IntProperty('Polygon Offset Depth Samples', '', 10, 5000)
+        self.props['voxelDim'] = IntProperty('Grain Voxel Map Dimension', '', 50, 400)
+        self.props['geometryEvaluation'] = EnumProperty('Grain Geometry Evaluation', ['Exact', 'Tabulated'])
+        self.props['geometryTableTolerance'] = FloatProperty('Grain Geometry Table Tolerance', '%', 0.001, 5)
+
+
+def setupGrain(grain, config):
+    """Runs simulationSetup on a grain, builds its geometry table if the config calls for one, and returns it. Used to
+    set grains up both here and in worker processes."""
+    grain.simulationSetup(config)
+    grain.setupGeometryTable(config)
+    return grain
 
 
 class Motor():
@@ -73,7 +108,7 @@ class Motor():
 
     def calcBurningSurfaceArea(self, regDepth):
         burnoutThres = self.config.getProperty('burnoutWebThres')
-        gWithReg = zip(self.grains, regDepth)
+        gWithReg = zip([grain.getSimulationGeometry() for grain in self.grains], regDepth)
         perGrain = [gr.getSurfaceAreaAtRegression(reg) * int(gr.isWebLeft(reg, burnoutThres)) for gr, reg in gWithReg]
         return sum(perGrain)
 
@@ -89,29 +124,7 @@ class Motor():
         optionally be passed in to save time on motors where calculating surface area is expensive."""
         if kn is None:
             kn = self.calcKN(regDepth, dThroat)
-        density = self.propellant.getProperty('density')
-        tabPressures = []
-        for tab in self.propellant.getProperty('tabs'):
-            ballA, ballN, gamma, temp, molarMass = tab['a'], tab['n'], tab['k'], tab['t'], tab['m']
-            num = kn * density * ballA
-            exponent = 1 / (1 - ballN)
-            denom = ((gamma / ((gasConstant / molarMass) * temp)) * ((2 / (gamma + 1)) ** ((gamma + 1) / (gamma - 1)))) ** 0.5
-            tabPressure = (num / denom) ** exponent
-            # If the pressure that a burnrate produces falls into its range, we know it is the proper burnrate
-            # Due to floating point error, we sometimes get a situation in which no burnrate produces the proper pressure
-            # For this scenario, we go by whichever produces the least error
-            minTabPressure = tab['minPressure']
-            maxTabPressure = tab['maxPressure']
-            if minTabPressure == self.propellant.getMinimumValidPressure() and tabPressure < maxTabPressure:
-                return tabPressure
-            if maxTabPressure == self.propellant.getMaximumValidPressure() and minTabPressure < tabPressure:
-                return tabPressure
-            if minTabPressure < tabPressure < maxTabPressure:
-                return tabPressure
-            tabPressures.append([min(abs(minTabPressure - tabPressure), abs(tabPressure - maxTabPressure)), tabPressure])
-
-        tabPressures.sort(key=lambda x: x[0]) # Sort by the pressure error
-        return tabPressures[0][1] # Return the pressure
+        return self.propellant.getIdealPressure(kn)
 
     def calcForce(self, chamberPres, dThroat, exitPres=None):
         """Calculates the force of the motor at a given regression depth per grain. Calculates exit pressure by
@@ -124,12 +137,57 @@ class Motor():
 
     def calcFreeVolume(self, regDepth):
         """Calculates the volume inside of the motor not occupied by proppellant for a set of regression depths."""
-        return sum([grain.getFreeVolume(reg) for grain, reg in zip(self.grains, regDepth)])
+        return sum([grain.getSimulationGeometry().getFreeVolume(reg) for grain, reg in zip(self.grains, regDepth)])
 
     def calcTotalVolume(self):
         """Calculates the bounding-cylinder volume of the combustion chamber."""
         return sum([grain.getGrainBoundingVolume() for grain in self.grains])
 
+    def setupGrains(self, callback=None):
+        """Runs simulationSetup on all of the motor's grains. Grains with the same type and properties are only set up
+        once, and the rest share the results. If the config allows more than one setup process, the unique grains are
+        set up in parallel in a pool of worker processes, which produces the same results as setting them up here.
+        After each unique grain is set up, 'callback' is called with the fraction of them that are done. Returns True
+        if the callback asked to cancel."""
+        groups = {}
+        for grain in self.grains:
+            key = (grain.geomName, json.dumps(grain.getProperties(), sort_keys=True))
+            groups.setdefault(key, []).append(grain)
+        leaders = [group[0] for group in groups.values()]
+
+        numProcesses = min(self.config.getProperty('setupProcesses'), len(leaders))
+        if numProcesses <= 1:
+            for done, grain in enumerate(leaders):
+                setupGrain(grain, self.config)
+                if callback is not None and callback((done + 1) / len(leaders)):
+                    return True
+        else:
+            # Let the workers share the disk cache, as they each have their own memory cache
+            if regressionCache.diskCache is not None:
+                initArgs = (regressionCache.diskCache.path, regressionCache.diskCache.maxSize)
+            else:
+                initArgs = (None,)
+            executor = ProcessPoolExecutor(numProcesses, initializer=regressionCache.setDiskCache, initargs=initArgs)
+            futures = {}
+            try:
+                for grain in leaders:
+                    futures[executor.submit(setupGrain, grain, self.config)] = grain
+                for done, future in enumerate(as_completed(futures)):
+                    futures[future].copySimulationSetup(future.result())
+                    if callback is not None and callback((done + 1) / len(leaders)):
+                        return True
+            finally:
+                # Drop any setups that haven't started yet if this was cancelled or failed. This is done by hand as
+                # 'shutdown' only gained 'cancel_futures' in python 3.9.
+                for future in futures:
+                    future.cancel()
+                executor.shutdown(wait=False)
+
+        for group in groups.values():
+            for grain in group[1:]:
+                grain.copySimulationSetup(group[0])
+        return False
+
     def runSimulation(self, callback=None):
         """Runs a simulation of the motor and returns a simRes instance with the results. Constraints are checked,
         including the number of grains, if the motor has a propellant set, and if the grains have geometry errors. If
@@ -137,10 +195,9 @@ class Motor():
         pressure, and using pressure to determine thrust and other statistics. The next timestep is then prepared by
         using the pressure to determine how the motor will regress in the given timestep at the current pressure.
         This process is repeated and regression tracked until all grains have burned out, when the results and any
-        warnings are returned."""
-        burnoutWebThres = self.config.getProperty('burnoutWebThres')
+        warnings are returned. If a callback is passed in, it is called with the progress of the grain setup and then
+        with the progress of the burn, each as a fraction. Returning True from it cancels the simulation."""
         burnoutThrustThres = self.config.getProperty('burnoutThrustThres')
-        dTime = self.config.getProperty('timestep')
 
         simRes = SimulationResult(self)
 
@@ -157,6 +214,19 @@ class Motor():
                 simRes.addAlert(alert)
         for alert in self.nozzle.getGeometryErrors():
             simRes.addAlert(alert)
+        if self.config.getProperty('mapDim') > 2000 and self.config.getProperty('mapMemory') == 'In memory':
+            aText = 'Map dimensions over 2000 need a lot of memory unless the grain maps are memory mapped'
+            simRes.addAlert(SimAlert(SimAlertLevel.WARNING, SimAlertType.CONSTRAINT, aText, 'Motor'))
+        if self.config.getProperty('mapMemory') == 'Memory mapped':
+            for gid, grain in enumerate(self.grains):
+                if isinstance(grain, FmmGrain) and grain.solvesWholeMap():
+                    aText = 'Grain has no symmetry to use, so its whole regression map is solved in memory'
+                    location = 'Grain {}'.format(gid + 1)
+                    simRes.addAlert(SimAlert(SimAlertLevel.WARNING, SimAlertType.CONSTRAINT, aText, location))
+        if self.config.getProperty('timestepSelection') == 'Adaptive':
+            if self.config.getProperty('minTimestep') > self.config.getProperty('maxTimestep'):
+                aText = 'Adaptive minimum timestep must not be larger than the maximum timestep'
+                simRes.addAlert(SimAlert(SimAlertLevel.ERROR, SimAlertType.CONSTRAINT, aText, 'Motor'))
 
         # Make sure the motor has a propellant set
         if self.propellant is None:
@@ -170,35 +240,29 @@ class Motor():
         if len(simRes.getAlertsByLevel(SimAlertLevel.ERROR)) > 0:
             return simRes
 
-        # Pull the required numbers from the propellant
-        density = self.propellant.getProperty('density')
-
-        # Precalculate these are they don't change
-        motorVolume = self.calcTotalVolume()
-
         # Generate coremaps for perforated grains
-        for grain in self.grains:
-            grain.simulationSetup(self.config)
-
-        # Setup initial values
-        perGrainReg = [0 for grain in self.grains]
-
-        # At t = 0, the motor has ignited
-        simRes.channels['time'].addData(0)
-        simRes.channels['kn'].addData(self.calcKN(perGrainReg, 0))
-        simRes.channels['pressure'].addData(self.calcIdealPressure(perGrainReg, 0, None))
-        simRes.channels['force'].addData(0)
-        simRes.channels['mass'].addData([grain.getVolumeAtRegression(0) * density for grain in self.grains])
-        simRes.channels['volumeLoading'].addData(100 * (1 - (self.calcFreeVolume(perGrainReg) / motorVolume)))
-        simRes.channels['massFlow'].addData([0 for grain in self.grains])
-        simRes.channels['massFlux'].addData([0 for grain in self.grains])
-        simRes.channels['regression'].addData([0 for grains in self.grains])
-        simRes.channels['web'].addData([grain.getWebLeft(0) for grain in self.grains])
-        simRes.channels['exitPressure'].addData(0)
-        simRes.channels['dThroat'].addData(0)
+        if self.setupGrains(callback):
+            return simRes
+        simRes.grainMemoryUsage = [grain.getMemoryUsage() for grain in self.grains]
+        simRes.grainMapDims = [grain.getMapDim() for grain in self.grains]
+        if self.config.getProperty('mapDimSelection') == 'Automatic':
+            for gid, mapDim in enumerate(simRes.grainMapDims):
+                if mapDim is not None:
+                    aText = 'Regression map dimension automatically set to {}'.format(mapDim)
+                    location = 'Grain {}'.format(gid + 1)
+                    simRes.addAlert(SimAlert(SimAlertLevel.MESSAGE, SimAlertType.VALUE, aText, location))
+        for gid, memoryUsage in enumerate(simRes.grainMemoryUsage):
+            if memoryUsage > 0:
+                aText = 'Regression data uses {:.1f} MB of memory'.format(memoryUsage / 2 ** 20)
+                location = 'Grain {}'.format(gid + 1)
+                simRes.addAlert(SimAlert(SimAlertLevel.MESSAGE, SimAlertType.VALUE, aText, location))
+
+        # Geometry tables stand in for grains that have them
+        grainGeometry = [grain.getSimulationGeometry() for grain in self.grains]
+        kernel = SimulationKernel(self, grainGeometry)
 
         # Check port/throat ratio and add a warning if it is large enough
-        aftPort = self.grains[-1].getPortArea(0)
+        aftPort = grainGeometry[-1].getPortArea(0)
         if aftPort is not None:
             minAllowed = self.config.getProperty('minPortThroat')
             ratio = aftPort / geometry.circleArea(self.nozzle.props['throat'].getValue())
@@ -207,72 +271,25 @@ class Motor():
                 simRes.addAlert(SimAlert(SimAlertLevel.WARNING, SimAlertType.CONSTRAINT, description, 'N/A'))
 
         # Perform timesteps
-        while simRes.shouldContinueSim(burnoutThrustThres):
-            # Calculate regression
-            massFlow = 0
-            perGrainMass = [0 for grain in self.grains]
-            perGrainMassFlow = [0 for grain in self.grains]
-            perGrainMassFlux = [0 for grain in self.grains]
-            perGrainWeb = [0 for grain in self.grains]
-            for gid, grain in enumerate(self.grains):
-                if grain.getWebLeft(perGrainReg[gid]) > burnoutWebThres:
-                    # Calculate regression at the current pressure
-                    reg = dTime * self.propellant.getBurnRate(simRes.channels['pressure'].getLast())
-                    # Find the mass flux through the grain based on the mass flow fed into from grains above it
-                    perGrainMassFlux[gid] = grain.getPeakMassFlux(massFlow, dTime, perGrainReg[gid], reg, density)
-                    # Find the mass of the grain after regression
-                    perGrainMass[gid] = grain.getVolumeAtRegression(perGrainReg[gid]) * density
-                    # Add the change in grain mass to the mass flow
-                    massFlow += (simRes.channels['mass'].getLast()[gid] - perGrainMass[gid]) / dTime
-                    # Apply the regression
-                    perGrainReg[gid] += reg
-                    perGrainWeb[gid] = grain.getWebLeft(perGrainReg[gid])
-                perGrainMassFlow[gid] = massFlow
-            simRes.channels['regression'].addData(perGrainReg[:])
-            simRes.channels['web'].addData(perGrainWeb)
-
-            simRes.channels['volumeLoading'].addData(100 * (1 - (self.calcFreeVolume(perGrainReg) / motorVolume)))
-            simRes.channels['mass'].addData(perGrainMass)
-            simRes.channels['massFlow'].addData(perGrainMassFlow)
-            simRes.channels['massFlux'].addData(perGrainMassFlux)
-
-            # Calculate KN
-            dThroat = simRes.channels['dThroat'].getLast()
-            simRes.channels['kn'].addData(self.calcKN(perGrainReg, dThroat))
-
-            # Calculate Pressure
-            lastKn = simRes.channels['kn'].getLast()
-            pressure = self.calcIdealPressure(perGrainReg, dThroat, lastKn)
-            simRes.channels['pressure'].addData(pressure)
-
-            # Calculate Exit Pressure
-            _, _, gamma, _, _ = self.propellant.getCombustionProperties(pressure)
-            exitPressure = self.nozzle.getExitPressure(gamma, pressure)
-            simRes.channels['exitPressure'].addData(exitPressure)
-
-            # Calculate force
-            force = self.calcForce(simRes.channels['pressure'].getLast(), dThroat, exitPressure)
-            simRes.channels['force'].addData(force)
-
-            simRes.channels['time'].addData(simRes.channels['time'].getLast() + dTime)
-
-            # Calculate any slag deposition or erosion of the throat
-            if pressure == 0:
-                slagRate = 0
-            else:
-                slagRate = (1 / pressure) * self.nozzle.getProperty('slagCoeff')
-            erosionRate = pressure * self.nozzle.getProperty('erosionCoeff')
-            change = dTime * ((-2 * slagRate) + (2 * erosionRate))
-            simRes.channels['dThroat'].addData(dThroat + change)
-
-            if callback is not None:
-                # Uses the grain with the largest percentage of its web left
-                progress = max([g.getWebLeft(r) / g.getWebLeft(0) for g, r in zip(self.grains, perGrainReg)])
-                if callback(1 - progress): # If the callback returns true, it is time to cancel
-                    return simRes
-
+        startTime = time.perf_counter()
+        while kernel.shouldContinue(burnoutThrustThres):
+            kernel.step()
+            # If the callback returns true, it is time to cancel
+            if callback is not None and callback(kernel.getProgress()):
+                kernel.writeResults(simRes)
+                return simRes
+
+        kernel.writeResults(simRes)
         simRes.success = True
 
+        # Most of the time in the burn goes to evaluating grain geometry, so suggest tables if they would have paid off
+        tabulated = [grain for grain in self.grains if grain.tabulateGeometry]
+        if self.config.getProperty('geometryEvaluation') == 'Exact' and len(tabulated) > 0:
+            burnTime = time.perf_counter() - startTime
+            if burnTime > geometryTableSetupTime * len(tabulated):
+                desc = 'Burn took {:.1f} s, tabulated grain geometry evaluation may be faster'.format(burnTime)
+                simRes.addAlert(SimAlert(SimAlertLevel.MESSAGE, SimAlertType.VALUE, desc, 'Motor'))
+
         if simRes.getPeakMassFlux() > self.config.getProperty('maxMassFlux'):
             desc = 'Peak mass flux exceeded configured limit'
             alert = SimAlert(SimAlertLevel.WARNING, SimAlertType.CONSTRAINT, desc, 'Motor')
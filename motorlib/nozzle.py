@@ -1,8 +1,6 @@
 """This submodule houses the nozzle object and functions related to isentropic flow"""
 import math
 
-from scipy.optimize import fsolve
-
 from .properties import FloatProperty, PropertyCollection
 from . import geometry
 from .simResult import SimAlert, SimAlertLevel, SimAlertType
@@ -12,6 +10,39 @@ def eRatioFromPRatio(k, pRatio):
     """Returns the expansion ratio of a nozzle given the pressure ratio it causes."""
     return (((k+1)/2)**(1/(k-1))) * (pRatio ** (1/k)) * ((((k+1)/(k-1))*(1-(pRatio**((k-1)/k))))**0.5)
 
+def pRatioFromERatio(k, eRatio, guess=None, tolerance=1e-12, maxIterations=50):
+    """Returns the ratio of exit to chamber pressure of a nozzle with supersonic flow at its exit, given its expansion
+    ratio. This inverts 'eRatioFromPRatio' by solving for w = pRatio ** ((k-1)/k), which lies between 0 at infinite
+    expansion and 2/(k+1) at the throat. The log of the area ratio is increasing and concave in w, so Newton's method
+    converges from anywhere in that range, but steps that leave the bracket around the root fall back to bisection.
+    'guess' is a pressure ratio to start from, like one solved for a similar expansion ratio or k. Iteration stops once
+    a step changes w by less than 'tolerance' times w."""
+    wMax = 2 / (k + 1)
+    if eRatio <= 1:
+        return wMax ** (k / (k - 1))
+    # ln(throat area / exit area) at w, plus the log of the expansion ratio so that the root is at zero
+    offset = math.log(((k + 1) / 2) ** (1 / (k - 1))) + (0.5 * math.log((k + 1) / (k - 1))) + math.log(eRatio)
+    low, high = 0, wMax
+    if guess is not None and 0 < guess < 1:
+        w = min(guess ** ((k - 1) / k), wMax)
+    else:
+        w = wMax / 2
+    for _ in range(maxIterations):
+        value = offset + (math.log(w) / (k - 1)) + (0.5 * math.log(1 - w))
+        if value < 0:
+            low = w
+        else:
+            high = w
+        slope = (1 / ((k - 1) * w)) - (0.5 / (1 - w))
+        nextW = w - (value / slope) if slope > 0 else low
+        if not low < nextW < high:
+            nextW = (low + high) / 2
+        done = abs(nextW - w) <= tolerance * w
+        w = nextW
+        if done:
+            break
+    return w ** (k / (k - 1))
+
 class Nozzle(PropertyCollection):
     """An object that contains the details about a motor's nozzle."""
     def __init__(self):
@@ -24,6 +55,8 @@ class Nozzle(PropertyCollection):
         self.props['throatLength'] = FloatProperty('Throat Length', 'm', 0, 0.5)
         self.props['slagCoeff'] = FloatProperty('Slag Buildup Coefficient', '(m*Pa)/s', 0, 1e6)
         self.props['erosionCoeff'] = FloatProperty('Throat Erosion Coefficient', 'm/(s*Pa)', 0, 1e6)
+        self.pressureRatios = {} # Exit pressure ratios that have been solved for, by k and expansion ratio
+        self.lastPressureRatio = None
 
     def getDetailsString(self, lengthUnit='m'):
         """Returns a human-readable string containing some details about the nozzle."""
@@ -42,9 +75,22 @@ class Nozzle(PropertyCollection):
         """Return the area of the nozzle's exit."""
         return geometry.circleArea(self.props['exit'].getValue())
 
+    def getPressureRatio(self, k):
+        """Returns the ratio of the nozzle's exit pressure to its input pressure for a gas with a specific heat ratio of
+        'k'. The ratio only depends on k and the expansion ratio, so it is solved once for each pair and cached. Each
+        solve starts from the last ratio that was solved for, as a motor's k and nozzle usually change little between
+        solves."""
+        key = (k, self.calcExpansion())
+        pRatio = self.pressureRatios.get(key)
+        if pRatio is None:
+            pRatio = pRatioFromERatio(k, key[1], self.lastPressureRatio)
+            self.pressureRatios[key] = pRatio
+            self.lastPressureRatio = pRatio
+        return pRatio
+
     def getExitPressure(self, k, inputPressure):
         """Solves for the nozzle's exit pressure, given an input pressure and the gas's specific heat ratio."""
-        return fsolve(lambda x: (1/self.calcExpansion()) - eRatioFromPRatio(k, x / inputPressure), 0)[0]
+        return self.getPressureRatio(k) * inputPressure
 
     def getDivergenceLosses(self):
         """Returns nozzle efficiency losses due to divergence angle"""
@@ -0,0 +1,310 @@
+"""This module measures how a core made of polygons regresses by offsetting the polygons directly instead of solving a
+regression map. Coordinates are normalized so that the casting tube is the unit circle. After regressing some depth, the
+edge of the port is made up of pieces of lines parallel to the polygons' edges and of arcs around their convex vertices,
+so its area and perimeter can be found exactly for any depth rather than to the resolution of a map."""
+
+import numpy as np
+
+class PolygonOffset():
+    """Measures the port of a core made of 'polygons', which is a list of polygons that are each a list of [x, y]
+    points in normalized coordinates. Where polygons overlap, the core is their union."""
+    chunkSize = 512 # Number of curves or points processed at once, to keep the intermediate arrays small
+    minDepth = 1e-6 # Depths are clamped to this, as the edge of the port collapses onto the core at a depth of 0
+
+    def __init__(self, polygons):
+        starts, ends, polygonStarts = [], [], []
+        cornerCenters, cornerStarts, cornerSweeps, cornerEdges = [], [], [], []
+        for polygon in polygons:
+            points = np.array(polygon, dtype=np.float64).reshape(-1, 2)
+            # Drop repeated points, including a closing point that matches the first. Points from DXF files that
+            # should be shared by two entities are often slightly apart, so nearly repeated points are dropped too.
+            points = points[np.linalg.norm(points - np.roll(points, 1, axis=0), axis=1) > 1e-9]
+            if len(points) < 3:
+                continue
+            following = np.roll(points, -1, axis=0)
+            # Wind every polygon counterclockwise so that the right side of each edge is outside of the core
+            if np.sum((points[:, 0] * following[:, 1]) - (following[:, 0] * points[:, 1])) < 0:
+                points, following = following[::-1], points[::-1]
+            polygonStart = sum([len(edges) for edges in starts])
+            polygonStarts.append(polygonStart)
+            starts.append(points)
+            ends.append(following)
+
+            # The edge of the port can only curve around convex vertices, where it sweeps from the outward normal of
+            # the edge before the vertex to the normal of the edge after it
+            angles = np.arctan2(following[:, 1] - points[:, 1], following[:, 0] - points[:, 0]) - (np.pi / 2)
+            turns = np.mod(angles - np.roll(angles, 1) + np.pi, 2 * np.pi) - np.pi
+            convex = turns > 0
+            cornerCenters.append(points[convex])
+            cornerStarts.append(np.roll(angles, 1)[convex])
+            cornerSweeps.append(turns[convex])
+            # The edges before and after each corner, which are the edges nearest to its arc
+            corners = np.flatnonzero(convex)
+            cornerEdges.append(polygonStart + np.stack((np.mod(corners - 1, len(points)), corners), axis=1))
+
+        if len(starts) == 0:
+            raise ValueError('Core must have at least one polygon with three or more points')
+        self.edgeStarts = np.concatenate(starts)
+        self.edgeEnds = np.concatenate(ends)
+        self.polygonStarts = np.array(polygonStarts)
+        directions = self.edgeEnds - self.edgeStarts
+        directions /= np.linalg.norm(directions, axis=1)[:, None]
+        self.edgeNormals = np.stack((directions[:, 1], -directions[:, 0]), axis=1)
+        self.edgeLows = np.minimum(self.edgeStarts, self.edgeEnds)
+        self.edgeHighs = np.maximum(self.edgeStarts, self.edgeEnds)
+        self.cornerCenters = np.concatenate(cornerCenters)
+        self.cornerStarts = np.concatenate(cornerStarts)
+        self.cornerSweeps = np.concatenate(cornerSweeps)
+        self.cornerEdges = np.concatenate(cornerEdges)
+
+    def getDistances(self, points, reach):
+        """Returns the distance from each of 'points' to the nearest edge of the core, and the index of that edge. When
+        several edges are equally close, the lowest index is returned. Only edges whose bounding boxes are within
+        'reach' of a point are checked, so points that are further than that from every edge get a distance of
+        infinity and an index of -1. The reach is padded slightly so that edges exactly 'reach' away aren't missed to
+        rounding."""
+        reach = (reach * (1 + 1e-6)) + 1e-12
+        pointIndices, edgeIndices = getOverlaps(points - reach, points + reach, self.edgeLows, self.edgeHighs,
+                                                self.chunkSize)
+        starts = self.edgeStarts[edgeIndices]
+        edges = self.edgeEnds[edgeIndices] - starts
+        offsets = points[pointIndices] - starts
+        along = np.clip(np.sum(offsets * edges, axis=1) / np.sum(edges ** 2, axis=1), 0, 1)
+        squared = np.sum((offsets - (along[:, None] * edges)) ** 2, axis=1)
+
+        distances, nearest = np.full(len(points), np.inf), np.full(len(points), -1)
+        if len(pointIndices) == 0:
+            return distances, nearest
+        # The pairs are sorted by point, so each point's edges can be reduced as a group
+        groups = np.flatnonzero(np.diff(pointIndices, prepend=-1))
+        minimum = np.minimum.reduceat(squared, groups)
+        closest = squared <= (np.repeat(minimum, np.diff(np.append(groups, len(squared)))) * (1 + 1e-8))
+        distances[pointIndices[groups]] = minimum ** 0.5
+        nearest[pointIndices[groups]] = np.minimum.reduceat(np.where(closest, edgeIndices, len(self.edgeStarts)),
+                                                            groups)
+        return distances, nearest
+
+    def isInCore(self, points):
+        """Returns a boolean array that is true for each of 'points' that is inside any of the polygons."""
+        inside = np.empty(len(points), dtype=bool)
+        startX, startY = self.edgeStarts[:, 0], self.edgeStarts[:, 1]
+        endX, endY = self.edgeEnds[:, 0], self.edgeEnds[:, 1]
+        for start in range(0, len(points), self.chunkSize):
+            chunk = points[start:start + self.chunkSize]
+            pointX, pointY = chunk[:, 0, None], chunk[:, 1, None]
+            straddles = (startY > pointY) != (endY > pointY)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                crossX = startX + ((pointY - startY) * (endX - startX) / (endY - startY))
+            crossings = np.logical_and(straddles, pointX < crossX).astype(int)
+            counts = np.add.reduceat(crossings, self.polygonStarts, axis=1)
+            inside[start:start + self.chunkSize] = np.any(counts % 2 == 1, axis=1)
+        return inside
+
+    def measure(self, depth):
+        """Returns a tuple of the area of the port and the length of its edge after the core has regressed 'depth',
+        leaving out anything outside of the casting tube. The candidates for the edge of the port are the core's edges
+        moved out by 'depth' and arcs of radius 'depth' around its convex vertices. Each is split wherever it crosses
+        another candidate or the casting tube, and the pieces that are exactly 'depth' from the core make up the edge.
+        The area comes from integrating around the edge of the port and the parts of the casting tube inside it with
+        Green's theorem, so all pieces are oriented with the port on their left."""
+        depth = max(depth, self.minDepth)
+        lineStarts = self.edgeStarts + (depth * self.edgeNormals)
+        lineEnds = self.edgeEnds + (depth * self.edgeNormals)
+        # The last arc is the whole casting tube
+        centers = np.concatenate((self.cornerCenters, [[0, 0]]))
+        radii = np.append(np.full(len(self.cornerCenters), depth), 1)
+        arcStarts = np.append(self.cornerStarts, 0)
+        arcSweeps = np.append(self.cornerSweeps, 2 * np.pi)
+
+        lines, lineLow, lineHigh, arcs, arcLow, arcHigh = splitCurves(lineStarts, lineEnds, centers, radii, arcStarts,
+                                                                      arcSweeps, self.chunkSize)
+        directions = lineEnds[lines] - lineStarts[lines]
+        pieceStarts = lineStarts[lines] + (lineLow[:, None] * directions)
+        pieceEnds = lineStarts[lines] + (lineHigh[:, None] * directions)
+        lineLengths = np.linalg.norm(pieceEnds - pieceStarts, axis=1)
+        lineAreas = ((pieceStarts[:, 0] * pieceEnds[:, 1]) - (pieceEnds[:, 0] * pieceStarts[:, 1])) / 2
+
+        centerX, centerY, radius = centers[arcs, 0], centers[arcs, 1], radii[arcs]
+        low, high = arcStarts[arcs] + arcLow, arcStarts[arcs] + arcHigh
+        middle = (low + high) / 2
+        arcMidpoints = np.stack((centerX + (radius * np.cos(middle)), centerY + (radius * np.sin(middle))), axis=1)
+        arcLengths = radius * (high - low)
+        arcAreas = ((radius ** 2) * (high - low)) + (radius * centerX * (np.sin(high) - np.sin(low)))
+        arcAreas = (arcAreas - (radius * centerY * (np.cos(high) - np.cos(low)))) / 2
+
+        points = np.concatenate(((pieceStarts + pieceEnds) / 2, arcMidpoints))
+        isCasing = np.append(np.zeros(len(lines), dtype=bool), arcs == len(centers) - 1)
+        # Only pieces inside the tube and the pieces of the tube itself have to be checked against the core. Pieces
+        # that lie on the tube are left to the tube.
+        check = np.logical_or(np.sum(points ** 2, axis=1) < 1 - 1e-9, isCasing)
+        distances, nearest = np.zeros(len(points)), np.full(len(points), -1)
+        distances[check], nearest[check] = self.getDistances(points[check], depth)
+        # Where edges or vertices of overlapping polygons line up, only the offset of the first one is kept. A piece
+        # is owned by the edge it came from, or for arcs, by either edge next to the corner.
+        corners = np.minimum(arcs, len(self.cornerEdges) - 1)
+        isOwner = np.append(nearest[:len(lines)] == lines,
+                            np.any(nearest[len(lines):, None] == self.cornerEdges[corners], axis=1))
+        farEnough = np.logical_and(check, distances >= depth * (1 - 1e-7))
+        inCore = np.zeros(len(points), dtype=bool)
+        inCore[farEnough] = self.isInCore(points[farEnough])
+        keepEdge = np.logical_and(np.logical_and(farEnough, np.logical_not(inCore)),
+                                  np.logical_and(isOwner, np.logical_not(isCasing)))
+        # Where the offsets of two edges facing each other meet, the line between them has port on both sides and
+        # isn't part of the edge. This is found by stepping off the line away from its edge and checking that the
+        # step leaves the port.
+        step = depth * 1e-6
+        seams = np.flatnonzero(keepEdge[:len(lines)])
+        stepDistances = self.getDistances(points[seams] + (step * self.edgeNormals[lines[seams]]), depth)[0]
+        keepEdge[seams[stepDistances < depth + (step / 2)]] = False
+        keepCasing = np.logical_and(isCasing, np.logical_or(distances <= depth * (1 + 1e-7), inCore))
+
+        lengths = np.concatenate((lineLengths, arcLengths))
+        areas = np.concatenate((lineAreas, arcAreas))
+        return np.sum(areas[np.logical_or(keepEdge, keepCasing)]), np.sum(lengths[keepEdge])
+
+    def getWallWeb(self):
+        """Returns the depth at which the port fills the casting tube, which is found by bisecting for the depth where
+        the edge of the port inside the tube vanishes."""
+        low, high = 0, 2
+        while high - low > 1e-9:
+            middle = (low + high) / 2
+            if self.measure(middle)[1] > 0:
+                low = middle
+            else:
+                high = middle
+        return high
+
+
+def getOverlaps(lowsA, highsA, lowsB, highsB, chunkSize):
+    """Returns a pair of index arrays for every box in A that overlaps a box in B. Boxes are given by the coordinates
+    of their lower left and upper right corners."""
+    indicesA, indicesB = [np.zeros(0, dtype=int)], [np.zeros(0, dtype=int)]
+    for start in range(0, len(lowsA), chunkSize):
+        chunk = slice(start, start + chunkSize)
+        overlaps = np.logical_and(lowsA[chunk, 0, None] <= highsB[:, 0], highsA[chunk, 0, None] >= lowsB[:, 0])
+        overlaps &= np.logical_and(lowsA[chunk, 1, None] <= highsB[:, 1], highsA[chunk, 1, None] >= lowsB[:, 1])
+        rows, cols = np.nonzero(overlaps)
+        indicesA.append(rows + start)
+        indicesB.append(cols)
+    return np.concatenate(indicesA), np.concatenate(indicesB)
+
+def splitCurves(lineStarts, lineEnds, centers, radii, arcStarts, arcSweeps, chunkSize):
+    """Splits lines and arcs at every point where they cross each other. Returns the index of the line each line
+    piece came from and the parameters along the line where the piece starts and ends, followed by the same for the
+    arcs, where the parameters are angles from the start of the arc. Only curves whose bounding boxes overlap are
+    checked against each other."""
+    directions = lineEnds - lineStarts
+    lineLows, lineHighs = np.minimum(lineStarts, lineEnds), np.maximum(lineStarts, lineEnds)
+    circleLows, circleHighs = centers - radii[:, None], centers + radii[:, None]
+
+    lineParams = [np.zeros(len(lineStarts)), np.ones(len(lineStarts))]
+    lineIndices = [np.arange(len(lineStarts))] * 2
+    arcParams = [np.zeros(len(centers)), arcSweeps]
+    arcIndices = [np.arange(len(centers))] * 2
+
+    first, second = getOverlaps(lineLows, lineHighs, lineLows, lineHighs, chunkSize)
+    params = intersectLines(lineStarts[first], directions[first], lineStarts[second], directions[second])
+    lineParams.append(params)
+    lineIndices.append(first)
+    # Lines from overlapping polygons can lie on top of each other, in which case they are split where the other ends
+    for params in projectCollinearEnds(lineStarts[first], directions[first], lineStarts[second], directions[second]):
+        lineParams.append(params)
+        lineIndices.append(first)
+
+    lines, circles = getOverlaps(lineLows, lineHighs, circleLows, circleHighs, chunkSize)
+    for params, angles in intersectLineCircle(lineStarts[lines], directions[lines], centers[circles], radii[circles]):
+        angles = np.mod(angles - arcStarts[circles], 2 * np.pi)
+        lineParams.append(np.where(isOnArc(angles, arcSweeps[circles]), params, np.nan))
+        lineIndices.append(lines)
+        arcParams.append(np.where(np.logical_and(params >= -1e-9, params <= 1 + 1e-9), angles, np.nan))
+        arcIndices.append(circles)
+
+    first, second = getOverlaps(circleLows, circleHighs, circleLows, circleHighs, chunkSize)
+    for angles in intersectCircles(centers[first], radii[first], centers[second], radii[second]):
+        crossX = centers[first, 0] + (radii[first] * np.cos(angles)) - centers[second, 0]
+        crossY = centers[first, 1] + (radii[first] * np.sin(angles)) - centers[second, 1]
+        otherAngles = np.mod(np.arctan2(crossY, crossX) - arcStarts[second], 2 * np.pi)
+        angles = np.mod(angles - arcStarts[first], 2 * np.pi)
+        arcParams.append(np.where(isOnArc(otherAngles, arcSweeps[second]), angles, np.nan))
+        arcIndices.append(first)
+    # Arcs around vertices that polygons share lie on top of each other, so like lines, they are split where the
+    # other ends. The same goes for an arc that lies on the casting tube.
+    coincident = np.logical_and(np.all(np.abs(centers[first] - centers[second]) <= 1e-12, axis=1),
+                                np.abs(radii[first] - radii[second]) <= 1e-12)
+    for angles in (arcStarts[second], arcStarts[second] + arcSweeps[second]):
+        arcParams.append(np.where(coincident, np.mod(angles - arcStarts[first], 2 * np.pi), np.nan))
+        arcIndices.append(first)
+
+    lineIndices, lineParams = np.concatenate(lineIndices), np.concatenate(lineParams)
+    onLine = np.logical_and(lineParams >= 0, lineParams <= 1)
+    arcIndices, arcParams = np.concatenate(arcIndices), np.concatenate(arcParams)
+    onArc = arcParams <= arcSweeps[arcIndices]
+    return getPieces(lineIndices[onLine], lineParams[onLine]) + getPieces(arcIndices[onArc], arcParams[onArc])
+
+def isOnArc(angles, sweeps):
+    """Returns a boolean array that is true where the angle measured from the start of an arc is on the arc. Points
+    just past the ends of the arc are included, so that crossings at the ends aren't lost to rounding."""
+    return np.logical_or(angles <= sweeps + 1e-9, angles >= (2 * np.pi) - 1e-9)
+
+def intersectLines(startsA, directionsA, startsB, directionsB):
+    """Returns the parameter along each line in A where it crosses the matching line in B. The parameter is NaN
+    where the lines are parallel or the crossing is past the ends of the line in B."""
+    cross = (directionsA[:, 0] * directionsB[:, 1]) - (directionsA[:, 1] * directionsB[:, 0])
+    offsetX, offsetY = startsB[:, 0] - startsA[:, 0], startsB[:, 1] - startsA[:, 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cross = np.where(np.abs(cross) > 1e-14, cross, np.nan)
+        paramsA = ((offsetX * directionsB[:, 1]) - (offsetY * directionsB[:, 0])) / cross
+        paramsB = ((offsetX * directionsA[:, 1]) - (offsetY * directionsA[:, 0])) / cross
+    paramsA[np.logical_not(np.logical_and(paramsB >= 0, paramsB <= 1))] = np.nan
+    return paramsA
+
+def projectCollinearEnds(startsA, directionsA, startsB, directionsB):
+    """Returns a pair of arrays with the parameters along each line in A of the start and end of the matching line in
+    B. The parameters are NaN unless the lines are collinear."""
+    lengths = np.sum(directionsA ** 2, axis=1)
+    offsets = startsB - startsA
+    cross = (directionsA[:, 0] * directionsB[:, 1]) - (directionsA[:, 1] * directionsB[:, 0])
+    apart = (directionsA[:, 0] * offsets[:, 1]) - (directionsA[:, 1] * offsets[:, 0])
+    collinear = np.logical_and(np.abs(cross) <= 1e-14, np.abs(apart) <= 1e-12 * lengths ** 0.5)
+    startParams = np.sum(offsets * directionsA, axis=1) / lengths
+    endParams = np.sum((offsets + directionsB) * directionsA, axis=1) / lengths
+    return np.where(collinear, startParams, np.nan), np.where(collinear, endParams, np.nan)
+
+def intersectLineCircle(starts, directions, centers, radii):
+    """Returns the two points where each line crosses the matching circle, as a pair of tuples that each hold the
+    parameters along the lines and the angles on the circles. Both are NaN where the line misses the circle. Lines that
+    just touch a circle cross it twice at the same point, so that the curves are still split there."""
+    offsetX, offsetY = starts[:, 0] - centers[:, 0], starts[:, 1] - centers[:, 1]
+    quadA = np.sum(directions ** 2, axis=1)
+    quadB = 2 * ((directions[:, 0] * offsetX) + (directions[:, 1] * offsetY))
+    quadC = (offsetX ** 2) + (offsetY ** 2) - (radii ** 2)
+    discriminant = (quadB ** 2) - (4 * quadA * quadC)
+    with np.errstate(invalid='ignore'):
+        touching = discriminant >= -1e-9 * quadA * (radii ** 2)
+        root = np.where(touching, np.maximum(discriminant, 0), np.nan) ** 0.5
+    crossings = []
+    for sign in (-1, 1):
+        params = (-quadB + (sign * root)) / (2 * quadA)
+        angles = np.arctan2(offsetY + (params * directions[:, 1]), offsetX + (params * directions[:, 0]))
+        crossings.append((params, angles))
+    return crossings
+
+def intersectCircles(centersA, radiiA, centersB, radiiB):
+    """Returns two arrays of the angles on each circle in A where it crosses the matching circle in B. Angles are NaN
+    for circles that don't cross. Circles that just touch cross twice at the same angle."""
+    offsetX, offsetY = centersB[:, 0] - centersA[:, 0], centersB[:, 1] - centersA[:, 1]
+    distance = ((offsetX ** 2) + (offsetY ** 2)) ** 0.5
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cosine = ((radiiA ** 2) - (radiiB ** 2) + (distance ** 2)) / (2 * distance * radiiA)
+        spread = np.arccos(np.where(np.abs(cosine) <= 1 + 1e-9, np.clip(cosine, -1, 1), np.nan))
+    base = np.arctan2(offsetY, offsetX)
+    return base - spread, base + spread
+
+def getPieces(curves, params):
+    """Takes parallel arrays of curve indices and parameters along those curves, including the start and end of each
+    curve, and returns the curve index and starting and ending parameter of each piece between consecutive
+    parameters."""
+    order = np.lexsort((params, curves))
+    curves, params = curves[order], params[order]
+    valid = np.logical_and(curves[:-1] == curves[1:], params[1:] - params[:-1] > 1e-12)
+    return curves[:-1][valid], params[:-1][valid], params[1:][valid]
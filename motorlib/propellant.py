@@ -1,5 +1,7 @@
 """Propellant submodule that contains the propellant class."""
 
+from bisect import bisect_left, bisect_right
+
 from .properties import PropertyCollection, FloatProperty, StringProperty, TabularProperty
 from .simResult import SimAlert, SimAlertLevel, SimAlertType
 from .constants import gasConstant
@@ -19,6 +21,130 @@ class PropellantTab(PropertyCollection):
             self.setProperties(tabDict)
 
 
+class PropellantTabIndex():
+    """A compiled copy of a propellant's tabs, which simulations use to look up combustion properties and chamber
+    pressures without scanning every tab. The tabs are sorted by pressure so the tab covering a pressure can be found by
+    bisection, and each tab's c* denominator and 1/(1-n) exponent are worked out ahead of time. For the chamber
+    pressure, each tab accepts the range of Kn that produces a pressure inside its range, so the tabs that could accept
+    a Kn are found by bisecting the ends of those ranges. Lookups return the same tab as scanning the tabs in order
+    would, including which tab wins a tie. Propellants with overlapping tabs aren't valid, and are always scanned."""
+    def __init__(self, tabs, density):
+        self.density = density
+        self.properties = [(tab['a'], tab['n'], tab['k'], tab['t'], tab['m']) for tab in tabs]
+        self.minPressures = [tab['minPressure'] for tab in tabs]
+        self.maxPressures = [tab['maxPressure'] for tab in tabs]
+        self.exponents = [1 / (1 - ballN) for _, ballN, _, _, _ in self.properties]
+        self.denominators = [((gamma / ((gasConstant / molarMass) * temp))
+                              * ((2 / (gamma + 1)) ** ((gamma + 1) / (gamma - 1)))) ** 0.5
+                             for _, _, gamma, temp, molarMass in self.properties]
+        self.minValidPressure = min(self.minPressures) if tabs else None
+        self.maxValidPressure = max(self.maxPressures) if tabs else None
+
+        # Tabs with ranges that contain pressures, sorted by the start of their range
+        ranged = [tid for tid in range(len(tabs)) if self.minPressures[tid] < self.maxPressures[tid]]
+        self.sortedTabs = sorted(ranged, key=lambda tid: self.minPressures[tid])
+        self.sortedMinPressures = [self.minPressures[tid] for tid in self.sortedTabs]
+        self.overlapping = any([self.maxPressures[first] > self.minPressures[second]
+                                for first, second in zip(self.sortedTabs, self.sortedTabs[1:])])
+
+        # Every end of every range, for finding the closest tab to a pressure outside of all of them. A scan checks
+        # each tab's minimum before its maximum, which is the order of the ranks.
+        ends = sorted([(self.minPressures[tid], 2 * tid) for tid in range(len(tabs))]
+                      + [(self.maxPressures[tid], (2 * tid) + 1) for tid in range(len(tabs))])
+        self.ends = [pressure for pressure, _ in ends]
+        self.endRanks = [rank for _, rank in ends]
+
+        # The range of Kn each tab accepts is widened a little so that rounding can't leave out a tab that accepts
+        knRanges = [self.getKnRange(tid) for tid in range(len(tabs))]
+        self.knBreaks = sorted(set([kn for knRange in knRanges for kn in knRange if kn not in (0, float('inf'))]))
+        segmentEnds = [0] + self.knBreaks + [float('inf')]
+        self.knCandidates = [[tid for tid, (low, high) in enumerate(knRanges) if low <= end and start <= high]
+                             for start, end in zip(segmentEnds, segmentEnds[1:])]
+
+    def getKnRange(self, tid):
+        """Returns the lowest and highest Kn that give tab 'tid' a pressure in its range, widened by a tiny margin."""
+        ballA, ballN, _, _, _ = self.properties[tid]
+        def getKn(pressure):
+            return (pressure ** (1 - ballN)) * self.denominators[tid] / (self.density * ballA)
+        if self.minPressures[tid] == self.minValidPressure:
+            low = 0
+        else:
+            low = getKn(self.minPressures[tid]) * (1 - 1e-9)
+        if self.maxPressures[tid] == self.maxValidPressure:
+            high = float('inf')
+        else:
+            high = getKn(self.maxPressures[tid]) * (1 + 1e-9)
+        return low, high
+
+    def getTab(self, pressure):
+        """Returns the index of the tab that covers 'pressure', or the tab with the closest end to it if none do."""
+        if self.overlapping:
+            for tid, (minPressure, maxPressure) in enumerate(zip(self.minPressures, self.maxPressures)):
+                if minPressure < pressure < maxPressure:
+                    return tid
+        else:
+            position = bisect_left(self.sortedMinPressures, pressure) - 1
+            if position >= 0 and pressure < self.maxPressures[self.sortedTabs[position]]:
+                return self.sortedTabs[position]
+
+        # Otherwise, find the closest ends above and below, and pick the first tab that has one of them in a scan
+        position = bisect_left(self.ends, pressure)
+        distances = {}
+        if position > 0:
+            distances[self.ends[position - 1]] = pressure - self.ends[position - 1]
+        if position < len(self.ends):
+            distances[self.ends[position]] = self.ends[position] - pressure
+        closest = min(distances.values())
+        ranks = []
+        for end, distance in distances.items():
+            if distance == closest:
+                ranks += self.endRanks[bisect_left(self.ends, end):bisect_right(self.ends, end)]
+        return min(ranks) // 2
+
+    def getCombustionProperties(self, pressure):
+        """Returns a, n, gamma, combustion temp and molar mass for a given pressure"""
+        return self.properties[self.getTab(pressure)]
+
+    def getTabPressure(self, tid, kn):
+        """Returns the steady state pressure that tab 'tid' gives at a Kn of 'kn'."""
+        num = kn * self.density * self.properties[tid][0]
+        return (num / self.denominators[tid]) ** self.exponents[tid]
+
+    def acceptsPressure(self, tid, tabPressure):
+        """Returns if 'tabPressure' is in the range of tab 'tid'. The lowest and highest tabs extend past their ends."""
+        minTabPressure = self.minPressures[tid]
+        maxTabPressure = self.maxPressures[tid]
+        if minTabPressure == self.minValidPressure and tabPressure < maxTabPressure:
+            return True
+        if maxTabPressure == self.maxValidPressure and minTabPressure < tabPressure:
+            return True
+        return minTabPressure < tabPressure < maxTabPressure
+
+    def getChamberPressure(self, kn):
+        """Returns the steady state chamber pressure at a Kn of 'kn'. The first tab that produces a pressure in its own
+        range is used, and if none do, the pressure from the tab that misses its range by the least is used."""
+        for tid in self.knCandidates[bisect_right(self.knBreaks, kn)]:
+            tabPressure = self.getTabPressure(tid, kn)
+            if self.acceptsPressure(tid, tabPressure):
+                return tabPressure
+
+        closestPressure = None
+        closestError = None
+        for tid in range(len(self.properties)):
+            tabPressure = self.getTabPressure(tid, kn)
+            error = min(abs(self.minPressures[tid] - tabPressure), abs(tabPressure - self.maxPressures[tid]))
+            if closestError is None or error < closestError:
+                closestPressure, closestError = tabPressure, error
+        return closestPressure
+
+    def inRange(self, pressure):
+        """Returns if any of the tabs cover 'pressure'."""
+        if len(self.properties) == 0:
+            return False
+        tid = self.getTab(pressure)
+        return self.minPressures[tid] < pressure < self.maxPressures[tid]
+
+
 class Propellant(PropertyCollection):
     """Contains the physical and thermodynamic properties of a propellant formula."""
     def __init__(self, propDict=None):
@@ -26,9 +152,25 @@ class Propellant(PropertyCollection):
         self.props['name'] = StringProperty('Name')
         self.props['density'] = FloatProperty('Density', 'kg/m^3', 1, 10000)
         self.props['tabs'] = TabularProperty('Properties', PropellantTab)
+        self.tabIndex = None
         if propDict is not None:
             self.setProperties(propDict)
 
+    def setProperties(self, props):
+        super().setProperties(props)
+        self.tabIndex = None
+
+    def setProperty(self, prop, value):
+        super().setProperty(prop, value)
+        self.tabIndex = None
+
+    def getTabIndex(self):
+        """Returns the propellant's tabs compiled into a PropellantTabIndex. It is built the first time it is needed
+        and kept until one of the propellant's properties is changed."""
+        if self.tabIndex is None:
+            self.tabIndex = PropellantTabIndex(self.getProperty('tabs'), self.getProperty('density'))
+        return self.tabIndex
+
     def getCStar(self, pressure):
         """Returns the propellant's characteristic velocity."""
         _, _, gamma, temp, molarMass = self.getCombustionProperties(pressure)
@@ -43,19 +185,11 @@ class Propellant(PropertyCollection):
 
     def getCombustionProperties(self, pressure):
         """Returns the propellant's a, n, gamma, combustion temp and molar mass for a given pressure"""
-        closest = {}
-        closestPressure = 1e100
-        for tab in self.getProperty('tabs'):
-            if tab['minPressure'] < pressure < tab['maxPressure']:
-                return tab['a'], tab['n'], tab['k'], tab['t'], tab['m']
-            if abs(pressure - tab['minPressure']) < closestPressure:
-                closest = tab
-                closestPressure = abs(pressure - tab['minPressure'])
-            if abs(pressure - tab['maxPressure']) < closestPressure:
-                closest = tab
-                closestPressure = abs(pressure - tab['maxPressure'])
-
-        return closest['a'], closest['n'], closest['k'], closest['t'], closest['m']
+        return self.getTabIndex().getCombustionProperties(pressure)
+
+    def getIdealPressure(self, kn):
+        """Returns the steady state chamber pressure the propellant reaches at a Kn of 'kn'."""
+        return self.getTabIndex().getChamberPressure(kn)
 
     def getMinimumValidPressure(self):
         """Returns the lowest pressure value with associated combustion properties"""
@@ -87,9 +221,8 @@ class Propellant(PropertyCollection):
         """Returns if the propellant has any errors associated with the supplied pressure such as not having set
         combustion properties"""
         errors = []
-        for tab in self.getProperty('tabs'):
-            if tab['minPressure'] < pressure < tab['maxPressure']:
-                return errors
+        if self.getTabIndex().inRange(pressure):
+            return errors
         aText = "Chamber pressure deviated from propellant's entered ranges. Results may not be accurate."
         errors.append(SimAlert(SimAlertLevel.WARNING, SimAlertType.VALUE, aText, 'Propellant'))
         return errors
@@ -97,3 +230,4 @@ class Propellant(PropertyCollection):
     def addTab(self, tab):
         """Adds a set of combustion properties to the propellant"""
         self.props['tabs'].addTab(tab)
+        self.tabIndex = None
@@ -0,0 +1,172 @@
+"""This module contains caches that let FMM grains reuse regression maps and the tables derived from them instead of
+re-running the fast marching method for geometry that has already been solved. Entries are dictionaries of arrays in
+normalized map units, so grains that only differ in diameter or length can share them."""
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+# Included in every key, so it has to be increased whenever a change to the code alters what gets stored for the same
+# geometry. Entries made by older versions are then never loaded, and get evicted like any unused entry.
+cacheFormatVersion = 4
+
+def getEntrySize(data):
+    """Returns the number of bytes used by the arrays in a cache entry."""
+    return sum([array.nbytes for array in data.values()])
+
+def getShapeKey(geomName, properties, mapDim, extra=None):
+    """Returns a hex digest that identifies a regression map. The properties are serialized with sorted keys so the
+    same geometry always produces the same key, and 'extra' can be used to include any other settings that affect the
+    cached data. The key also includes 'cacheFormatVersion'."""
+    description = json.dumps([cacheFormatVersion, geomName, properties, mapDim, extra], sort_keys=True)
+    return hashlib.sha1(description.encode('utf-8')).hexdigest()
+
+
+class DiskCache():
+    """Stores regression data on disk so it survives between sessions. Each entry is a compressed numpy archive named
+    after its key. When the total size of the entries passes 'maxSize' bytes, the least recently used ones are deleted.
+    Loading an entry marks it as used by updating its modification time."""
+    def __init__(self, path, maxSize):
+        self.path = path
+        self.maxSize = maxSize
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+    def getEntryPath(self, key):
+        """Returns the path of the file that holds the entry with the given key."""
+        return os.path.join(self.path, '{}.npz'.format(key))
+
+    def load(self, key):
+        """Returns a dictionary of the arrays stored under 'key', or None if there is no usable entry."""
+        entryPath = self.getEntryPath(key)
+        try:
+            with np.load(entryPath) as entry:
+                data = {name: entry[name] for name in entry.files}
+            os.utime(entryPath)
+            return data
+        except (OSError, ValueError, KeyError): # Missing or corrupted entries are treated as misses
+            return None
+
+    def save(self, key, data):
+        """Writes a dictionary of arrays to disk under 'key' and evicts old entries if the cache is over its size."""
+        try:
+            # Write to a unique temporary file first so that readers never see a partially written entry
+            with tempfile.NamedTemporaryFile(dir=self.path, suffix='.tmp', delete=False) as entryFile:
+                np.savez_compressed(entryFile, **data)
+            os.replace(entryFile.name, self.getEntryPath(key))
+        except OSError:
+            return
+        self.evict()
+
+    def evict(self):
+        """Deletes the least recently used entries until the cache is under its maximum size. Other processes can share
+        the cache, so entries that disappear while this runs are skipped."""
+        entries = []
+        for name in os.listdir(self.path):
+            if name.endswith('.npz'):
+                try:
+                    stat = os.stat(os.path.join(self.path, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        totalSize = sum([entry[1] for entry in entries])
+        for _, size, name in sorted(entries):
+            if totalSize <= self.maxSize:
+                break
+            try:
+                os.remove(os.path.join(self.path, name))
+                totalSize -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        """Deletes every entry in the cache."""
+        for name in os.listdir(self.path):
+            if name.endswith('.npz'):
+                os.remove(os.path.join(self.path, name))
+
+
+class MemoryCache():
+    """Keeps recently used entries in memory so they can be shared between grains and motor instances in the same
+    process. The arrays in stored entries are made read-only because every grain that loads the entry shares them.
+    When the entries use more than 'maxSize' bytes, the least recently used ones are dropped."""
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def load(self, key):
+        """Returns the entry stored under 'key', or None if there isn't one."""
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def save(self, key, data):
+        """Stores an entry under 'key' and drops old entries if the cache is over its size. Entries that are larger
+        than the whole cache are not stored."""
+        entrySize = getEntrySize(data)
+        if entrySize > self.maxSize:
+            return
+        for array in data.values():
+            array.setflags(write=False)
+        with self.lock:
+            if key in self.entries:
+                self.size -= getEntrySize(self.entries.pop(key))
+            self.entries[key] = data
+            self.size += entrySize
+            while self.size > self.maxSize:
+                _, oldest = self.entries.popitem(last=False)
+                self.size -= getEntrySize(oldest)
+
+    def clear(self):
+        """Drops every entry in the cache."""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+memoryCache = MemoryCache(256 * 2 ** 20)
+diskCache = None
+
+def setMemoryCache(maxSize):
+    """Sets the memory budget of the in-process cache in bytes, or disables it if 'maxSize' is None."""
+    global memoryCache # pylint: disable=global-statement
+    memoryCache = MemoryCache(maxSize) if maxSize is not None else None
+
+def setDiskCache(path, maxSize=256 * 2 ** 20):
+    """Enables the disk cache in the directory 'path', or disables it if 'path' is None. Raises OSError if the
+    directory can't be created, in which case the disk cache is left disabled and only the memory cache is used."""
+    global diskCache # pylint: disable=global-statement
+    diskCache = None
+    if path is not None:
+        diskCache = DiskCache(path, maxSize)
+
+def loadTables(key):
+    """Returns the entry stored under 'key' in the memory cache, falling back to the disk cache. Entries found on disk
+    are added to the memory cache. Returns None if neither cache has the entry."""
+    if memoryCache is not None:
+        data = memoryCache.load(key)
+        if data is not None:
+            return data
+    if diskCache is not None:
+        data = diskCache.load(key)
+        if data is not None:
+            if memoryCache is not None:
+                memoryCache.save(key, data)
+            return data
+    return None
+
+def saveTables(key, data):
+    """Stores an entry in all of the caches that are enabled."""
+    if diskCache is not None:
+        diskCache.save(key, data)
+    if memoryCache is not None:
+        memoryCache.save(key, data)
@@ -78,11 +78,18 @@ class LogChannel():
         """Adds a new datapoint to the end."""
         self.data.append(data)
 
-    def getAverage(self):
-        """Returns the average of the datapoints."""
+    def setData(self, data):
+        """Replaces all of the data in the channel with a list of datapoints."""
+        self.data = data
+
+    def getAverage(self, weights=None):
+        """Returns the average of the datapoints. If a list of weights is passed in, each datapoint counts in
+        proportion to its weight."""
         if self.valueType in (list, tuple):
             raise NotImplementedError('Average not supported for list types')
-        return sum(self.data) / len(self.data)
+        if weights is None:
+            return sum(self.data) / len(self.data)
+        return sum([point * weight for point, weight in zip(self.data, weights)]) / sum(weights)
 
     def getMax(self):
         """Returns the maximum value of all datapoints. For list datatypes, this operation finds the largest single
@@ -110,6 +117,8 @@ class SimulationResult():
 
         self.alerts = []
         self.success = False
+        self.grainMemoryUsage = [] # Bytes held by each grain once the simulation was set up
+        self.grainMapDims = [] # Regression map dimension each grain was set up with, or None if it has no map
 
         self.channels = {
             'time': LogChannel('Time', float, 's'),
@@ -143,9 +152,20 @@ class SimulationResult():
         """Returns the highest Kn that was observed during the motor's burn."""
         return self.channels['kn'].getMax()
 
+    def getStepDurations(self):
+        """Returns the length of time that each datapoint stands for, which is the length of the timestep that produced
+        it. The time channel is only evenly spaced for simulations with a fixed timestep, so averages over the burn are
+        weighted by these. The first datapoint gets the length of the first timestep, so all of the datapoints of a
+        fixed timestep simulation have the same weight."""
+        times = self.channels['time'].getData()
+        if len(times) < 2:
+            return [1 for time in times]
+        durations = [times[ind] - times[ind - 1] for ind in range(1, len(times))]
+        return [durations[0]] + durations
+
     def getAveragePressure(self):
         """Returns the average chamber pressure observed during the simulation."""
-        return self.channels['pressure'].getAverage()
+        return self.channels['pressure'].getAverage(self.getStepDurations())
 
     def getMaxPressure(self):
         """Returns the highest chamber pressure that was observed during the motor's burn."""
@@ -157,13 +177,13 @@ class SimulationResult():
         return min(exit_pressures)
         
     def getPercentBelowThreshold(self, channel, threshold):
-        """Returns the total number of seconds spent below a given threshold value"""
-        count = 0
-        data = self.channels[channel].getData()
-        for point in data:
+        """Returns the fraction of the burn time spent below a given threshold value"""
+        below = 0
+        durations = self.getStepDurations()
+        for point, duration in zip(self.channels[channel].getData(), durations):
             if point < threshold:
-                count += 1
-        return count/len(data)
+                below += duration
+        return below / sum(durations)
 
     def getImpulse(self, stop=None):
         """Returns the impulse the simulated motor produced. If 'stop' is set to a value other than None, only the
@@ -177,7 +197,7 @@ class SimulationResult():
 
     def getAverageForce(self):
         """Returns the average force the motor produced during its burn."""
-        return self.channels['force'].getAverage()
+        return self.channels['force'].getAverage(self.getStepDurations())
 
     def getDesignation(self):
         """Returns the standard amateur rocketry designation (H128, M1297) for the motor."""
@@ -0,0 +1,184 @@
+"""This module contains the simulation kernel, which steps a motor's burn forward in time. It keeps the state of the
+grains in arrays and writes each step into preallocated buffers, which are only copied into the channels of a
+SimulationResult once the burn is over."""
+
+import numpy as np
+
+from .simResult import singleValueChannels, multiValueChannels
+
+class SimulationKernel():
+    """Holds the state of a motor during a simulation. The regression, mass, mass flow, mass flux and web of the grains
+    are arrays with one element per grain, and the rest of the state is scalars. 'grainGeometry' holds the object each
+    grain's geometry is read from, which is either the grain or its geometry table. Each call to 'step' advances the
+    burn by one timestep and records it. The buffers start out with room for 'initialSteps' steps and double in size
+    whenever they fill up.
+
+    With a fixed timestep, the grains regress by the burn rate at the start of each step. With an adaptive timestep,
+    the burn rate at the end of the step is estimated too, and the grains regress by the average of the two. Half of
+    the difference between the two regressions is the error of the first, and steps where it is over the tolerance,
+    relative to the regression, are retried with a shorter timestep. The timestep grows again when the error is small,
+    so the burn is stepped through quickly where Kn is steady and slowly when it changes quickly, like when a grain
+    burns out."""
+    def __init__(self, motor, grainGeometry, initialSteps=1024):
+        self.motor = motor
+        self.grainGeometry = grainGeometry
+        self.density = motor.propellant.getProperty('density')
+        self.adaptive = motor.config.getProperty('timestepSelection') == 'Adaptive'
+        self.minDTime = motor.config.getProperty('minTimestep')
+        self.maxDTime = motor.config.getProperty('maxTimestep')
+        self.tolerance = motor.config.getProperty('timestepTolerance') / 100
+        # Adaptive simulations start with the smallest step so that ignition is resolved
+        self.dTime = self.minDTime if self.adaptive else motor.config.getProperty('timestep')
+        self.lastDTime = self.dTime
+        self.burnoutWebThres = motor.config.getProperty('burnoutWebThres')
+        self.slagCoeff = motor.nozzle.getProperty('slagCoeff')
+        self.erosionCoeff = motor.nozzle.getProperty('erosionCoeff')
+        self.motorVolume = motor.calcTotalVolume()
+
+        numGrains = len(grainGeometry)
+        self.regression = np.zeros(numGrains)
+        self.web = np.array([grain.getWebLeft(0) for grain in grainGeometry], dtype=np.float64)
+        self.initialWeb = self.web.copy()
+        self.mass = np.array([grain.getVolumeAtRegression(0) for grain in grainGeometry], dtype=np.float64)
+        self.mass *= self.density
+        self.massFlow = np.zeros(numGrains)
+        self.massFlux = np.zeros(numGrains)
+
+        # At t = 0, the motor has ignited
+        self.time = 0
+        self.dThroat = 0
+        self.kn = self.calcKN()
+        self.pressure = motor.calcIdealPressure(self.regression, self.dThroat, self.kn)
+        self.exitPressure = 0
+        self.force = 0
+        self.maxForce = 0
+        self.volumeLoading = self.calcVolumeLoading()
+
+        # Rows of the buffers are steps, and their columns follow the order of the channel lists
+        self.steps = 0
+        self.scalarBuffer = np.empty((initialSteps, len(singleValueChannels)))
+        self.grainBuffer = np.empty((initialSteps, len(multiValueChannels), numGrains))
+        self.recordStep()
+
+    def calcKN(self):
+        """Returns the Kn of the motor from the surface area of the grains that have web left."""
+        burningSurfaceArea = sum([self.grainGeometry[gid].getSurfaceAreaAtRegression(self.regression[gid])
+                                  for gid in np.nonzero(self.web > self.burnoutWebThres)[0]])
+        return burningSurfaceArea / self.motor.nozzle.getThroatArea(self.dThroat)
+
+    def calcVolumeLoading(self):
+        """Returns the percentage of the motor's volume that is filled with propellant."""
+        freeVolume = sum([grain.getFreeVolume(reg) for grain, reg in zip(self.grainGeometry, self.regression)])
+        return 100 * (1 - (freeVolume / self.motorVolume))
+
+    def recordStep(self):
+        """Writes the current state into the next row of the buffers, growing them first if they are full."""
+        if self.steps == len(self.scalarBuffer):
+            self.scalarBuffer = np.concatenate((self.scalarBuffer, np.empty_like(self.scalarBuffer)))
+            self.grainBuffer = np.concatenate((self.grainBuffer, np.empty_like(self.grainBuffer)))
+        self.scalarBuffer[self.steps] = (self.time, self.kn, self.pressure, self.force, self.volumeLoading,
+                                         self.exitPressure, self.dThroat)
+        self.grainBuffer[self.steps] = (self.mass, self.massFlow, self.massFlux, self.regression, self.web)
+        self.steps += 1
+
+    def shouldContinue(self, thrustThres):
+        """Returns if the simulation should continue based on the thrust from the last timestep, like
+        SimulationResult.shouldContinueSim, but without searching all of the thrust data for its peak."""
+        # With only one data point, there is nothing to compare
+        if self.steps == 1:
+            return True
+        # 0.01 converts the threshold to a %
+        return self.force > thrustThres * 0.01 * self.maxForce
+
+    def calcTrialPressure(self, burning, reg):
+        """Returns the pressure the motor would reach if the grains in 'burning' regressed by another 'reg'."""
+        burningSurfaceArea = 0
+        for gid in burning:
+            trialReg = self.regression[gid] + reg
+            if self.grainGeometry[gid].isWebLeft(trialReg, self.burnoutWebThres):
+                burningSurfaceArea += self.grainGeometry[gid].getSurfaceAreaAtRegression(trialReg)
+        kn = burningSurfaceArea / self.motor.nozzle.getThroatArea(self.dThroat)
+        return self.motor.calcIdealPressure(None, self.dThroat, kn)
+
+    def chooseStep(self, burning, burnRate):
+        """Returns the length of the next adaptive timestep and how far the grains in 'burning' regress during it, given
+        the burn rate at the start of the step. The length of the step after it is also picked here."""
+        while True:
+            dTime = self.dTime
+            trialBurnRate = self.motor.propellant.getBurnRate(self.calcTrialPressure(burning, dTime * burnRate))
+            if burnRate > 0:
+                error = abs(trialBurnRate - burnRate) / (2 * burnRate)
+            else:
+                error = 0
+            # The error is proportional to the step, so the step is scaled by how far the error is from the tolerance
+            if error > 0:
+                factor = min(max(0.9 * self.tolerance / error, 0.2), 2)
+            else:
+                factor = 2
+            self.dTime = min(max(dTime * factor, self.minDTime), self.maxDTime)
+            if error <= self.tolerance or dTime <= self.minDTime:
+                return dTime, dTime * (burnRate + trialBurnRate) / 2
+
+    def step(self):
+        """Advances the burn by one timestep and records the result. The grains that still have web regress at the
+        burn rate for the last pressure, or as picked by 'chooseStep' for adaptive timesteps. The mass flow out of each
+        grain is the sum of the mass burned in it and every grain forward of it, and the mass flux through a grain is
+        found from the flow into it from those forward grains."""
+        burning = np.nonzero(self.web > self.burnoutWebThres)[0]
+        burnRate = self.motor.propellant.getBurnRate(self.pressure)
+        if self.adaptive:
+            dTime, reg = self.chooseStep(burning, burnRate)
+        else:
+            dTime, reg = self.dTime, self.dTime * burnRate
+
+        # Find the mass of each grain before this step's regression
+        mass = np.zeros_like(self.mass)
+        mass[burning] = [self.grainGeometry[gid].getVolumeAtRegression(self.regression[gid]) for gid in burning]
+        mass *= self.density
+        burnedMassFlow = np.zeros_like(mass)
+        # The mass burned since the last step was burned during that step
+        burnedMassFlow[burning] = (self.mass[burning] - mass[burning]) / self.lastDTime
+        self.massFlow = np.cumsum(burnedMassFlow)
+        massIn = np.concatenate(([0], self.massFlow[:-1]))
+        self.massFlux = np.zeros_like(mass)
+        self.massFlux[burning] = [self.grainGeometry[gid].getPeakMassFlux(massIn[gid], dTime,
+                                                                          self.regression[gid], reg, self.density)
+                                  for gid in burning]
+        self.mass = mass
+
+        # Apply the regression
+        self.regression[burning] += reg
+        self.web = np.zeros_like(self.web)
+        self.web[burning] = [self.grainGeometry[gid].getWebLeft(self.regression[gid]) for gid in burning]
+        self.volumeLoading = self.calcVolumeLoading()
+
+        self.kn = self.calcKN()
+        self.pressure = self.motor.calcIdealPressure(self.regression, self.dThroat, self.kn)
+        _, _, gamma, _, _ = self.motor.propellant.getCombustionProperties(self.pressure)
+        self.exitPressure = self.motor.nozzle.getExitPressure(gamma, self.pressure)
+        self.force = self.motor.calcForce(self.pressure, self.dThroat, self.exitPressure)
+        self.maxForce = max(self.maxForce, self.force)
+        self.time += dTime
+        self.lastDTime = dTime
+
+        # Calculate any slag deposition or erosion of the throat
+        if self.pressure == 0:
+            slagRate = 0
+        else:
+            slagRate = (1 / self.pressure) * self.slagCoeff
+        erosionRate = self.pressure * self.erosionCoeff
+        self.dThroat += dTime * ((-2 * slagRate) + (2 * erosionRate))
+
+        self.recordStep()
+
+    def getProgress(self):
+        """Returns the fraction of the burn that is done, going by the grain with the largest fraction of its web
+        left."""
+        return 1 - np.amax(self.web / self.initialWeb)
+
+    def writeResults(self, simRes):
+        """Copies the recorded steps into the channels of 'simRes'."""
+        for column, name in enumerate(singleValueChannels):
+            simRes.channels[name].setData(self.scalarBuffer[:self.steps, column].tolist())
+        for column, name in enumerate(multiValueChannels):
+            simRes.channels[name].setData(self.grainBuffer[:self.steps, column].tolist())
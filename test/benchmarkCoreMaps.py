@@ -0,0 +1,44 @@
+"""Times core map generation for each of the grain types that use a regression map, at several map dimensions. Pass
+map dimensions as arguments to override the defaults."""
+
+import sys
+import time
+
+import numpy as np
+
+import motorlib.grains
+
+runs = 5
+mapDims = [int(arg) for arg in sys.argv[1:]] or [250, 500, 1000, 2000]
+
+# Properties of a typical example of each grain type, in a 98mm grain
+grainProperties = {
+    motorlib.grains.Finocyl: {'numFins': 64, 'finWidth': 0.001, 'finLength': 0.01, 'coreDiameter': 0.04,
+                              'invertedFins': False},
+    motorlib.grains.StarGrain: {'numPoints': 64, 'pointWidth': 0.005, 'pointLength': 0.035},
+    motorlib.grains.XCore: {'slotWidth': 0.005, 'slotLength': 0.03},
+    motorlib.grains.CGrain: {'slotWidth': 0.01, 'slotOffset': 0.01},
+    motorlib.grains.DGrain: {'slotOffset': 0.02},
+    motorlib.grains.MoonBurner: {'coreDiameter': 0.03, 'coreOffset': 0.01},
+    motorlib.grains.CustomGrain: {'dxfUnit': 'm', 'points': [[[0.02 * np.cos(angle), 0.02 * np.sin(angle)]
+                                                              for angle in np.linspace(0, 2 * np.pi, 200)]]}
+}
+
+def timeCoreMap(grain, mapDim):
+    """Returns the shortest time it took to generate the grain's core map out of several runs."""
+    times = []
+    for _ in range(runs):
+        grain.initGeometry(mapDim)
+        startTime = time.perf_counter()
+        grain.generateCoreMap()
+        times.append(time.perf_counter() - startTime)
+    return min(times)
+
+print('Grain type'.ljust(16) + ''.join([str(mapDim).rjust(10) for mapDim in mapDims]))
+for grainType, properties in grainProperties.items():
+    grain = grainType()
+    grain.setProperties({'diameter': 0.098, 'length': 0.1, 'inhibitedEnds': 'Neither'})
+    grain.setProperties(properties)
+    times = [timeCoreMap(grain, mapDim) for mapDim in mapDims]
+    print(grainType.geomName.ljust(16) + ''.join([(str(round(1000 * duration, 1)) + ' ms').rjust(10)
+                                                   for duration in times]))
@@ -0,0 +1,44 @@
+"""Times the ways of finding a nozzle's exit pressure: a fsolve from zero on every call like simulations used to do, a
+single solve with pRatioFromERatio, and the cached lookup that simulations use now. Pass a number of calls as an
+argument to override the default."""
+
+import sys
+import time
+
+from scipy.optimize import fsolve
+
+import motorlib.nozzle
+
+runs = 5
+calls = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+nozzle = motorlib.nozzle.Nozzle()
+nozzle.setProperties({'throat': 0.0254, 'exit': 0.0635})
+pressures = [1e6 + (5e6 * index / calls) for index in range(calls)]
+
+def fsolveExitPressure(k, inputPressure):
+    """Finds the exit pressure the way Nozzle.getExitPressure did before it cached pressure ratios."""
+    return fsolve(lambda x: (1/nozzle.calcExpansion()) - motorlib.nozzle.eRatioFromPRatio(k, x / inputPressure), 0)[0]
+
+def uncachedExitPressure(k, inputPressure):
+    """Solves for the pressure ratio on every call, without a starting guess."""
+    return motorlib.nozzle.pRatioFromERatio(k, nozzle.calcExpansion()) * inputPressure
+
+def timeMethod(method):
+    """Returns the shortest time per call that the method took out of several runs."""
+    times = []
+    for _ in range(runs):
+        nozzle.pressureRatios.clear()
+        startTime = time.perf_counter()
+        for pressure in pressures:
+            method(1.2, pressure)
+        times.append((time.perf_counter() - startTime) / calls)
+    return min(times)
+
+methods = {
+    'fsolve': fsolveExitPressure,
+    'Newton solve': uncachedExitPressure,
+    'Cached': nozzle.getExitPressure
+}
+for name, method in methods.items():
+    print(name.ljust(16) + (str(round(1e6 * timeMethod(method), 2)) + ' us').rjust(12))
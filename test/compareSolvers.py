@@ -0,0 +1,66 @@
+"""Simulates every motor in data/tests.yaml with each of the regression solvers and reports how long the simulations
+took and how much the results differ from the first solver. Run from the test directory, optionally passing a category
+from data/tests.yaml to only run those motors."""
+
+import sys
+import time
+import warnings
+import yaml
+
+import motorlib.motor
+import motorlib.regressionCache
+from motorlib.grain import regressionSolvers
+from uilib.fileIO import loadFile, fileTypes
+
+separator = '-' * 65
+
+def runSim(motorData, solver):
+    motor = motorlib.motor.Motor(motorData)
+    motor.config.setProperty('regressionSolver', solver)
+    # Make sure every run solves its own regression maps
+    motorlib.regressionCache.memoryCache.clear()
+    startTime = time.perf_counter()
+    simRes = motor.runSimulation()
+    return simRes, time.perf_counter() - startTime
+
+def getStats(simRes):
+    return {
+        'Burn Time': simRes.getBurnTime(),
+        'ISP': simRes.getISP(),
+        'Peak Kn': simRes.getPeakKN()
+    }
+
+def formatDifference(value, reference):
+    if reference == 0:
+        return str(round(value, 3))
+    return str(round(value, 3)) + ' (' + str(round(100 * (value - reference) / reference, 3)) + '%)'
+
+def compareSolvers(path):
+    print(separator)
+    with open(path, 'r') as readLocation:
+        fileData = yaml.safe_load(readLocation)
+    print("Comparing solvers for '" + fileData['name'] + "'")
+    motorData = loadFile(fileData['motor'], fileTypes.MOTOR)
+    if motorData is None:
+        print('Error loading motor for test!')
+        return
+    referenceStats = None
+    for solver in regressionSolvers:
+        simRes, wallTime = runSim(motorData, solver)
+        stats = getStats(simRes)
+        if referenceStats is None:
+            referenceStats = stats
+        print('\t' + solver + ': ' + str(round(wallTime, 3)) + ' s')
+        for title, value in stats.items():
+            print('\t\t' + title + ': ' + formatDifference(value, referenceStats[title]))
+
+warnings.filterwarnings('ignore')
+filterCategory = sys.argv[1] if len(sys.argv) > 1 else None
+with open('data/tests.yaml', 'r') as testList:
+    tests = yaml.safe_load(testList)
+for category, paths in tests.items():
+    if filterCategory is None or category == filterCategory:
+        print("Running tests from category '" + category + "'")
+        for testPath in paths:
+            compareSolvers(testPath)
+print(separator)
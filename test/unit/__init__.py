@@ -1,5 +1,10 @@
 from .geometry import *
+from .geometryTable import *
+from .grain import *
 from .motor import *
 from .nozzle import *
+from .polygonOffset import *
 from .propellant import *
+from .regressionCache import *
+from .simulationKernel import *
 from .grains import *
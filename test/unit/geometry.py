@@ -1,4 +1,6 @@
 import unittest
+import numpy as np
+from skimage import measure
 import motorlib.geometry
 
 class TestGeometryMethods(unittest.TestCase):
@@ -44,5 +46,101 @@ class TestGeometryMethods(unittest.TestCase):
         self.assertEqual(motorlib.geometry.dist((5, 5), (5, 6)), 1)
         self.assertEqual(motorlib.geometry.dist((0, 0), (-1, -1)), 2 ** 0.5)
 
+    def test_circleOverlapArea(self):
+        # Separate, contained and identical circles
+        self.assertEqual(motorlib.geometry.circleOverlapArea(1, 1, 2), 0)
+        self.assertAlmostEqual(motorlib.geometry.circleOverlapArea(1, 4, 1), 0.78539816)
+        self.assertAlmostEqual(motorlib.geometry.circleOverlapArea(2, 2, 0), 3.14159265)
+        # Two unit circles with their centers one radius apart
+        self.assertAlmostEqual(motorlib.geometry.circleOverlapArea(2, 2, 1), 1.22836969)
+
+    def test_circleArcInside(self):
+        self.assertAlmostEqual(motorlib.geometry.circleArcInside(1, 4, 1), 3.14159265)
+        self.assertEqual(motorlib.geometry.circleArcInside(1, 1, 2), 0)
+        self.assertEqual(motorlib.geometry.circleArcInside(4, 1, 1), 0)
+        # A third of a unit circle is inside of another unit circle one radius away
+        self.assertAlmostEqual(motorlib.geometry.circleArcInside(2, 2, 1), 2.09439510)
+
+    def test_sectorLength(self):
+        # Circle with a radius of 100 pixels in the middle of a 401 pixel map
+        angles = np.linspace(0, 2 * np.pi, 2001)
+        contour = np.stack([200 + (100 * np.sin(angles)), 200 + (100 * np.cos(angles))], axis=1)
+        self.assertAlmostEqual(motorlib.geometry.sectorLength(contour, 401, 0, np.pi / 6), 100 * np.pi / 6, 3)
+        self.assertAlmostEqual(motorlib.geometry.sectorLength(contour, 401, -np.pi / 2, 0.7), 70, 3)
+        self.assertAlmostEqual(motorlib.geometry.sectorLength(contour, 401, 1, np.pi), 100 * np.pi, 3)
+        # Segments near the edge of the map are left out
+        self.assertEqual(motorlib.geometry.sectorLength(contour - 98, 205, 0, np.pi / 6), 0)
+
+    def test_mapGrid(self):
+        mapX, mapY, mask = motorlib.geometry.mapGrid(101)
+        self.assertEqual(mapX.shape, (101, 101))
+        self.assertEqual(mapX[0, 0], -1)
+        self.assertEqual(mapX[0, 50], 0)
+        self.assertEqual(mapY[100, 0], 1)
+        self.assertTrue(mask[0, 0])
+        self.assertFalse(mask[50, 50])
+        self.assertFalse(mapX.flags.writeable)
+        self.assertFalse(mask.flags.writeable)
+        # Every caller gets the same arrays
+        self.assertIs(motorlib.geometry.mapGrid(101)[0], mapX)
+
+        # Grids that don't fit in the cache are still read-only, but aren't kept
+        maxSize = motorlib.geometry.mapCache.maxSize
+        try:
+            motorlib.geometry.mapCache.maxSize = 2 ** 20
+            largeX, _, largeMask = motorlib.geometry.mapGrid(301)
+            self.assertFalse(largeMask.flags.writeable)
+            self.assertIsNot(motorlib.geometry.mapGrid(301)[0], largeX)
+        finally:
+            motorlib.geometry.mapCache.maxSize = maxSize
+
+        window = (slice(10, 40), slice(55, 101))
+        for full, part in zip((mapX, mapY, mask), motorlib.geometry.mapGridWindow(101, window)):
+            self.assertTrue(np.array_equal(full[window], part))
+
+    def test_mapPolar(self):
+        radius, angle = motorlib.geometry.mapPolar(101)
+        self.assertEqual(radius[50, 50], 0)
+        self.assertEqual(radius[0, 50], 1)
+        self.assertAlmostEqual(angle[0, 50], -np.pi / 2)
+        self.assertAlmostEqual(angle[50, 100], 0)
+        self.assertFalse(angle.flags.writeable)
+
+    def test_nearestAxes(self):
+        angles = np.array([0, 0.1, -0.1, np.pi / 2 - 0.1, np.pi, -np.pi / 2 + 0.1])
+        nearest, second = motorlib.geometry.nearestAxes(angles, 4, -np.pi / 2)
+        np.testing.assert_array_equal(nearest, [1, 1, 1, 2, 3, 0])
+        np.testing.assert_array_equal(second, [2, 2, 0, 1, 0, 1])
+
+    def test_getContourLevels(self):
+        # Random values, some of which are exactly on the levels, with a NaN and contours that run off the edges
+        image = np.round(np.random.default_rng(0).random((25, 30)) * 8) / 8
+        image[10, 10] = np.nan
+        levels = np.linspace(0, 1, 9)
+        for connected in ['low', 'high']:
+            contours, _ = motorlib.geometry.getContourLevels(image, levels, 30, connected)
+            self.assertEqual(len(contours), len(levels))
+            for level, levelContours in zip(levels, contours):
+                expected = measure.find_contours(image, level, fully_connected=connected)
+                self.assertEqual(len(levelContours), len(expected))
+                for contour, expectedContour in zip(levelContours, expected):
+                    np.testing.assert_array_equal(contour, expectedContour)
+
+        # Repeated levels share their contours
+        contours, lengths = motorlib.geometry.getContourLevels(image, [0.5, 0.5, 0.75], 30)
+        self.assertIs(contours[0], contours[1])
+        self.assertEqual(list(lengths.keys()), [0.5, 0.75])
+
+    def test_getContourLevelsCircles(self):
+        mapX, mapY, _ = motorlib.geometry.mapGrid(201)
+        image = (mapX ** 2 + mapY ** 2) ** 0.5
+        contours, lengths = motorlib.geometry.getContourLevels(image, [0.25, 0.5, 2], 201)
+        self.assertEqual(len(contours[0]), 1)
+        self.assertEqual(contours[2], [])
+        # Circles with radii of 25 and 50 pixels
+        self.assertAlmostEqual(lengths[0.25], 50 * np.pi, 0)
+        self.assertAlmostEqual(lengths[0.5], 100 * np.pi, 0)
+        self.assertEqual(lengths[2], 0)
+
 if __name__ == '__main__':
     unittest.main()
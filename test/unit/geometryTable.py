@@ -0,0 +1,108 @@
+import unittest
+import motorlib.grains
+import motorlib.geometryTable
+import motorlib.motor
+
+def getBates(inhibitedEnds):
+    grain = motorlib.grains.BatesGrain()
+    grain.setProperties({
+        'diameter': 0.083058,
+        'length': 0.1397,
+        'coreDiameter': 0.03175,
+        'inhibitedEnds': inhibitedEnds
+    })
+    grain.simulationSetup(motorlib.motor.MotorConfig())
+    return grain
+
+
+class GeometryTableMethods(unittest.TestCase):
+
+    def assertMatchesGrain(self, table, grain, depths, delta):
+        for regDist in depths:
+            self.assertAlmostEqual(table.getWebLeft(regDist), grain.getWebLeft(regDist),
+                                   delta=delta * grain.getWebLeft(0))
+            self.assertAlmostEqual(table.getVolumeAtRegression(regDist), grain.getVolumeAtRegression(regDist),
+                                   delta=delta * grain.getVolumeAtRegression(0))
+            self.assertAlmostEqual(table.getFreeVolume(regDist), grain.getFreeVolume(regDist),
+                                   delta=delta * grain.getGrainBoundingVolume())
+
+    def test_batesTable(self):
+        for inhibitedEnds in ('Neither', 'Top', 'Both'):
+            grain = getBates(inhibitedEnds)
+            table = motorlib.geometryTable.GeometryTable(grain, 0.0005)
+            self.assertLessEqual(table.errorBound, 0.0005)
+            web = grain.getWebLeft(0)
+            depths = [web * fraction / 37 for fraction in range(37)]
+            self.assertMatchesGrain(table, grain, depths, 0.0005)
+            maxArea = max(grain.getSurfaceAreaAtRegression(regDist) for regDist in depths)
+            for regDist in depths:
+                self.assertAlmostEqual(table.getSurfaceAreaAtRegression(regDist),
+                                       grain.getSurfaceAreaAtRegression(regDist), delta=0.0005 * maxArea)
+                self.assertAlmostEqual(table.getPortArea(regDist) / grain.getPortArea(regDist), 1, delta=0.001)
+                exactFlux = grain.getPeakMassFlux(0.05, 0.01, regDist, 0.0001, 1680)
+                self.assertAlmostEqual(table.getPeakMassFlux(0.05, 0.01, regDist, 0.0001, 1680) / exactFlux, 1,
+                                       delta=0.005)
+            # Past burnout the grain itself answers
+            self.assertEqual(table.getVolumeAtRegression(web * 1.5), grain.getVolumeAtRegression(web * 1.5))
+            self.assertFalse(table.isWebLeft(web * 1.5))
+
+    def test_conicalTable(self):
+        grain = motorlib.grains.ConicalGrain()
+        grain.setProperties({
+            'diameter': 0.0254,
+            'length': 0.1,
+            'forwardCoreDiameter': 0.0032,
+            'aftCoreDiameter': 0.0095,
+            'inhibitedEnds': 'Both'
+        })
+        grain.simulationSetup(motorlib.motor.MotorConfig())
+        table = motorlib.geometryTable.GeometryTable(grain, 0.0005)
+        depths = [table.maxDepth * fraction / 23 for fraction in range(20)]
+        self.assertMatchesGrain(table, grain, depths, 0.0005)
+        # The two only agree to first order in the regression step, and the frustum changes shape quickly once its
+        # forward end reaches the casing, so the step is kept small
+        for regDist in depths:
+            exactFlux = grain.getPeakMassFlux(0.01, 0.01, regDist, 0.00001, 1680)
+            self.assertAlmostEqual(table.getPeakMassFlux(0.01, 0.01, regDist, 0.00001, 1680) / exactFlux, 1,
+                                   delta=0.005)
+
+    def test_endBurnerTable(self):
+        grain = motorlib.grains.EndBurningGrain()
+        grain.setProperties({
+            'diameter': 0.05,
+            'length': 0.1
+        })
+        grain.simulationSetup(motorlib.motor.MotorConfig())
+        table = motorlib.geometryTable.GeometryTable(grain, 0.0005)
+        self.assertIsNone(table.getPortArea(0.01))
+        self.assertEqual(table.getPeakMassFlux(0.05, 0.01, 0.01, 0.0001, 1680), 0)
+        self.assertMatchesGrain(table, grain, [0, 0.02, 0.05, 0.09], 1e-6)
+
+    def test_rodTubeTable(self):
+        grain = motorlib.grains.RodTubeGrain()
+        grain.setProperties({
+            'diameter': 0.05,
+            'length': 0.1,
+            'coreDiameter': 0.03,
+            'rodDiameter': 0.01,
+            'supportDiameter': 0.001,
+            'inhibitedEnds': 'Both'
+        })
+        grain.simulationSetup(motorlib.motor.MotorConfig())
+        table = motorlib.geometryTable.GeometryTable(grain, 0.0005)
+        # The rod burns out part way through, which the table can't interpolate across, but the rest of the table is
+        # still held to the tolerance
+        self.assertLessEqual(table.errorBound, 0.0005)
+        rodBurnout = (0.01 - 0.001) / 2
+        depths = [0, 0.001, 0.003, rodBurnout * 0.99, rodBurnout * 1.01, 0.006, 0.008]
+        self.assertMatchesGrain(table, grain, depths, 0.0005)
+
+    def test_setupGeometryTable(self):
+        config = motorlib.motor.MotorConfig()
+        grain = getBates('Neither')
+        config.setProperty('geometryEvaluation', 'Exact')
+        grain.setupGeometryTable(config)
+        self.assertIs(grain.getSimulationGeometry(), grain)
+        config.setProperty('geometryEvaluation', 'Tabulated')
+        grain.setupGeometryTable(config)
+        self.assertIsInstance(grain.getSimulationGeometry(), motorlib.geometryTable.GeometryTable)
@@ -0,0 +1,273 @@
+import unittest
+import numpy as np
+from scipy.signal import savgol_filter
+import motorlib.grains
+import motorlib.motor
+import motorlib.propellant
+import motorlib.regressionCache
+
+FMM_GRAIN_PROPERTIES = {
+    'Finocyl': {'coreDiameter': 0.02, 'numFins': 6, 'finWidth': 0.004, 'finLength': 0.015},
+    'Moon Burner': {'coreDiameter': 0.02, 'coreOffset': 0.01},
+    'Star Grain': {'numPoints': 5, 'pointLength': 0.02, 'pointWidth': 0.01},
+    'X Core': {'slotWidth': 0.005, 'slotLength': 0.02},
+    'C Grain': {'slotWidth': 0.01, 'slotOffset': 0.01},
+    'D Grain': {'slotOffset': 0.01},
+    'Custom Grain': {'dxfUnit': 'm', 'points': [[(-0.01, -0.01), (0.01, -0.01), (0.01, 0.01), (-0.01, 0.01)]]}
+}
+
+
+def makeFmmGrain(geomName):
+    grain = motorlib.grains.grainTypes[geomName]()
+    grain.setProperties({'length': 0.1, 'diameter': 0.083, 'inhibitedEnds': 'Neither'})
+    grain.setProperties(FMM_GRAIN_PROPERTIES[geomName])
+    return grain
+
+
+class FmmGrainMethods(unittest.TestCase):
+
+    def test_faceAreaSamples(self):
+        for geomName in FMM_GRAIN_PROPERTIES:
+            grain = makeFmmGrain(geomName)
+            grain.useSymmetry = False # The reference counts pixels in the full map
+            grain.initGeometry(128)
+            grain.generateCoreMap()
+            motorlib.regressionCache.memoryCache.clear() # Make sure the map is solved rather than loaded
+            grain.generateRegressionMap()
+
+            # Reference implementation that counts the pixels above each depth with a full pass over the map
+            valid = np.logical_not(grain.mask)
+            expected = []
+            for i in range(len(grain.faceArea)):
+                beyond = np.logical_and(grain.regressionMap > (i / grain.mapDim), valid)
+                expected.append(np.count_nonzero(beyond))
+            depths = [i / grain.mapDim for i in range(len(grain.faceArea))]
+            np.testing.assert_array_equal(grain.countPixelsBeyond(depths), expected, err_msg=geomName)
+            expectedArea = savgol_filter(grain.mapToArea(np.array(expected)), 31, 5)
+            np.testing.assert_allclose(grain.faceArea, expectedArea, err_msg=geomName)
+
+    def test_symmetricRegression(self):
+        motorlib.regressionCache.memoryCache.clear()
+        for geomName in ['Finocyl', 'Star Grain', 'X Core', 'C Grain', 'D Grain', 'Moon Burner']:
+            grains = []
+            for useSymmetry in [False, True]:
+                grain = makeFmmGrain(geomName)
+                grain.useSymmetry = useSymmetry
+                grain.initGeometry(300)
+                grain.generateCoreMap()
+                grain.generateRegressionMap()
+                grains.append(grain)
+            full, symmetric = grains
+
+            self.assertIsNotNone(symmetric.domainSector)
+            # The wedge and the full map only differ by the FMM's discretization error, which depends on direction
+            self.assertAlmostEqual(symmetric.wallWeb / full.wallWeb, 1, delta=0.02, msg=geomName)
+            for fraction in [0.1, 0.3, 0.5, 0.7]:
+                regDist = full.wallWeb * fraction
+                # Compared to the initial area, as the area left near burnout is small
+                areaError = (symmetric.getFaceArea(regDist) - full.getFaceArea(regDist)) / full.getFaceArea(0)
+                self.assertAlmostEqual(areaError, 0, delta=0.02, msg=geomName)
+                perimeterRatio = symmetric.getCorePerimeter(regDist) / full.getCorePerimeter(regDist)
+                self.assertAlmostEqual(perimeterRatio, 1, delta=0.03, msg=geomName)
+            # The rebuilt map should match the fully solved one
+            difference = np.abs(symmetric.regressionMap - full.regressionMap)
+            self.assertLess(np.ma.median(difference), 1 / 300, msg=geomName)
+            # Near the core, where the band from a solve of the whole map is used, the tables match up to rounding
+            for regDist in [0, 0.0002, 0.0005]:
+                self.assertAlmostEqual(symmetric.getFaceArea(regDist) / full.getFaceArea(regDist), 1, 12, msg=geomName)
+                perimeterRatio = symmetric.getCorePerimeter(regDist) / full.getCorePerimeter(regDist)
+                self.assertAlmostEqual(perimeterRatio, 1, 12, msg=geomName)
+
+    def test_symmetricPeakMassFlux(self):
+        # The 4 grain 98mm finocyl from test/data/real/n2950, whose peak mass flux is set by the port at ignition
+        results = []
+        for useSymmetry in [False, True]:
+            motorlib.regressionCache.memoryCache.clear()
+            motor = motorlib.motor.Motor()
+            motor.config.setProperties({'mapDim': 750, 'timestep': 0.03, 'burnoutWebThres': 0.000254,
+                                        'burnoutThrustThres': 0.1, 'ambPressure': 101325})
+            motor.nozzle.setProperties({'throat': 0.026035, 'exit': 0.07366, 'efficiency': 0.85, 'divAngle': 15,
+                                        'convAngle': 45, 'throatLength': 0})
+            motor.propellant = motorlib.propellant.Propellant({
+                'name': 'Ocean Water Final',
+                'density': 1589.269,
+                'tabs': [{'a': 1.5486e-05, 'n': 0.383, 't': 3500, 'm': 23.67, 'k': 1.25, 'minPressure': 0,
+                          'maxPressure': 6895000}]
+            })
+            grain = motorlib.grains.Finocyl()
+            grain.setProperties({'diameter': 0.086005, 'length': 0.717551, 'coreDiameter': 0.024638,
+                                 'finLength': 0.012573, 'finWidth': 0.005588, 'numFins': 6, 'invertedFins': False,
+                                 'inhibitedEnds': 'Neither'})
+            grain.useSymmetry = useSymmetry
+            motor.grains.append(grain)
+            results.append(motor.runSimulation())
+        full, symmetric = results
+        self.assertTrue(symmetric.success)
+        self.assertAlmostEqual(symmetric.getPeakMassFlux() / full.getPeakMassFlux(), 1, places=9)
+        self.assertEqual(symmetric.channels['massFlux'].getPoint(1), full.channels['massFlux'].getPoint(1))
+        self.assertAlmostEqual(symmetric.getISP() / full.getISP(), 1, delta=0.005)
+
+    def test_distanceTransformSolver(self):
+        motorlib.regressionCache.memoryCache.clear()
+        for geomName in FMM_GRAIN_PROPERTIES:
+            grains = []
+            for solver in ['Fast marching', 'Distance transform']:
+                grain = makeFmmGrain(geomName)
+                grain.setProperties({'invertedFins': False})
+                grain.regressionSolver = solver
+                grain.initGeometry(300)
+                grain.generateCoreMap()
+                grain.generateRegressionMap()
+                grains.append(grain)
+            fmm, edt = grains
+
+            self.assertNotEqual(fmm.getRegressionMapKey(), edt.getRegressionMapKey())
+            self.assertAlmostEqual(edt.wallWeb / fmm.wallWeb, 1, delta=0.02, msg=geomName)
+            for fraction in [0.1, 0.3, 0.5, 0.7]:
+                regDist = fmm.wallWeb * fraction
+                areaError = (edt.getFaceArea(regDist) - fmm.getFaceArea(regDist)) / fmm.getFaceArea(0)
+                self.assertAlmostEqual(areaError, 0, delta=0.02, msg=geomName)
+                perimeterRatio = edt.getCorePerimeter(regDist) / fmm.getCorePerimeter(regDist)
+                self.assertAlmostEqual(perimeterRatio, 1, delta=0.03, msg=geomName)
+
+    def test_corePerimeterTable(self):
+        config = motorlib.motor.MotorConfig()
+        config.setProperties({'mapDim': 300})
+
+        grain = motorlib.grains.Finocyl()
+        grain.setProperties({
+            'length': 0.1,
+            'diameter': 0.083,
+            'coreDiameter': 0.02,
+            'numFins': 6,
+            'finWidth': 0.004,
+            'finLength': 0.015,
+            'inhibitedEnds': 'Neither'
+        })
+        # The map is contoured no more often than the number of samples allows
+        depths = []
+        measureCorePerimeter = grain.measureCorePerimeter
+        grain.measureCorePerimeter = lambda mapDist: depths.append(mapDist) or measureCorePerimeter(mapDist)
+        motorlib.regressionCache.memoryCache.clear()
+        grain.simulationSetup(config)
+        self.assertLessEqual(len(depths), grain.perimeterSamples)
+        self.assertEqual(sorted(depths), list(grain.corePerimeterFunc.x))
+        self.assertEqual(max(depths), grain.faceAreaFunc.x[-1])
+
+        for regDist in [0.001, 0.005, 0.01, 0.015]:
+            tabulated = grain.getCorePerimeter(regDist)
+            grain.exactPerimeter = True
+            exact = grain.getCorePerimeter(regDist)
+            grain.exactPerimeter = False
+            self.assertAlmostEqual(tabulated / exact, 1, 2)
+
+        self.assertEqual(grain.getCorePerimeter(grain.wallWeb * 1.1), 0)
+
+    def test_regressionMapStorage(self):
+        usage = {}
+        for storage in ['Full', 'Quantized', 'Tables only']:
+            config = motorlib.motor.MotorConfig()
+            config.setProperties({'mapDim': 300, 'regressionMapStorage': storage})
+            grain = makeFmmGrain('C Grain')
+            grain.simulationSetup(config)
+            self.assertIsNone(grain.coreMap)
+            self.assertIsNone(grain.mapX)
+            usage[storage] = grain.getMemoryUsage()
+
+            tabulated = grain.getCorePerimeter(0.01)
+            grain.exactPerimeter = True
+            self.assertAlmostEqual(grain.getCorePerimeter(0.01) / tabulated, 1, 2)
+        self.assertLess(usage['Quantized'], usage['Full'] / 4)
+        self.assertLess(usage['Tables only'], usage['Quantized'] / 10)
+
+    def test_memoryMappedMaps(self):
+        motorlib.regressionCache.memoryCache.clear()
+        for geomName in ['Finocyl', 'C Grain', 'Custom Grain']:
+            grains = []
+            for mapMemory in ['In memory', 'Memory mapped']:
+                config = motorlib.motor.MotorConfig()
+                config.setProperties({'mapDim': 300, 'mapMemory': mapMemory, 'regressionMapStorage': 'Full'})
+                grain = makeFmmGrain(geomName)
+                grain.setProperties({'invertedFins': False, 'regressionEngine': 'Regression map'})
+                # Use bands that don't divide the map evenly
+                grain.mapBandRows = 70
+                grain.simulationSetup(config)
+                grains.append(grain)
+            inMemory, mapped = grains
+
+            # Only the tables are kept and the files are deleted
+            self.assertIsNone(mapped.regressionMap)
+            self.assertIsNone(mapped.mapDirectory)
+            self.assertNotEqual(inMemory.getRegressionMapKey(), mapped.getRegressionMapKey(), msg=geomName)
+            self.assertAlmostEqual(mapped.wallWeb, inMemory.wallWeb, msg=geomName)
+            for fraction in [0, 0.2, 0.5, 0.8]:
+                regDist = inMemory.wallWeb * fraction
+                self.assertAlmostEqual(mapped.getFaceArea(regDist), inMemory.getFaceArea(regDist), msg=geomName)
+                self.assertAlmostEqual(mapped.getCorePerimeter(regDist) / inMemory.getCorePerimeter(regDist), 1, 3,
+                                       msg=geomName)
+
+            # Previews are drawn in memory even after an out of core setup
+            inMemoryData = inMemory.getRegressionData(200)
+            mappedData = mapped.getRegressionData(200)
+            self.assertIsNone(mapped.mapDirectory)
+            # The second preview loads the map from the cache, which stores it in single precision. That can move the
+            # last contour, which is at the largest depth in the map.
+            self.assertTrue(np.ma.allclose(mappedData[1], inMemoryData[1], atol=1e-6), msg=geomName)
+            for mappedLayer, inMemoryLayer in zip(mappedData[2][:-1], inMemoryData[2][:-1]):
+                self.assertEqual(len(mappedLayer), len(inMemoryLayer), msg=geomName)
+
+    def test_automaticMapDim(self):
+        config = motorlib.motor.MotorConfig()
+        config.setProperties({'mapDim': 800, 'mapDimSelection': 'Automatic', 'mapFeaturePixels': 10,
+                              'mapConvergenceTolerance': 5})
+        grain = makeFmmGrain('X Core')
+        # The slots are a tenth of the diameter, so they are ten pixels wide in a 100 pixel map
+        grain.setProperties({'slotWidth': 0.0083})
+        self.assertEqual(grain.getFeatureMapDim(10, 800), grain.minimumAutomaticMapDim)
+        self.assertEqual(grain.getFeatureMapDim(20, 800), 200)
+        self.assertEqual(grain.getFeatureMapDim(100, 800), 800)
+
+        grain.simulationSetup(config)
+        self.assertIn(grain.getMapDim(), [128, 256, 512, 800])
+        fixed = makeFmmGrain('X Core')
+        fixed.setProperties({'slotWidth': 0.0083})
+        fixed.setupMap(800)
+        self.assertLess(fixed.getTableDifference((grain.faceAreaFunc, grain.corePerimeterFunc)), 0.1)
+
+        # A tolerance that can't be met uses the largest map
+        config.setProperties({'mapConvergenceTolerance': 0.1, 'mapDim': 300})
+        grain.simulationSetup(config)
+        self.assertEqual(grain.getMapDim(), 300)
+
+        # When the features need the largest map, it is set up without solving a smaller one to compare against
+        dims = []
+        setupMap = grain.setupMap
+        grain.setupMap = lambda mapDim: dims.append(mapDim) or setupMap(mapDim)
+        config.setProperties({'mapFeaturePixels': 100})
+        grain.simulationSetup(config)
+        self.assertEqual(dims, [300])
+
+    def test_sharedRegressionTables(self):
+        config = motorlib.motor.MotorConfig()
+        config.setProperties({'mapDim': 200})
+        motorlib.regressionCache.memoryCache.clear()
+
+        small = makeFmmGrain('Finocyl')
+        small.simulationSetup(config)
+        self.assertEqual(len(motorlib.regressionCache.memoryCache.entries), 1)
+
+        large = makeFmmGrain('Finocyl')
+        large.setProperties({'length': 0.3, 'diameter': 0.166, 'inhibitedEnds': 'Top'})
+        large.setProperties({name: 2 * value for name, value in FMM_GRAIN_PROPERTIES['Finocyl'].items()
+                             if name != 'numFins'})
+        large.simulationSetup(config)
+        self.assertEqual(large.getRegressionMapKey(), small.getRegressionMapKey())
+        self.assertEqual(len(motorlib.regressionCache.memoryCache.entries), 1)
+
+        self.assertAlmostEqual(large.wallWeb, 2 * small.wallWeb)
+        self.assertAlmostEqual(large.getFaceArea(0.004), 4 * small.getFaceArea(0.002))
+        self.assertAlmostEqual(large.getCorePerimeter(0.004), 2 * small.getCorePerimeter(0.002))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,3 +2,7 @@ from .conical import *
 from .bates import *
 from .conical import *
 from .endBurner import *
+from .moonBurner import *
+from .custom import *
+from .finocyl import *
+from .taperedFinocyl import *
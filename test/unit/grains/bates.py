@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 import motorlib.grains
 from motorlib.simResult import SimAlertLevel, SimAlertType
 
@@ -15,6 +16,25 @@ class BatesGrainMethods(unittest.TestCase):
         self.assertEqual(grain.getDetailsString(), 'Length: 0.1 m, Core: 0.02 m')
         self.assertEqual(grain.getDetailsString('cm'), 'Length: 10 cm, Core: 2 cm')
 
+    def test_getRegressionData(self):
+        grain = motorlib.grains.BatesGrain()
+        grain.setProperties({
+            'length': 0.1,
+            'diameter': 0.05,
+            'coreDiameter': 0.02
+        })
+        face, regression, contours, contourLengths = grain.getRegressionData(201, numContours=4)
+        self.assertEqual(face[100, 100], 0)
+        self.assertEqual(face[100, 170], 1)
+        # The core is 40 pixels across and regresses one pixel per pixel of map
+        self.assertAlmostEqual(regression[100, 170], 0.3)
+        self.assertAlmostEqual(regression[100, 100], np.amax(regression))
+        self.assertEqual([len(levelContours) for levelContours in contours], [1, 1, 1, 0])
+        self.assertAlmostEqual(list(contourLengths.values())[1], 2 * np.pi * 60, 5)
+        # Without the black core, the regression map is signed
+        _, regression, _, _ = grain.getRegressionData(201, coreBlack=False)
+        self.assertAlmostEqual(regression[100, 100], -0.4)
+
     def test_getGeometryErrors(self):
         grain = motorlib.grains.BatesGrain()
         grain.setProperties({
@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 import motorlib.grains
 
 class ConicalGrainMethods(unittest.TestCase):
@@ -116,5 +117,25 @@ class ConicalGrainMethods(unittest.TestCase):
         self.assertAlmostEqual(testGrain.getWebLeft(0.001), 0.003)
         self.assertAlmostEqual(testGrain.getWebLeft(0.0038), 0.0002)
 
+    def test_getRegressionData(self):
+        testGrain = motorlib.grains.ConicalGrain()
+        testGrain.setProperties({
+            'length': 0.05,
+            'diameter': 0.1,
+            'forwardCoreDiameter': 0.02,
+            'aftCoreDiameter': 0.04,
+            'inhibitedEnds': 'Both'
+        })
+        face, regression, contours, contourLengths = testGrain.getRegressionData(201, numContours=3, coreBlack=False)
+        self.assertEqual(face[100, 100], 0)
+        self.assertEqual(face[100, 150], 1)
+        # The port grows by the radial part of the regression, like it does in getFrustumInfo
+        regDist = 0.01
+        aftCoreDiameter, _, _ = testGrain.getFrustumInfo(regDist)
+        mapDist = regDist / 0.05
+        self.assertAlmostEqual(regression[100, 100 + int(round(aftCoreDiameter * 1000))], mapDist, 1)
+        self.assertEqual([len(levelContours) for levelContours in contours], [1, 1, 0])
+        self.assertAlmostEqual(list(contourLengths.values())[0], 2 * np.pi * 40, 5)
+
 if __name__ == '__main__':
     unittest.main()
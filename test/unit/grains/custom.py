@@ -0,0 +1,51 @@
+import unittest
+import math
+import motorlib.grains
+import motorlib.motor
+
+
+class CustomGrainMethods(unittest.TestCase):
+
+    def getGrain(self, engine):
+        grain = motorlib.grains.CustomGrain()
+        grain.setProperties({
+            'length': 0.1,
+            'diameter': 0.08,
+            'points': [[[-0.01, -0.01], [0.01, -0.01], [0.01, 0.01], [-0.01, 0.01]]],
+            'dxfUnit': 'm',
+            'inhibitedEnds': 'Neither',
+            'regressionEngine': engine
+        })
+        return grain
+
+    def test_polygonOffset(self):
+        config = motorlib.motor.MotorConfig()
+        config.setProperties({'polygonOffsetSamples': 100})
+        grain = self.getGrain('Polygon offset')
+        grain.simulationSetup(config)
+        self.assertIsNone(grain.regressionMap)
+        self.assertAlmostEqual(grain.wallWeb, 0.03)
+
+        # Before the core reaches the casting tube, the port is a square with rounded corners
+        depth = grain.wallWeb * 0.2 # Exactly on one of the table's samples
+        portArea = 0.02 ** 2 + (4 * 0.02 * depth) + (math.pi * depth ** 2)
+        self.assertAlmostEqual(grain.getFaceArea(depth), (math.pi * 0.04 ** 2) - portArea)
+        self.assertAlmostEqual(grain.getCorePerimeter(depth), (4 * 0.02) + (2 * math.pi * depth))
+        self.assertEqual(grain.getFaceArea(grain.wallWeb), 0)
+
+    def test_regressionMapCrossCheck(self):
+        config = motorlib.motor.MotorConfig()
+        config.setProperties({'mapDim': 500, 'polygonOffsetSamples': 100})
+        offset = self.getGrain('Polygon offset')
+        offset.simulationSetup(config)
+        regressionMap = self.getGrain('Regression map')
+        regressionMap.simulationSetup(config)
+
+        self.assertAlmostEqual(offset.wallWeb / regressionMap.wallWeb, 1, delta=0.01)
+        initialArea = regressionMap.getFaceArea(0)
+        for fraction in (0.1, 0.4, 0.7):
+            depth = offset.wallWeb * fraction
+            self.assertAlmostEqual(offset.getFaceArea(depth) / initialArea,
+                                   regressionMap.getFaceArea(depth) / initialArea, delta=0.01)
+            self.assertAlmostEqual(offset.getCorePerimeter(depth) / regressionMap.getCorePerimeter(depth), 1,
+                                   delta=0.02)
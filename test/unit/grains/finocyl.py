@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+import motorlib.grains
+
+
+class FinocylMethods(unittest.TestCase):
+
+    def test_generateCoreMap(self):
+        grain = motorlib.grains.Finocyl()
+        grain.setProperties({
+            'length': 0.1,
+            'diameter': 0.1,
+            'numFins': 6,
+            'finWidth': 0.005,
+            'finLength': 0.02,
+            'coreDiameter': 0.03,
+            'invertedFins': False,
+            'inhibitedEnds': 'Neither'
+        })
+        grain.initGeometry(101)
+        grain.generateCoreMap()
+        # Fins are 60 degrees apart, starting along the negative y axis of the map
+        for fin in range(6):
+            theta = (2 * np.pi / 6 * fin) - (np.pi / 2)
+            for radius, inCore in ((0.2, True), (0.6, True), (0.8, False)):
+                row = int(round(50 + (50 * radius * np.sin(theta))))
+                col = int(round(50 + (50 * radius * np.cos(theta))))
+                self.assertEqual(grain.coreMap[row, col], 0 if inCore else 1)
+            # Between the fins there is only propellant outside of the core
+            between = theta + (np.pi / 6)
+            row = int(round(50 + (30 * np.sin(between))))
+            col = int(round(50 + (30 * np.cos(between))))
+            self.assertEqual(grain.coreMap[row, col], 1)
+
+    def test_invertedFins(self):
+        grain = motorlib.grains.Finocyl()
+        grain.setProperties({
+            'length': 0.1,
+            'diameter': 0.1,
+            'numFins': 4,
+            'finWidth': 0.005,
+            'finLength': 0.01,
+            'coreDiameter': 0.06,
+            'invertedFins': True,
+            'inhibitedEnds': 'Neither'
+        })
+        grain.initGeometry(101)
+        grain.generateCoreMap()
+        self.assertEqual(grain.coreMap[50, 50], 0) # The fins don't reach the center
+        self.assertEqual(grain.coreMap[50 - 25, 50], 1) # Inside the tip of fin 0
+        self.assertEqual(grain.coreMap[50 + 25, 50], 1)
+        self.assertEqual(grain.coreMap[50 - 18, 50 - 18], 0) # Between the fins
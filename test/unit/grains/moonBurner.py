@@ -0,0 +1,53 @@
+import unittest
+import motorlib.grains
+import motorlib.grain
+import motorlib.motor
+
+
+class MoonBurnerMethods(unittest.TestCase):
+
+    def test_simulationSetup(self):
+        grain = motorlib.grains.MoonBurner()
+        grain.setProperties({
+            'length': 0.1,
+            'diameter': 0.083,
+            'coreDiameter': 0.02,
+            'coreOffset': 0.01,
+            'inhibitedEnds': 'Neither'
+        })
+        grain.simulationSetup(motorlib.motor.MotorConfig())
+        self.assertAlmostEqual(grain.wallWeb, 0.0415)
+        self.assertIsNone(grain.regressionMap) # The analytic model doesn't need a map
+
+    def test_fmmCrossCheck(self):
+        config = motorlib.motor.MotorConfig()
+        config.setProperties({'mapDim': 750})
+        for coreDiameter, coreOffset in [(0.02, 0.01), (0.03, 0.02), (0.03, 0)]:
+            analytic = motorlib.grains.MoonBurner()
+            analytic.setProperties({
+                'length': 0.1,
+                'diameter': 0.083,
+                'coreDiameter': coreDiameter,
+                'coreOffset': coreOffset,
+                'inhibitedEnds': 'Neither'
+            })
+            analytic.simulationSetup(config)
+
+            fmm = motorlib.grains.MoonBurner()
+            fmm.setProperties(analytic.getProperties())
+            motorlib.grain.FmmGrain.simulationSetup(fmm, config)
+
+            self.assertAlmostEqual(analytic.wallWeb / fmm.wallWeb, 1, 2)
+            for fraction in [0.1, 0.3, 0.5, 0.7]:
+                regDist = analytic.wallWeb * fraction
+                fmmArea = motorlib.grain.FmmGrain.getFaceArea(fmm, regDist)
+                self.assertAlmostEqual(analytic.getFaceArea(regDist) / fmmArea, 1, 1)
+                fmmPerimeter = motorlib.grain.FmmGrain.getCorePerimeter(fmm, regDist)
+                self.assertAlmostEqual(analytic.getCorePerimeter(regDist) / fmmPerimeter, 1, 1)
+            # Past burnout
+            self.assertEqual(analytic.getFaceArea(analytic.wallWeb + 1e-6), 0)
+            self.assertEqual(analytic.getCorePerimeter(analytic.wallWeb + 1e-6), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+import numpy as np
+import motorlib.grains
+import motorlib.motor
+
+def getStraightCore(inhibitedEnds):
+    grain = motorlib.grains.TaperedFinocyl()
+    grain.setProperties({
+        'length': 0.12,
+        'diameter': 0.083,
+        'numFins': 0,
+        'forwardCoreDiameter': 0.03,
+        'aftCoreDiameter': 0.03,
+        'inhibitedEnds': inhibitedEnds
+    })
+    return grain
+
+def getBates(inhibitedEnds):
+    grain = motorlib.grains.BatesGrain()
+    grain.setProperties({
+        'length': 0.12,
+        'diameter': 0.083,
+        'coreDiameter': 0.03,
+        'inhibitedEnds': inhibitedEnds
+    })
+    return grain
+
+
+class TaperedFinocylMethods(unittest.TestCase):
+
+    def test_generateCoreSlice(self):
+        grain = motorlib.grains.TaperedFinocyl()
+        grain.setProperties({
+            'length': 0.1,
+            'diameter': 0.1,
+            'numFins': 4,
+            'finWidth': 0.005,
+            'forwardFinLength': 0.02,
+            'aftFinLength': 0,
+            'forwardCoreDiameter': 0.02,
+            'aftCoreDiameter': 0.04,
+            'inhibitedEnds': 'Neither'
+        })
+        self.assertEqual(grain.getSliceDimensions(0.05), (0.03, 0.01))
+        grain.voxelDim = 101
+        grain.useSymmetry = False
+        grain.generateCoreVolume()
+        forward = grain.coreVolume[1]
+        aft = grain.coreVolume[-2]
+        # The core widens towards the aft end, while the fins shrink away
+        self.assertEqual(forward[50 + 11, 50 + 11], 1)
+        self.assertEqual(aft[50 + 11, 50 + 11], 0)
+        self.assertEqual(forward[50 - 25, 50], 0) # Fin 0 points along the negative y axis of the map
+        self.assertEqual(aft[50 - 25, 50], 1)
+        # The extra slices past the ends are core because neither end is inhibited
+        self.assertTrue(np.all(grain.coreVolume[0] < 0))
+        self.assertTrue(np.all(grain.coreVolume[-1] < 0))
+
+    def test_straightCore(self):
+        config = motorlib.motor.MotorConfig()
+        config.setProperty('voxelDim', 80)
+        for inhibitedEnds in ('Neither', 'Top', 'Both'):
+            grain = getStraightCore(inhibitedEnds)
+            bates = getBates(inhibitedEnds)
+            grain.simulationSetup(config)
+            bates.simulationSetup(config)
+            web = bates.getWebLeft(0)
+            self.assertAlmostEqual(grain.getWebLeft(0) / web, 1, delta=0.02)
+            for fraction in (0, 0.25, 0.5, 0.75):
+                regDist = web * fraction
+                self.assertAlmostEqual(grain.getVolumeAtRegression(regDist) / bates.getVolumeAtRegression(regDist), 1,
+                                       delta=0.04)
+                surfaceArea = grain.getSurfaceAreaAtRegression(regDist)
+                self.assertAlmostEqual(surfaceArea / bates.getSurfaceAreaAtRegression(regDist), 1, delta=0.05)
+                if inhibitedEnds == 'Both': # At this resolution the flux starts out up to 10% low
+                    massFlux = grain.getPeakMassFlux(0.1, 0.01, regDist, 0.0002, 1700)
+                    batesMassFlux = bates.getPeakMassFlux(0.1, 0.01, regDist, 0.0002, 1700)
+                    self.assertAlmostEqual(massFlux / batesMassFlux, 1, delta=0.1)
+            self.assertEqual(grain.getVolumeAtRegression(web * 1.1), 0)
+
+    def test_symmetry(self):
+        grain = motorlib.grains.TaperedFinocyl()
+        grain.setProperties({
+            'length': 0.1,
+            'diameter': 0.08,
+            'numFins': 5,
+            'finWidth': 0.004,
+            'forwardFinLength': 0.015,
+            'aftFinLength': 0.005,
+            'forwardCoreDiameter': 0.02,
+            'aftCoreDiameter': 0.025,
+            'inhibitedEnds': 'Bottom'
+        })
+        tables = {}
+        for useSymmetry in (True, False):
+            grain.voxelDim = 60
+            grain.useSymmetry = useSymmetry
+            grain.generateCoreVolume()
+            grain.solveRegressionVolume()
+            tables[useSymmetry] = grain.measureRegressionTables()
+        self.assertEqual(len(tables[True]['depths']), len(tables[False]['depths']))
+        np.testing.assert_allclose(tables[True]['volume'], tables[False]['volume'],
+                                   rtol=0.01, atol=0.01 * tables[False]['volume'][0])
+        np.testing.assert_allclose(tables[True]['surfaceArea'], tables[False]['surfaceArea'],
+                                   rtol=0.05, atol=0.05 * tables[False]['surfaceArea'][0])
+
+    def test_geometryErrors(self):
+        grain = motorlib.grains.TaperedFinocyl()
+        grain.setProperties({
+            'length': 0.1,
+            'diameter': 0.05,
+            'numFins': 4,
+            'finWidth': 0.004,
+            'forwardFinLength': 0.01,
+            'aftFinLength': 0.01,
+            'forwardCoreDiameter': 0.02,
+            'aftCoreDiameter': 0.06,
+            'inhibitedEnds': 'Neither'
+        })
+        self.assertEqual(len(grain.getGeometryErrors()), 2) # The aft core is too large, and so are its fins
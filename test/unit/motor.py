@@ -2,6 +2,27 @@ import unittest
 import motorlib.motor
 import motorlib.grains
 import motorlib.propellant
+import motorlib.regressionCache
+import motorlib.simResult
+
+def makeBatesMotor():
+    motor = motorlib.motor.Motor()
+    grain = motorlib.grains.BatesGrain()
+    grain.setProperties({
+        'diameter': 0.083058,
+        'length': 0.1397,
+        'coreDiameter': 0.05,
+        'inhibitedEnds': 'Neither'
+    })
+    motor.grains.append(grain)
+    motor.nozzle.setProperties({'throat': 0.01428, 'exit': 0.03, 'efficiency': 0.85, 'divAngle': 12, 'convAngle': 35})
+    motor.propellant = motorlib.propellant.Propellant()
+    motor.propellant.setProperties({
+        'name': 'KNSU',
+        'density': 1890,
+        'tabs': [{'minPressure': 0, 'maxPressure': 1e7, 'a': 0.000101, 'n': 0.319, 't': 1720, 'm': 41.98, 'k': 1.133}]
+    })
+    return motor
 
 class TestMotorMethods(unittest.TestCase):
 
@@ -57,5 +78,112 @@ class TestMotorMethods(unittest.TestCase):
         })
         self.assertAlmostEqual(tm.calcIdealPressure([0], 0), 4050196, 0)
 
+    def test_setupGrains(self):
+        def makeMotor(setupProcesses):
+            motor = motorlib.motor.Motor()
+            motor.config.setProperties({'mapDim': 250, 'setupProcesses': setupProcesses})
+            for slotOffset in [0.005, 0.01, 0.005]:
+                grain = motorlib.grains.CGrain()
+                grain.setProperties({
+                    'diameter': 0.083,
+                    'length': 0.1,
+                    'slotWidth': 0.01,
+                    'slotOffset': slotOffset,
+                    'inhibitedEnds': 'Neither'
+                })
+                motor.grains.append(grain)
+            return motor
+
+        progress = []
+        motorlib.regressionCache.memoryCache.clear()
+        serial = makeMotor(1)
+        self.assertFalse(serial.setupGrains(lambda done: progress.append(done)))
+        # The two identical grains are only set up once
+        self.assertEqual(progress, [0.5, 1])
+        self.assertIs(serial.grains[2].faceAreaFunc, serial.grains[0].faceAreaFunc)
+
+        motorlib.regressionCache.memoryCache.clear()
+        parallel = makeMotor(2)
+        self.assertFalse(parallel.setupGrains())
+        for serialGrain, parallelGrain in zip(serial.grains, parallel.grains):
+            self.assertEqual(parallelGrain.wallWeb, serialGrain.wallWeb)
+            for regDist in [0, 0.005, 0.01]:
+                self.assertEqual(parallelGrain.getFaceArea(regDist), serialGrain.getFaceArea(regDist))
+                self.assertEqual(parallelGrain.getCorePerimeter(regDist), serialGrain.getCorePerimeter(regDist))
+
+        # Returning True from the callback cancels setup
+        self.assertTrue(makeMotor(1).setupGrains(lambda done: True))
+
+    def test_geometryTableSuggestion(self):
+        def makeMotor(geometryEvaluation):
+            motor = makeBatesMotor()
+            motor.config.setProperties({'geometryEvaluation': geometryEvaluation})
+            return motor
+
+        def suggested(motor):
+            simRes = motor.runSimulation()
+            self.assertTrue(simRes.success)
+            return any('tabulated' in alert.description for alert in simRes.alerts)
+
+        setupTime = motorlib.motor.geometryTableSetupTime
+        try:
+            # A fast burn doesn't suggest tables
+            self.assertFalse(suggested(makeMotor('Exact')))
+            # A burn that takes longer than building the tables would does
+            motorlib.motor.geometryTableSetupTime = 0
+            self.assertTrue(suggested(makeMotor('Exact')))
+            # The suggestion is not repeated when tables are already in use
+            self.assertFalse(suggested(makeMotor('Tabulated')))
+        finally:
+            motorlib.motor.geometryTableSetupTime = setupTime
+
+    def test_grainMemoryReport(self):
+        motor = makeBatesMotor()
+        motor.config.setProperties({'mapDim': 250, 'regressionMapStorage': 'Quantized', 'timestep': 0.01})
+        grain = motorlib.grains.CGrain()
+        grain.setProperties({
+            'diameter': 0.083058,
+            'length': 0.1397,
+            'slotWidth': 0.01,
+            'slotOffset': 0.01,
+            'inhibitedEnds': 'Neither'
+        })
+        motor.grains.append(grain)
+        simRes = motor.runSimulation()
+        self.assertTrue(simRes.success)
+
+        # Only the grain that holds regression data reports it
+        self.assertEqual(simRes.grainMemoryUsage[0], 0)
+        self.assertGreater(simRes.grainMemoryUsage[1], 0)
+        reports = [alert for alert in simRes.alerts if 'memory' in alert.description]
+        self.assertEqual([alert.location for alert in reports], ['Grain 2'])
+        self.assertIn('{:.1f} MB'.format(simRes.grainMemoryUsage[1] / 2 ** 20), reports[0].description)
+
+    def test_outOfCoreWholeMapWarning(self):
+        motor = makeBatesMotor()
+        motor.config.setProperties({'mapDim': 250, 'mapMemory': 'Memory mapped', 'timestep': 0.01})
+        for engine in ['Regression map', 'Polygon offset']:
+            grain = motorlib.grains.CustomGrain()
+            grain.setProperties({
+                'diameter': 0.083058,
+                'length': 0.1397,
+                'inhibitedEnds': 'Neither',
+                'dxfUnit': 'm',
+                'points': [[(-0.01, -0.01), (0.01, -0.01), (0.01, 0.01), (-0.01, 0.01)]],
+                'regressionEngine': engine
+            })
+            motor.grains.append(grain)
+        grain = motorlib.grains.CGrain()
+        grain.setProperties({'diameter': 0.083058, 'length': 0.1397, 'slotWidth': 0.01, 'slotOffset': 0.01,
+                             'inhibitedEnds': 'Neither'})
+        motor.grains.append(grain)
+        simRes = motor.runSimulation()
+        self.assertTrue(simRes.success)
+
+        # Only the custom grain that solves a map has to solve all of it, as the C grain is symmetric
+        warnings = [alert for alert in simRes.getAlertsByLevel(motorlib.simResult.SimAlertLevel.WARNING)
+                    if 'symmetry' in alert.description]
+        self.assertEqual([alert.location for alert in warnings], ['Grain 2'])
+
 if __name__ == '__main__':
     unittest.main()
@@ -5,6 +5,18 @@ class TestNozzleMethods(unittest.TestCase):
     def test_expansionRatioFromPressureRatio(self):
         self.assertAlmostEqual(motorlib.nozzle.eRatioFromPRatio(1.15, 0.0156), 0.10650602)
 
+    def test_pressureRatioFromExpansionRatio(self):
+        for k in (1.1, 1.2, 1.4):
+            for eRatio in (1.5, 4, 9, 100):
+                pRatio = motorlib.nozzle.pRatioFromERatio(k, eRatio)
+                self.assertAlmostEqual(motorlib.nozzle.eRatioFromPRatio(k, pRatio) * eRatio, 1, 10)
+                # The flow is supersonic, so the pressure is below the critical pressure ratio
+                self.assertLess(pRatio, (2 / (k + 1)) ** (k / (k - 1)))
+                for guess in (1e-6, 0.3, 0.99):
+                    self.assertAlmostEqual(motorlib.nozzle.pRatioFromERatio(k, eRatio, guess) / pRatio, 1, 10)
+        # A nozzle with no expansion has the critical pressure ratio at its exit
+        self.assertAlmostEqual(motorlib.nozzle.pRatioFromERatio(1.4, 1), 0.5282817877)
+
     def test_expansionRatio(self):
         nozzle = motorlib.nozzle.Nozzle()
         nozzle.setProperties({
@@ -32,6 +44,8 @@ class TestNozzleMethods(unittest.TestCase):
         self.assertAlmostEqual(nozzle.getExitPressure(1.25, 5e6), 63174.14300487552)
         self.assertAlmostEqual(nozzle.getExitPressure(1.2, 5e6), 72087.22454540983)
         self.assertAlmostEqual(nozzle.getExitPressure(1.2, 6e6), 86504.66945449157)
+        self.assertEqual(len(nozzle.pressureRatios), 3)
+        self.assertEqual(nozzle.getExitPressure(1.2, 0), 0)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import math
+import numpy as np
+from scipy import ndimage
+from skimage import draw
+import motorlib.polygonOffset
+
+def getRasterAreas(polygons, depths, size=1000):
+    """Returns the area of the port at each of 'depths' found by rasterizing the core and counting the cells inside
+    the casting tube that are within each depth of it."""
+    cellSize = 2 / size
+    core = np.zeros((size, size), dtype=bool)
+    for polygon in polygons:
+        points = (np.array(polygon) + 1) / cellSize - 0.5
+        core[draw.polygon(points[:, 1], points[:, 0], core.shape)] = True
+    # Distances are between cell centers, so they run about half a cell longer than to the edge of the core
+    distances = ndimage.distance_transform_edt(np.logical_not(core), sampling=cellSize) - (cellSize / 2)
+    centers = ((np.arange(size) + 0.5) * cellSize) - 1
+    inTube = (centers[:, None] ** 2) + (centers[None, :] ** 2) < 1
+    return [np.count_nonzero(np.logical_and(inTube, distances <= depth)) * cellSize ** 2 for depth in depths]
+
+class TestPolygonOffset(unittest.TestCase):
+
+    def assertMatchesRaster(self, polygons, extraDepths=()):
+        offset = motorlib.polygonOffset.PolygonOffset(polygons)
+        depths = np.arange(0.025, offset.getWallWeb(), 0.025)
+        for depth, rasterArea in zip(depths, getRasterAreas(polygons, depths)):
+            self.assertAlmostEqual(offset.measure(depth)[0], rasterArea, delta=0.02 * rasterArea)
+        # The port only grows as the core regresses
+        depths = np.union1d(np.linspace(0, offset.getWallWeb(), 400), extraDepths)
+        areas = [offset.measure(depth)[0] for depth in depths]
+        self.assertTrue(np.all(np.diff(areas) >= -1e-12))
+        return offset
+
+    def test_square(self):
+        # The offset of a square is the square, four rectangles along its sides and a circle split between its corners
+        side = 0.4
+        offset = motorlib.polygonOffset.PolygonOffset([[[-0.2, -0.2], [0.2, -0.2], [0.2, 0.2], [-0.2, 0.2]]])
+        for depth in (0.05, 0.3, 0.7):
+            area, perimeter = offset.measure(depth)
+            self.assertAlmostEqual(area, (side ** 2) + (4 * side * depth) + (math.pi * depth ** 2))
+            self.assertAlmostEqual(perimeter, (4 * side) + (2 * math.pi * depth))
+        self.assertAlmostEqual(offset.getWallWeb(), 0.8)
+
+    def test_windingAndOverlap(self):
+        square = [[-0.2, -0.2], [0.2, -0.2], [0.2, 0.2], [-0.2, 0.2]]
+        shifted = [[x + 0.1, y] for x, y in reversed(square)]
+        offset = motorlib.polygonOffset.PolygonOffset([square, shifted])
+        area, perimeter = offset.measure(0.05)
+        self.assertAlmostEqual(area, 0.2 + (2 * 0.9 * 0.05) + (math.pi * 0.05 ** 2))
+        self.assertAlmostEqual(perimeter, 1.8 + (2 * math.pi * 0.05))
+
+    def test_concave(self):
+        # The offsets of the edges at the inside corner of an L overlap in a square, and the corner has no arc
+        corner = [[0, 0], [0.4, 0], [0.4, 0.1], [0.1, 0.1], [0.1, 0.4], [0, 0.4]]
+        offset = self.assertMatchesRaster([corner])
+        area, perimeter = offset.measure(0.05)
+        self.assertAlmostEqual(area, 0.07 + (1.6 * 0.05) - (0.05 ** 2) + (1.25 * math.pi * 0.05 ** 2))
+        self.assertAlmostEqual(perimeter, 1.6 - (2 * 0.05) + (2.5 * math.pi * 0.05))
+        uneven = [[0, 0], [0.4, 0], [0.4, 0.1], [0.13, 0.1], [0.13, 0.4], [0, 0.4]]
+        self.assertMatchesRaster([uneven], [0.045, 0.11, 0.15, 0.19, 0.2, 0.21, 0.295])
+
+    def test_multiplePolygons(self):
+        # The facing edges of these are 0.5 apart, so at 0.25 their offsets meet with port on both sides
+        block = [[-0.5, -0.1], [-0.2, -0.1], [-0.2, 0.1], [-0.5, 0.1]]
+        hook = [[0.1, -0.3], [0.4, -0.3], [0.4, 0.3], [0.3, 0.3], [0.3, -0.2], [0.1, -0.2]]
+        offset = self.assertMatchesRaster([block, hook], [0.25])
+        self.assertAlmostEqual(offset.measure(0.25)[0], offset.measure(0.25 + 1e-9)[0])
+        # Polygons that share a vertex
+        first = [[0, 0], [0.3, 0.05], [0.2, 0.3]]
+        self.assertMatchesRaster([first, [[0, 0], [-0.3, 0.1], [-0.1, -0.3]]])
+        self.assertMatchesRaster([first, [[0, 0], [0.25, -0.05], [0.1, 0.35]]])
+
+    def test_casingClipping(self):
+        # A triangle with its corners on the casting tube burns out at its corners first
+        triangle = [[math.cos(angle), math.sin(angle)] for angle in (0, 2 * math.pi / 3, 4 * math.pi / 3)]
+        offset = motorlib.polygonOffset.PolygonOffset([triangle])
+        area, perimeter = offset.measure(0.1)
+        sideDepth = 0.5 + 0.1 # Distance from the center to each offset side
+        chord = 2 * (1 - sideDepth ** 2) ** 0.5
+        segment = math.acos(sideDepth) - (sideDepth * (1 - sideDepth ** 2) ** 0.5)
+        self.assertAlmostEqual(perimeter, 3 * chord)
+        self.assertAlmostEqual(area, math.pi - (3 * segment))
+        self.assertAlmostEqual(offset.getWallWeb(), 0.5)
+
+    def test_degeneratePolygons(self):
+        with self.assertRaises(ValueError):
+            motorlib.polygonOffset.PolygonOffset([[[0, 0], [0.1, 0]], []])
+        # Repeated points, like the closing point of a DXF contour, don't change the result
+        offset = motorlib.polygonOffset.PolygonOffset([[[-0.2, -0.2], [0.2, -0.2], [0.2, 0.2], [0.2, 0.2 + 1e-13],
+                                                        [-0.2, 0.2], [-0.2, -0.2]]])
+        self.assertAlmostEqual(offset.measure(0.05)[1], 1.6 + (2 * math.pi * 0.05))
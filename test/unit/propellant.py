@@ -131,5 +131,46 @@ class TestPropellantMethods(unittest.TestCase):
         self.assertEqual(testProp.getCombustionProperties(6.9e5), (1.467e-05, 0.382, 1.25, 3500, 23.67))
         self.assertEqual(testProp.getCombustionProperties(8e10), (1e-05, 0.3, 1.25, 3500, 23.67))
 
+    def test_tab_index(self):
+        # Narrow tabs out of order, with a gap between 2 and 2.5 MPa
+        tabs = []
+        for tid, (minPressure, maxPressure) in enumerate([(3e6, 4e6), (0, 1e6), (2.5e6, 3e6), (1e6, 2e6), (4e6, 6e6)]):
+            tabs.append({
+                'minPressure': minPressure,
+                'maxPressure': maxPressure,
+                'a': (tid + 1) / 1e5,
+                'n': 0.3,
+                't': 2000,
+                'm': 40,
+                'k': 1.2
+            })
+        testProp = motorlib.propellant.Propellant({'name': 'TestProp', 'density': 1800, 'tabs': tabs})
+        index = testProp.getTabIndex()
+        self.assertIs(testProp.getTabIndex(), index)
+        self.assertEqual(testProp.getCombustionProperties(3.5e6)[0], 1e-5)
+        self.assertEqual(testProp.getCombustionProperties(5e5)[0], 2e-5)
+        self.assertEqual(testProp.getCombustionProperties(2.6e6)[0], 3e-5)
+        self.assertEqual(testProp.getCombustionProperties(9e6)[0], 5e-5)
+        # In the gap, the closest end wins, and on a shared end the first tab that has it wins
+        self.assertEqual(testProp.getCombustionProperties(2.1e6)[0], 4e-5)
+        self.assertEqual(testProp.getCombustionProperties(2.4e6)[0], 3e-5)
+        self.assertEqual(testProp.getCombustionProperties(3e6)[0], 1e-5)
+        self.assertEqual(len(testProp.getPressureErrors(2.2e6)), 1)
+        self.assertEqual(len(testProp.getPressureErrors(1.5e6)), 0)
+
+        # Each pressure comes from a tab that produces a pressure in its own range
+        for kn in [1, 50, 100, 200, 300, 500, 1000]:
+            pressure = testProp.getIdealPressure(kn)
+            ballA, ballN, _, _, _ = testProp.getCombustionProperties(pressure)
+            self.assertAlmostEqual(index.getTabPressure(index.properties.index((ballA, ballN, 1.2, 2000, 40)), kn),
+                                   pressure)
+
+        # Changing the propellant rebuilds the index
+        testProp.setProperty('density', 1700)
+        self.assertIsNot(testProp.getTabIndex(), index)
+        index = testProp.getTabIndex()
+        testProp.addTab(motorlib.propellant.PropellantTab(tabs[0]))
+        self.assertIsNot(testProp.getTabIndex(), index)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import motorlib.regressionCache
+
+
+class DiskCacheMethods(unittest.TestCase):
+
+    def test_getShapeKey(self):
+        keyA = motorlib.regressionCache.getShapeKey('Finocyl', {'numFins': 6, 'finWidth': 0.004}, 500)
+        keyB = motorlib.regressionCache.getShapeKey('Finocyl', {'finWidth': 0.004, 'numFins': 6}, 500)
+        self.assertEqual(keyA, keyB)
+        self.assertNotEqual(keyA, motorlib.regressionCache.getShapeKey('Finocyl', {'numFins': 6, 'finWidth': 0.004}, 250))
+        self.assertNotEqual(keyA, motorlib.regressionCache.getShapeKey('Finocyl', {'numFins': 5, 'finWidth': 0.004}, 500))
+
+        # Changing the format version invalidates every key
+        version = motorlib.regressionCache.cacheFormatVersion
+        try:
+            motorlib.regressionCache.cacheFormatVersion = version + 1
+            keyC = motorlib.regressionCache.getShapeKey('Finocyl', {'numFins': 6, 'finWidth': 0.004}, 500)
+        finally:
+            motorlib.regressionCache.cacheFormatVersion = version
+        self.assertNotEqual(keyA, keyC)
+
+    def test_saveLoad(self):
+        with tempfile.TemporaryDirectory() as path:
+            cache = motorlib.regressionCache.DiskCache(path, 2 ** 20)
+            self.assertIsNone(cache.load('missing'))
+            cache.save('entry', {'faceArea': np.linspace(0, 1, 10), 'maxDist': np.array(0.5)})
+            loaded = cache.load('entry')
+            np.testing.assert_array_equal(loaded['faceArea'], np.linspace(0, 1, 10))
+            self.assertEqual(float(loaded['maxDist']), 0.5)
+
+    def test_evict(self):
+        with tempfile.TemporaryDirectory() as path:
+            cache = motorlib.regressionCache.DiskCache(path, 2 ** 20)
+            data = {'regressionMap': np.random.default_rng(0).random(2 ** 16)} # Doesn't compress, so ~512 kB each
+            cache.save('first', data)
+            cache.save('second', data)
+            os.utime(cache.getEntryPath('first'), (0, 0))
+            os.utime(cache.getEntryPath('second'), (1, 1))
+            cache.load('first') # Marks 'first' as recently used
+            cache.save('third', data)
+            self.assertIsNotNone(cache.load('first'))
+            self.assertIsNone(cache.load('second'))
+            self.assertIsNotNone(cache.load('third'))
+
+    def test_evictMissingEntry(self):
+        with tempfile.TemporaryDirectory() as path:
+            cache = motorlib.regressionCache.DiskCache(path, 2 ** 10)
+            # A link to nothing is listed but can't be read, like an entry that another process removed in between
+            os.symlink(os.path.join(path, 'removed'), cache.getEntryPath('gone'))
+            cache.save('entry', {'faceArea': np.linspace(0, 1, 10)})
+            self.assertIsNotNone(cache.load('entry'))
+
+    def test_setDiskCacheUnwritable(self):
+        with tempfile.TemporaryDirectory() as path:
+            # A file in the way of the cache directory can't be replaced with one
+            blocked = os.path.join(path, 'blocked')
+            open(blocked, 'w').close()
+            try:
+                motorlib.regressionCache.setDiskCache(path)
+                self.assertIsNotNone(motorlib.regressionCache.diskCache)
+                with self.assertRaises(OSError):
+                    motorlib.regressionCache.setDiskCache(os.path.join(blocked, 'regressionCache'))
+                self.assertIsNone(motorlib.regressionCache.diskCache)
+            finally:
+                motorlib.regressionCache.setDiskCache(None)
+
+
+class MemoryCacheMethods(unittest.TestCase):
+
+    def test_evict(self):
+        cache = motorlib.regressionCache.MemoryCache(3 * 800)
+        for key in ['first', 'second', 'third']:
+            cache.save(key, {'faceArea': np.zeros(100)}) # 800 bytes each
+        self.assertEqual(cache.size, 3 * 800)
+        cache.load('first') # Marks 'first' as recently used
+        cache.save('fourth', {'faceArea': np.zeros(100)})
+        self.assertIsNotNone(cache.load('first'))
+        self.assertIsNone(cache.load('second'))
+        self.assertIsNotNone(cache.load('fourth'))
+        self.assertEqual(cache.size, 3 * 800)
+
+        cache.save('huge', {'faceArea': np.zeros(1000)})
+        self.assertIsNone(cache.load('huge'))
+        self.assertFalse(cache.load('first')['faceArea'].flags.writeable)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+import motorlib.motor
+import motorlib.grains
+import motorlib.propellant
+import motorlib.simResult
+import motorlib.simulationKernel
+
+def getMotor():
+    motor = motorlib.motor.Motor()
+    motor.config.setProperties({'timestep': 0.01, 'burnoutWebThres': 2.54e-5, 'burnoutThrustThres': 0.1})
+    for inhibitedEnds in ('Neither', 'Top'):
+        grain = motorlib.grains.BatesGrain()
+        grain.setProperties({
+            'diameter': 0.083058,
+            'length': 0.1397,
+            'coreDiameter': 0.03175,
+            'inhibitedEnds': inhibitedEnds
+        })
+        grain.simulationSetup(motor.config)
+        motor.grains.append(grain)
+    motor.nozzle.setProperties({'throat': 0.01428, 'exit': 0.03, 'efficiency': 1, 'divAngle': 15})
+    motor.propellant = motorlib.propellant.Propellant()
+    motor.propellant.setProperties({
+        'name': 'KNSU',
+        'density': 1890,
+        'tabs': [
+            {
+                'a': 0.000101,
+                'n': 0.319,
+                't': 1720,
+                'm': 41.98,
+                'k': 1.133,
+                'minPressure': 0,
+                'maxPressure': 1e7
+            }
+        ]
+    })
+    return motor
+
+
+class SimulationKernelMethods(unittest.TestCase):
+
+    def test_initialState(self):
+        motor = getMotor()
+        kernel = motorlib.simulationKernel.SimulationKernel(motor, motor.grains)
+        self.assertAlmostEqual(kernel.kn, motor.calcKN([0, 0], 0))
+        self.assertAlmostEqual(kernel.pressure, motor.calcIdealPressure([0, 0], 0))
+        self.assertEqual(list(kernel.web), [grain.getWebLeft(0) for grain in motor.grains])
+        self.assertTrue(kernel.shouldContinue(0.1))
+
+    def test_step(self):
+        motor = getMotor()
+        kernel = motorlib.simulationKernel.SimulationKernel(motor, motor.grains, initialSteps=2)
+        startMass = kernel.mass.copy()
+        pressure = kernel.pressure
+        kernel.step()
+        reg = 0.01 * motor.propellant.getBurnRate(pressure)
+        self.assertEqual(list(kernel.regression), [reg, reg])
+        # The first step uses the mass before regression, so nothing has burned yet
+        self.assertEqual(list(kernel.massFlow), [0, 0])
+        pressure = kernel.pressure
+        kernel.step()
+        nextReg = 0.01 * motor.propellant.getBurnRate(pressure)
+        burned = (startMass - kernel.mass) / 0.01
+        self.assertAlmostEqual(kernel.massFlow[0], burned[0])
+        self.assertAlmostEqual(kernel.massFlow[1], burned[0] + burned[1])
+        self.assertAlmostEqual(kernel.massFlux[1], motor.grains[1].getPeakMassFlux(burned[0], 0.01, reg, nextReg, 1890))
+        self.assertAlmostEqual(kernel.kn, motor.calcKN(list(kernel.regression), 0))
+
+        # The buffers grow as they fill up
+        kernel.step()
+        self.assertEqual(kernel.steps, 4)
+        simRes = motorlib.simResult.SimulationResult(motor)
+        kernel.writeResults(simRes)
+        self.assertEqual(len(simRes.channels['time'].getData()), 4)
+        self.assertAlmostEqual(simRes.channels['time'].getLast(), 0.03)
+        self.assertEqual(simRes.channels['regression'].getPoint(1), [reg, reg])
+
+    def test_burnout(self):
+        motor = getMotor()
+        simRes = motor.runSimulation()
+        self.assertTrue(simRes.success)
+        for web in simRes.channels['web'].getLast():
+            self.assertLess(web, 2.54e-5)
+        # Stopping at the thrust threshold matches the check on the finished results
+        forces = simRes.channels['force'].getData()
+        self.assertLessEqual(forces[-1], 0.001 * max(forces))
+        self.assertTrue(all(force > 0.001 * max(forces[:index + 1]) for index, force in enumerate(forces[1:-1], 1)))
+
+    def test_adaptiveTimestep(self):
+        fixed = getMotor()
+        fixed.config.setProperty('timestep', 0.001)
+        fixedRes = fixed.runSimulation()
+
+        adaptive = getMotor()
+        adaptive.config.setProperties({
+            'timestepSelection': 'Adaptive',
+            'minTimestep': 0.0001,
+            'maxTimestep': 0.1,
+            'timestepTolerance': 0.1
+        })
+        adaptiveRes = adaptive.runSimulation()
+        self.assertTrue(adaptiveRes.success)
+        durations = adaptiveRes.getStepDurations()
+        self.assertAlmostEqual(durations[1], 0.0001)
+        self.assertLessEqual(max(durations), 0.1 + 1e-9)
+        self.assertLess(len(durations), len(fixedRes.getStepDurations()) / 5)
+        self.assertAlmostEqual(adaptiveRes.getImpulse() / fixedRes.getImpulse(), 1, delta=0.005)
+        self.assertAlmostEqual(adaptiveRes.getBurnTime() / fixedRes.getBurnTime(), 1, delta=0.005)
+        self.assertAlmostEqual(adaptiveRes.getAverageForce() / fixedRes.getAverageForce(), 1, delta=0.005)
+
+        adaptive.config.setProperties({'minTimestep': 0.01, 'maxTimestep': 0.001})
+        self.assertFalse(adaptive.runSimulation().success)
+
+    def test_stepDurations(self):
+        simRes = motorlib.simResult.SimulationResult(getMotor())
+        simRes.channels['time'].setData([0, 0.25, 0.75])
+        simRes.channels['force'].setData([0, 10, 20])
+        simRes.channels['exitPressure'].setData([0, 5, 20])
+        self.assertEqual(simRes.getStepDurations(), [0.25, 0.25, 0.5])
+        self.assertAlmostEqual(simRes.getAverageForce(), 12.5)
+        self.assertAlmostEqual(simRes.getPercentBelowThreshold('exitPressure', 10), 0.5)
@@ -8,11 +8,26 @@ DEFAULT_PREFERENCES = {
         'burnoutWebThres': 0.001 / 39.37,
         'burnoutThrustThres': 0.1,
         'timestep': 0.03,
+        'timestepSelection': 'Fixed',
+        'minTimestep': 0.0001,
+        'maxTimestep': 0.1,
+        'timestepTolerance': 0.3,
         'ambPressure': 101325,
         'igniterPressure': 150 * 6895, # Deprecated, but needed for migration
         'mapDim': 750,
+        'mapDimSelection': 'Fixed',
+        'mapFeaturePixels': 8,
+        'mapConvergenceTolerance': 3,
         'sepPressureRatio' : 0.4, # This is a good default value known as the Summerfield Criteria https://ntrs.nasa.gov/api/citations/19840011402/downloads/19840011402.pdf
-        'flowSeparationWarnPercent': 0.05
+        'flowSeparationWarnPercent': 0.05,
+        'regressionSolver': 'Fast marching',
+        'regressionMapStorage': 'Full',
+        'mapMemory': 'In memory',
+        'setupProcesses': 1,
+        'polygonOffsetSamples': 100,
+        'voxelDim': 100,
+        'geometryEvaluation': 'Exact',
+        'geometryTableTolerance': 0.05
     },
     'units': {
         'm': 'in',
@@ -9,7 +9,7 @@ import appdirs
 from .defaults import DEFAULT_PREFERENCES, DEFAULT_PROPELLANTS, KNSU_PROPS
 from .logger import logger
 
-appVersion = (0, 6, 0)
+appVersion = (0, 7, 0)
 appVersionStr = '.'.join(map(str, appVersion))
 
 class fileTypes(Enum):
@@ -68,6 +68,42 @@ def passthrough(data):
     return data
     
     
+#0.6.0 to 0.7.0
+# Motor config settings that were added in 0.7.0. Settings that a file already has are kept, as files saved while 0.7.0
+# was in development can have some of them.
+configAdded_0_7_0 = [
+    'regressionSolver',
+    'regressionMapStorage',
+    'setupProcesses',
+    'polygonOffsetSamples',
+    'mapDimSelection',
+    'mapFeaturePixels',
+    'mapConvergenceTolerance',
+    'mapMemory',
+    'voxelDim',
+    'geometryEvaluation',
+    'geometryTableTolerance',
+    'timestepSelection',
+    'minTimestep',
+    'maxTimestep',
+    'timestepTolerance'
+]
+
+def addConfigDefaults(config, names):
+    for name in names:
+        config.setdefault(name, DEFAULT_PREFERENCES['general'][name])
+
+def migratePref_0_6_0_to_0_7_0(data):
+    addConfigDefaults(data['general'], configAdded_0_7_0)
+    return data
+
+def migrateMotor_0_6_0_to_0_7_0(data):
+    addConfigDefaults(data['config'], configAdded_0_7_0)
+    for grain in data['grains']:
+        if grain['type'] == 'Custom Grain':
+            grain['properties'].setdefault('regressionEngine', 'Regression map')
+    return data
+
 #0.5.0 to 0.6.0
 def migrateMotor_0_5_0_to_0_6_0(data):
     data['config']['sepPressureRatio'] = DEFAULT_PREFERENCES['general']['sepPressureRatio']
@@ -158,6 +194,12 @@ def migrateMotor_0_2_0_to_0_3_0(data):
     return data
 
 migrations = {
+    (0, 6, 0): {
+        'to': (0, 7, 0),
+        fileTypes.PREFERENCES: migratePref_0_6_0_to_0_7_0,
+        fileTypes.PROPELLANTS: passthrough,
+        fileTypes.MOTOR: migrateMotor_0_6_0_to_0_7_0
+    },
     (0, 5, 0): {
         'to': (0, 6, 0),
         fileTypes.PREFERENCES: passthrough,
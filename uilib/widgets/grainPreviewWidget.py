@@ -1,4 +1,4 @@
-from threading import Thread
+from threading import Thread, Lock
 
 from PyQt6.QtWidgets import QWidget
 from PyQt6.QtCore import pyqtSignal
@@ -8,8 +8,13 @@ import motorlib
 from ..views.GrainPreview_ui import Ui_GrainPreview
 
 class GrainPreviewWidget(QWidget):
+    """Shows the face, regression map and perimeter graph of a grain. Previews of map based grains are first generated
+    at a low map dimension so something shows up quickly, and then refined in a background thread. Only one thread runs
+    at a time, and when the grain is changed, it abandons the old grain at the next step and starts on the newest one.
+    """
 
-    previewReady = pyqtSignal(tuple)
+    previewReady = pyqtSignal(int, tuple)
+    previewMapDims = (64, 128, 250) # Map dimensions to generate previews of FMM grains at, in order
 
     def __init__(self):
         super().__init__()
@@ -22,6 +27,11 @@ class GrainPreviewWidget(QWidget):
 
         self.previewReady.connect(self.updateView)
 
+        self.requestLock = Lock()
+        self.requestCount = 0 # Incremented on every change so results for old grains can be recognized
+        self.pendingGrain = None
+        self.workerRunning = False
+
     def loadGrain(self, grain):
         geomAlerts = grain.getGeometryErrors()
 
@@ -29,18 +39,41 @@ class GrainPreviewWidget(QWidget):
         for err in geomAlerts:
             self.ui.tabAlerts.addItem(err.description)
 
-        for alert in geomAlerts:
-            if alert.level == motorlib.simResult.SimAlertLevel.ERROR:
-                return
+        with self.requestLock:
+            self.requestCount += 1
+            self.pendingGrain = None
+            for alert in geomAlerts:
+                if alert.level == motorlib.simResult.SimAlertLevel.ERROR:
+                    return
 
-        dataThread = Thread(target=self._genData, args=[grain])
-        dataThread.start()
+            self.pendingGrain = grain
+            if self.workerRunning:
+                return # The running thread will pick up the new grain once it is done with its current step
+            self.workerRunning = True
 
-    def _genData(self, grain):
-        out = grain.getRegressionData(250)
-        self.previewReady.emit(out)
+        dataThread = Thread(target=self._genData)
+        dataThread.start()
 
-    def updateView(self, data):
+    def _genData(self):
+        while True:
+            with self.requestLock:
+                grain, request = self.pendingGrain, self.requestCount
+                self.pendingGrain = None
+                if grain is None:
+                    self.workerRunning = False
+                    return
+
+            mapDims = self.previewMapDims if isinstance(grain, motorlib.grain.FmmGrain) else self.previewMapDims[-1:]
+            for mapDim in mapDims:
+                out = grain.getRegressionData(mapDim)
+                with self.requestLock:
+                    if request != self.requestCount:
+                        break # The grain has changed, so there is no point in refining this one
+                self.previewReady.emit(request, out)
+
+    def updateView(self, request, data):
+        if request != self.requestCount:
+            return # Left over from a grain that has since been changed
         coreIm, regImage, contours, contourLengths = data
 
         self.ui.tabFace.cleanup()
@@ -61,6 +94,9 @@ class GrainPreviewWidget(QWidget):
             self.ui.tabAreaGraph.showGraph(points)
 
     def cleanup(self):
+        with self.requestLock:
+            self.requestCount += 1
+            self.pendingGrain = None
         self.ui.tabAlerts.clear()
         self.ui.tabRegression.cleanup()
         self.ui.tabFace.cleanup()
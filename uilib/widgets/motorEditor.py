@@ -1,6 +1,5 @@
 from PyQt6.QtWidgets import QLabel
 
-import motorlib.grain
 import motorlib.nozzle
 import motorlib.motor
 
@@ -38,7 +37,7 @@ class MotorEditor(CollectionEditor):
             nozzle.setProperties(self.getProperties())
             self.nozzlePreview.loadNozzle(nozzle)
 
-        if issubclass(self.objType, motorlib.grain.PerforatedGrain):
+        if hasattr(self.objType, 'getRegressionData'):
             testGrain = self.objType()
             testGrain.setProperties(self.getProperties())
             self.grainPreview.loadGrain(testGrain)
@@ -47,7 +46,7 @@ class MotorEditor(CollectionEditor):
         self.objType = type(obj)
         self.loadProperties(obj)
 
-        if issubclass(self.objType, motorlib.grain.PerforatedGrain):
+        if hasattr(self.objType, 'getRegressionData'):
             self.grainPreview.show()
             self.nozzlePreview.hide()
             self.expRatioLabel.hide()
@@ -61,7 +61,7 @@ class ResultsWidget(QWidget):
             self.grainImageWidgets.append(GrainImageWidget())
             self.grainLabels.append({})
             self.ui.tableWidgetGrains.setCellWidget(0, gid, self.grainImageWidgets[-1])
-            if isinstance(grain, motorlib.grain.PerforatedGrain):
+            if hasattr(grain, 'getRegressionData'):
                 self.grainImages.append(grain.getRegressionData(128, coreBlack=False)[1])
             else:
                 self.grainImages.append(None)